@@ -1,26 +1,37 @@
 __version__ = "0.1.0"
 
-from typing import Callable, Type, Union
+from typing import Any, Callable, List, Optional, Type, Union
 from pathlib import Path
 from typing import Dict
 
 from .adapters.aiosqlite import AioSQLiteAdapter
+from .adapters.asyncpg import AsyncPGAdapter
 from .adapters.sqlite3 import SQLite3DriverAdapter
 from .adapters.psycopg2 import PsycoPG2Adapter
+from .loaders.cache import QueryDataCache
 from .loaders.text import TextLoader
-from .exceptions import SQLParseException, SQLLoadException
+from .exceptions import (
+    SQLParseException,
+    SQLLoadException,
+    SQLPoolException,
+    SQLValidationException,
+)
 from .models import (
     DriverAdapterProtocol,
     FileQueryLoaderProtocol,
     TextQueryLoaderProtocol,
 )
+from .pool import AsyncConnectionPool, ConnectionPool
 from .queries import QueriesContainer
+from .routing import AsyncReplicaRouter, ReplicaRouter
+from .validation import QueryLocation, QueryValidator
 
 
 _ADAPTERS: Dict[str, Callable[..., DriverAdapterProtocol]] = {
     "psycopg2": PsycoPG2Adapter,
     "sqlite3": SQLite3DriverAdapter,
     "aiosqlite": AioSQLiteAdapter,
+    "asyncpg": AsyncPGAdapter,
 }
 
 
@@ -55,21 +66,83 @@ def _make_loader_cls(
     return loader
 
 
+def _validate(
+    validate: Union[QueryValidator, Callable[[], Any]],
+    adapter: DriverAdapterProtocol,
+    queries: List[QueryLocation],
+):
+    # a bare callable opens the connections of a default validator
+    if not isinstance(validate, QueryValidator):
+        validate = QueryValidator(validate)
+    validate.validate(adapter, queries)
+
+
+def _query_lines(query_loader, sql: str) -> Dict[str, int]:
+    # loaders not reporting lines give errors without them
+    load_query_lines = getattr(query_loader, "load_query_lines_from_sql", None)
+    return load_query_lines(sql) if load_query_lines is not None else {}
+
+
+def _sql_files(path: Path) -> List[Path]:
+    return [path] if path.is_file() else sorted(path.rglob("*.sql"))
+
+
+def _loaded_locations(
+    queries: QueriesContainer, path: Path, query_loader
+) -> List[QueryLocation]:
+    # the query data the load produced, in file and line order
+    loaded = {}
+    containers = [((), queries)]
+    while containers:
+        parts, container = containers.pop()
+        for query_name, query_datum in container._query_data.items():
+            loaded[parts, query_name] = query_datum
+        containers.extend(
+            (parts + (name,), child) for name, child in container._children.items()
+        )
+
+    locations: List[QueryLocation] = []
+    for file_path in _sql_files(path):
+        parts = () if path.is_file() else file_path.parent.relative_to(path).parts
+        # only the name comments are scanned, the sql is not parsed again
+        lines = _query_lines(query_loader, file_path.read_text())
+        names = lines or dict.fromkeys(
+            name for name, _ in query_loader.load_query_names_from_file(file_path)
+        )
+        for query_name in names:
+            query_datum = loaded.pop((parts, query_name), None)
+            if query_datum is not None:
+                locations.append((query_datum, str(file_path), lines.get(query_name)))
+    locations.extend((query_datum, None, None) for query_datum in loaded.values())
+    return locations
+
+
 def load_from_str(
     sql: str,
     driver_adapter: Union[str, Callable[..., DriverAdapterProtocol]],
     loader_cls: Union[str, Callable[..., TextQueryLoaderProtocol]] = TextLoader,
     queries_cls: Type[QueriesContainer] = QueriesContainer,
+    fetch_size: Optional[int] = None,
+    pool: Optional[Union[ConnectionPool, AsyncConnectionPool]] = None,
+    record_classes: Optional[Dict[str, Callable]] = None,
+    auto_record_classes: bool = False,
+    validate: Optional[Union[QueryValidator, Callable[[], Any]]] = None,
 ):
     # initiate driver adapter from str or callable
     adapter = _make_driver_adapter_instance(driver_adapter)
     # create loader cls from str or type
     loader = _make_loader_cls(loader_cls)
     # initiate query loader
-    query_loader = loader(adapter, record_classes=None)
+    loader_kwargs = {"auto_record_classes": True} if auto_record_classes else {}
+    query_loader = loader(adapter, record_classes=record_classes, **loader_kwargs)
     # load query data
     query_data = query_loader.load_query_data_from_sql(sql)
-    return queries_cls(adapter).load_from_list(query_data)
+    if validate is not None:
+        lines = _query_lines(query_loader, sql)
+        _validate(
+            validate, adapter, [(d, None, lines.get(d.query_name)) for d in query_data]
+        )
+    return queries_cls(adapter, fetch_size, pool).load_from_list(query_data)
 
 
 def load_from_file(
@@ -77,31 +150,79 @@ def load_from_file(
     driver_adapter: Union[str, Callable[..., DriverAdapterProtocol]],
     loader_cls: Union[str, Callable[..., FileQueryLoaderProtocol]] = TextLoader,
     queries_cls: Type[QueriesContainer] = QueriesContainer,
+    fetch_size: Optional[int] = None,
+    cache_path: Optional[Union[str, Path]] = None,
+    lazy: bool = False,
+    workers: Optional[int] = None,
+    use_processes: bool = False,
+    pool: Optional[Union[ConnectionPool, AsyncConnectionPool]] = None,
+    record_classes: Optional[Dict[str, Callable]] = None,
+    auto_record_classes: bool = False,
+    validate: Optional[Union[QueryValidator, Callable[[], Any]]] = None,
 ):
     path = Path(sql_path)
 
     if not path.exists():
         raise SQLLoadException(f"File does not exist: {path}")
+    if lazy and (workers or use_processes):
+        # lazily loaded files are parsed one at a time as they are first used
+        raise ValueError("workers and use_processes can not be combined with lazy")
 
     # initiate driver adapter from str or callable
     adapter = _make_driver_adapter_instance(driver_adapter)
     # create loader cls from str or type
     loader = _make_loader_cls(loader_cls)
-    # initiate query loader
-    query_loader = loader(adapter, record_classes=None)
+    # initiate query loader, parsed query data is reused from cache_path if set
+    cache = QueryDataCache(cache_path, adapter) if cache_path is not None else None
+    loader_kwargs: Dict[str, Any] = {"cache": cache} if cache is not None else {}
+    if auto_record_classes:
+        loader_kwargs["auto_record_classes"] = True
+    query_loader = loader(adapter, record_classes=record_classes, **loader_kwargs)
+
     # load query data
 
-    if path.is_file():
+    if lazy and (path.is_file() or path.is_dir()):
+        if validate is not None:
+            # every file is parsed up front to be validated, from the cache
+            # when it holds them
+            queries_to_validate = []
+            for file_path in _sql_files(path):
+                lines = _query_lines(query_loader, file_path.read_text())
+                queries_to_validate.extend(
+                    (d, str(file_path), lines.get(d.query_name))
+                    for d in query_loader.load_query_data_from_file(file_path)
+                )
+            _validate(validate, adapter, queries_to_validate)
+        # files are parsed on first access, the cache is saved shortly after
+        if cache is not None:
+            cache.autosave()
+        return queries_cls(adapter, fetch_size, pool).load_lazily(path, query_loader)
+    elif path.is_file():
         query_data = query_loader.load_query_data_from_file(path)
-        return queries_cls(adapter).load_from_list(query_data)
+        queries = queries_cls(adapter, fetch_size, pool).load_from_list(query_data)
     elif path.is_dir():
-        query_data_tree = query_loader.load_query_data_from_dir(path)
-        return queries_cls(adapter).load_from_tree(query_data_tree)
+        if workers:
+            # parse files across a pool of worker threads or processes
+            query_data_tree = query_loader.load_query_data_from_dir(
+                path, workers=workers, use_processes=use_processes
+            )
+        else:
+            query_data_tree = query_loader.load_query_data_from_dir(path)
+        queries = queries_cls(adapter, fetch_size, pool).load_from_tree(
+            query_data_tree
+        )
     else:
         raise SQLLoadException(
             f"The sql_path must be a directory or file, got {sql_path}"
         )
 
+    if validate is not None:
+        _validate(validate, adapter, _loaded_locations(queries, path, query_loader))
+    if cache is not None:
+        cache.save()
+    queries.set_source(path, query_loader)
+    return queries
+
 
 def load_here(
     driver_adapter: Union[str, Callable[..., DriverAdapterProtocol]],
@@ -122,4 +243,11 @@ __all__ = [
     "load_from_file",
     "SQLLoadException",
     "SQLParseException",
+    "SQLPoolException",
+    "SQLValidationException",
+    "QueryValidator",
+    "ConnectionPool",
+    "AsyncConnectionPool",
+    "ReplicaRouter",
+    "AsyncReplicaRouter",
 ]
@@ -1,19 +1,66 @@
+import sqlite3
+from contextlib import asynccontextmanager
+
+from ..columns import ColumnsBuilder
+from ..mappers import get_row_mapper
+from ..tokenizer import parse_sql
+from .bulk import aiter_chunks
+from .statements import StatementCache
+
+
 class AioSQLiteAdapter:
     is_aio_driver = True
+    # executescript() commits a pending transaction before the script
+    scripts_commit = True
+
+    def __init__(self, statement_cache_size=128, chunk_size=1000):
+        # cursors are reused per connection and query, which saves the round
+        # trips to the connection thread that create and close them
+        self.statement_cache = StatementCache(statement_cache_size)
+        # rows handed to each executemany() by >> queries
+        self.chunk_size = chunk_size
+
+    def evict(self, conn):
+        """
+        Drops the statements cached for conn, call it once conn is closed
+        """
+        self.statement_cache.evict(conn)
 
     @staticmethod
     def process_sql(_query_name, _op_type, sql):
-        return sql
+        # numbered, sqlite binds them without looking up names
+        return parse_sql(sql).render_positional("?{index}")
 
-    @staticmethod
-    async def select(conn, _query_name, sql, parameters, record_class=None):
-        async with conn.execute(sql, parameters) as cur:
-            results = await cur.fetchall()
-            if record_class is not None:
-                column_names = [c[0] for c in cur.description]
-                results = [
-                    record_class(**dict(zip(column_names, row))) for row in results
-                ]
+    async def _execute(self, conn, query_name, sql, parameters, many=False):
+        cur = self.statement_cache.checkout(conn, query_name)
+        if cur is None:
+            cur = await conn.cursor()
+        else:
+            # cursors copy the row factory of their connection when created
+            cur.row_factory = conn.row_factory
+
+        try:
+            if many:
+                await cur.executemany(sql, parameters)
+            else:
+                await cur.execute(sql, parameters)
+        except (ValueError, sqlite3.ProgrammingError):
+            # most likely a closed connection, none of its cursors are usable
+            self.statement_cache.evict(conn)
+            raise
+        except BaseException:
+            # checked out, so it is neither put back nor left open
+            await cur.close()
+            raise
+        return cur
+
+    async def select(self, conn, query_name, sql, parameters, record_class=None):
+        cur = await self._execute(conn, query_name, sql, parameters)
+        results = await cur.fetchall()
+        if record_class is not None:
+            mapper = get_row_mapper(record_class, cur.description)
+            results = list(map(mapper, results))
+        self.statement_cache.put(conn, query_name, cur)
         return results
 
     @staticmethod
@@ -21,16 +68,106 @@ class AioSQLiteAdapter:
         async with conn.execute(sql, parameters) as cur:
             result = await cur.fetchone()
             if result is not None and record_class is not None:
-                column_names = [c[0] for c in cur.description]
-                result = record_class(**dict(zip(column_names, result)))
+                result = get_row_mapper(record_class, cur.description)(result)
         return result
 
     @staticmethod
-    async def insert_update_delete(conn, _query_name, sql, parameters):
-        cur = await conn.execute(sql, parameters)
-        await cur.close()
+    async def explain(conn, _query_name, sql, parameters):
+        async with conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters) as cur:
+            return await cur.fetchall()
 
     @staticmethod
-    async def insert_update_delete_many(conn, _query_name, sql, parameters):
-        cur = await conn.executemany(sql, parameters)
-        await cur.close()
+    async def begin(conn, savepoint=None):
+        if savepoint is not None:
+            await conn.execute(f"SAVEPOINT {savepoint}")
+        elif not conn.in_transaction:
+            # explicit, connections in autocommit mode would not open one
+            await conn.execute("BEGIN")
+
+    @staticmethod
+    async def commit(conn, savepoint=None):
+        if savepoint is not None:
+            await conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+        else:
+            await conn.commit()
+
+    @staticmethod
+    async def rollback(conn, savepoint=None):
+        if savepoint is not None:
+            await conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            await conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+        else:
+            await conn.rollback()
+
+    async def select_iter(
+        self, conn, query_name, sql, parameters, record_class=None, fetch_size=100
+    ):
+        cur = await self._execute(conn, query_name, sql, parameters)
+        mapper = None
+        exhausted = False
+        try:
+            while True:
+                rows = await cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                if record_class is not None:
+                    if mapper is None:
+                        mapper = get_row_mapper(record_class, cur.description)
+                    rows = list(map(mapper, rows))
+                for row in rows:
+                    yield row
+                if len(rows) < fetch_size:
+                    break
+            exhausted = True
+        finally:
+            if exhausted:
+                self.statement_cache.put(conn, query_name, cur)
+            else:
+                # left mid way, closing resets the statement
+                await cur.close()
+
+    async def select_columns(self, conn, query_name, sql, parameters, fetch_size=100):
+        cur = await self._execute(conn, query_name, sql, parameters)
+        # plain tuples whatever the connection's row factory
+        cur.row_factory = None
+        columns = ColumnsBuilder(cur.description)
+        while True:
+            rows = await cur.fetchmany(fetch_size)
+            columns.add(rows)
+            if len(rows) < fetch_size:
+                break
+        self.statement_cache.put(conn, query_name, cur)
+        return columns.build()
+
+    @staticmethod
+    @asynccontextmanager
+    async def select_cursor(conn, _query_name, sql, parameters):
+        async with conn.execute(sql, parameters) as cur:
+            yield cur
+
+    @staticmethod
+    async def execute_script(conn, _query_name, sql):
+        # commits a pending transaction first, see scripts_commit
+        await conn.executescript(sql)
+
+    async def insert_update_delete(self, conn, query_name, sql, parameters):
+        cur = await self._execute(conn, query_name, sql, parameters)
+        rowcount = cur.rowcount
+        self.statement_cache.put(conn, query_name, cur)
+        return rowcount
+
+    async def insert_update_delete_many(self, conn, query_name, sql, parameters):
+        # rows go to the connection thread a chunk at a time, async iterables
+        # are consumed as they produce them
+        cur = None
+        rowcount = 0
+        async for chunk in aiter_chunks(parameters, self.chunk_size):
+            if cur is None:
+                cur = await self._execute(conn, query_name, sql, chunk, many=True)
+            else:
+                await cur.executemany(sql, chunk)
+            rowcount += cur.rowcount
+
+        if cur is not None:
+            self.statement_cache.put(conn, query_name, cur)
+        return rowcount
@@ -0,0 +1,203 @@
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from ..columns import ColumnsBuilder
+from ..mappers import get_row_mapper
+
+# PositionalSQL moved to the tokenizer, still importable from here
+from ..tokenizer import PositionalSQL, parse_sql  # noqa: F401
+from .bulk import SimpleInsert, aiter_chunks, simple_insert
+from .statements import StatementCache
+
+
+def _copy_target(sql) -> Optional[SimpleInsert]:
+    # a plain INSERT taking $1..$n in column order, which COPY loads just the same
+    insert = simple_insert(sql)
+    if insert is None:
+        return None
+    if insert.values != [f"${n}" for n in range(1, len(insert.columns) + 1)]:
+        return None
+    return insert
+
+
+def _connection(conn):
+    # pool connection proxies are handed out anew on every acquire, prepared
+    # statements belong to the connection underneath
+    return getattr(conn, "_con", None) or conn
+
+
+def _status_rowcount(status):
+    # rows counted by a command tag, e.g. "INSERT 0 3", -1 for commands that
+    # count none
+    count = (status or "").rpartition(" ")[2]
+    return int(count) if count.isdigit() else -1
+
+
+@asynccontextmanager
+async def _transaction(conn):
+    # server side cursors only live inside a transaction
+    if conn.is_in_transaction():
+        yield
+    else:
+        async with conn.transaction():
+            yield
+
+
+class AsyncPGAdapter:
+    is_aio_driver = True
+
+    def __init__(self, use_copy=True, statement_cache_size=128, chunk_size=1000):
+        # load >> plain inserts with COPY instead of executemany
+        self.use_copy = use_copy
+        self.statement_cache = StatementCache(statement_cache_size)
+        # rows handed to each executemany() by >> queries
+        self.chunk_size = chunk_size
+        self._copy_targets: Dict[str, Optional[SimpleInsert]] = {}
+
+    def evict(self, conn):
+        """
+        Drops the statements cached for conn, call it once conn is closed
+        """
+        self.statement_cache.evict(_connection(conn))
+
+    @staticmethod
+    def process_sql(_query_name, _op_type, sql):
+        return parse_sql(sql).render_positional("${index}")
+
+    @staticmethod
+    def _args(sql, parameters):
+        if isinstance(parameters, dict):
+            return [parameters[name] for name in sql.parameters]
+        return parameters
+
+    async def _prepare(self, conn, query_name, sql):
+        # each statement is prepared once per connection, the sql is compared
+        # too as queries of different containers may share a name
+        conn = _connection(conn)
+        cached = self.statement_cache.get(conn, query_name)
+        if cached is not None and cached[0] == sql:
+            return cached[1]
+        statement = await conn.prepare(sql)
+        self.statement_cache.put(conn, query_name, (sql, statement))
+        return statement
+
+    async def select(self, conn, query_name, sql, parameters, record_class=None):
+        statement = await self._prepare(conn, query_name, sql)
+        results = await statement.fetch(*self._args(sql, parameters))
+        if record_class is not None:
+            mapper = get_row_mapper(record_class, statement.get_attributes())
+            results = list(map(mapper, results))
+        return results
+
+    async def select_one(self, conn, query_name, sql, parameters, record_class=None):
+        statement = await self._prepare(conn, query_name, sql)
+        result = await statement.fetchrow(*self._args(sql, parameters))
+        if result is not None and record_class is not None:
+            result = get_row_mapper(record_class, statement.get_attributes())(result)
+        return result
+
+    async def explain(self, conn, _query_name, sql, parameters):
+        # not prepared through the statement cache, plans are rarely asked for
+        return await conn.fetch(f"EXPLAIN {sql}", *self._args(sql, parameters))
+
+    @staticmethod
+    async def begin(conn, savepoint=None):
+        # asyncpg runs every statement in autocommit mode otherwise
+        await conn.execute("BEGIN" if savepoint is None else f"SAVEPOINT {savepoint}")
+
+    @staticmethod
+    async def commit(conn, savepoint=None):
+        if savepoint is not None:
+            await conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+        else:
+            await conn.execute("COMMIT")
+
+    @staticmethod
+    async def rollback(conn, savepoint=None):
+        if savepoint is not None:
+            await conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            await conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+        else:
+            await conn.execute("ROLLBACK")
+
+    async def select_iter(
+        self, conn, query_name, sql, parameters, record_class=None, fetch_size=100
+    ):
+        statement = await self._prepare(conn, query_name, sql)
+        mapper = None
+        if record_class is not None:
+            mapper = get_row_mapper(record_class, statement.get_attributes())
+
+        async with _transaction(conn):
+            cursor = await statement.cursor(*self._args(sql, parameters))
+            while True:
+                rows = await cursor.fetch(fetch_size)
+                if mapper is not None:
+                    rows = list(map(mapper, rows))
+                for row in rows:
+                    yield row
+                if len(rows) < fetch_size:
+                    break
+
+    async def select_columns(self, conn, query_name, sql, parameters, fetch_size=100):
+        statement = await self._prepare(conn, query_name, sql)
+        columns = ColumnsBuilder(
+            [
+                (a.name, getattr(a.type, "name", None))
+                for a in statement.get_attributes()
+            ]
+        )
+        async with _transaction(conn):
+            cursor = await statement.cursor(*self._args(sql, parameters))
+            while True:
+                rows = await cursor.fetch(fetch_size)
+                columns.add(rows)
+                if len(rows) < fetch_size:
+                    break
+        return columns.build()
+
+    @asynccontextmanager
+    async def select_cursor(self, conn, query_name, sql, parameters):
+        statement = await self._prepare(conn, query_name, sql)
+        async with _transaction(conn):
+            yield statement.cursor(*self._args(sql, parameters))
+
+    async def insert_update_delete(self, conn, query_name, sql, parameters):
+        statement = await self._prepare(conn, query_name, sql)
+        await statement.fetch(*self._args(sql, parameters))
+        return _status_rowcount(statement.get_statusmsg())
+
+    @staticmethod
+    async def execute_script(conn, _query_name, sql):
+        # without arguments asyncpg uses the simple query protocol, which
+        # runs all the statements in a single round trip
+        await conn.execute(sql)
+
+    async def insert_update_delete_many(self, conn, _query_name, sql, parameters):
+        target = None
+        if self.use_copy:
+            if sql not in self._copy_targets:
+                self._copy_targets[sql] = _copy_target(sql)
+            target = self._copy_targets[sql]
+
+        if target is not None:
+            # COPY streams the records itself, whether they come from an
+            # iterable or an async iterable
+            status = await conn.copy_records_to_table(
+                target.table,
+                records=self._records(sql, parameters),
+                columns=target.columns,
+                schema_name=target.schema,
+            )
+            return _status_rowcount(status)
+
+        async for chunk in aiter_chunks(parameters, self.chunk_size):
+            await conn.executemany(sql, [self._args(sql, p) for p in chunk])
+        # asyncpg's executemany reports no status, so the affected rows are
+        # unknown, -1 as for a DB-API cursor, COPY above does count them
+        return -1
+
+    async def _records(self, sql, parameters):
+        async for chunk in aiter_chunks(parameters, self.chunk_size):
+            for p in chunk:
+                yield self._args(sql, p)
@@ -0,0 +1,262 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from ..instrumentation import LatencyHistogram
+from ..mappers import get_row_mapper
+from .bulk import aiter_chunks
+
+
+class _BridgedCursor:
+    # a sync driver cursor whose fetches run on its connection's thread
+
+    def __init__(self, bridge: "AsyncBridgeAdapter", conn: Any, cursor: Any):
+        self._bridge = bridge
+        self._conn = conn
+        self.cursor = cursor
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    async def fetchone(self):
+        return await self._bridge.run(self._conn, self.cursor.fetchone)
+
+    async def fetchmany(self, size: int):
+        return await self._bridge.run(self._conn, self.cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await self._bridge.run(self._conn, self.cursor.fetchall)
+
+    async def __aiter__(self):
+        while True:
+            rows = await self.fetchmany(100)
+            for row in rows:
+                yield row
+            if not rows:
+                break
+
+
+class AsyncBridgeAdapter:
+    """
+    Runs a sync adapter, or one registered by name, from asyncio. Each
+    connection is bound to one of ``max_workers`` threads and its calls
+    run there one at a time, so connections are never used from two
+    threads, e.g. sqlite3 ones may be opened with check_same_thread=False.
+    At most ``max_pending`` calls are queued or running, further calls
+    wait on the event loop until one is done.
+    """
+
+    is_aio_driver = True
+
+    def __init__(
+        self,
+        adapter: Any = "sqlite3",
+        max_workers: int = 4,
+        max_pending: Optional[int] = None,
+        chunk_size: int = 1000,
+    ):
+        if isinstance(adapter, str):
+            from .. import _make_driver_adapter_instance
+
+            adapter = _make_driver_adapter_instance(adapter)
+        if getattr(adapter, "is_aio_driver", False):
+            raise ValueError(f"{type(adapter).__name__} is async already")
+        self.adapter = adapter
+        self.scripts_commit = getattr(adapter, "scripts_commit", False)
+        self.max_workers = max_workers
+        self.max_pending = max_pending or 4 * max_workers
+        # rows per call of the sync adapter when >> queries get async iterables
+        self.chunk_size = chunk_size
+        # seconds from a call to its start on a thread, and from its start
+        # to its end
+        self.queue_wait = LatencyHistogram()
+        self.execution = LatencyHistogram()
+        self._stats_lock = threading.Lock()
+        self._executors = [
+            ThreadPoolExecutor(1, thread_name_prefix=f"aioquerysaur-bridge-{i}")
+            for i in range(max_workers)
+        ]
+        # created on first use, within the running loop
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # only offered when the sync adapter has them
+        if hasattr(adapter, "select_columns"):
+            self.select_columns = self._select_columns
+        if hasattr(adapter, "explain"):
+            self.explain = self._explain
+        if hasattr(adapter, "begin"):
+            self.begin = self._begin
+            self.commit = self._commit
+            self.rollback = self._rollback
+        if hasattr(adapter, "evict"):
+            self.evict = self._evict
+
+    def process_sql(self, query_name, op_type, sql):
+        return self.adapter.process_sql(query_name, op_type, sql)
+
+    async def run(self, conn: Any, fn, *args) -> Any:
+        """
+        Calls fn(*args) on the thread of conn
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        called_at = perf_counter()
+        slots = self._slots
+        await slots.acquire()
+
+        def call():
+            started_at = perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(started_at - called_at, perf_counter() - started_at)
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor(conn).submit(call)
+        except BaseException:
+            slots.release()
+            raise
+        # held until the thread is done, even if the caller is cancelled
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(slots.release))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "calls": self.execution.count,
+                "queue_wait": _summary(self.queue_wait),
+                "execution": _summary(self.execution),
+            }
+
+    def close(self):
+        """
+        Waits for running calls and stops the threads
+        """
+        for executor in self._executors:
+            executor.shutdown()
+
+    async def select(self, conn, query_name, sql, parameters, record_class=None):
+        return await self.run(
+            conn, self.adapter.select, conn, query_name, sql, parameters, record_class
+        )
+
+    async def select_one(self, conn, query_name, sql, parameters, record_class=None):
+        return await self.run(
+            conn,
+            self.adapter.select_one,
+            conn,
+            query_name,
+            sql,
+            parameters,
+            record_class,
+        )
+
+    async def _select_columns(self, conn, query_name, sql, parameters, fetch_size=100):
+        return await self.run(
+            conn,
+            self.adapter.select_columns,
+            conn,
+            query_name,
+            sql,
+            parameters,
+            fetch_size,
+        )
+
+    async def _explain(self, conn, query_name, sql, parameters):
+        return await self.run(
+            conn, self.adapter.explain, conn, query_name, sql, parameters
+        )
+
+    async def _begin(self, conn, savepoint=None):
+        return await self.run(conn, self.adapter.begin, conn, savepoint)
+
+    async def _commit(self, conn, savepoint=None):
+        return await self.run(conn, self.adapter.commit, conn, savepoint)
+
+    async def _rollback(self, conn, savepoint=None):
+        return await self.run(conn, self.adapter.rollback, conn, savepoint)
+
+    async def _evict(self, conn):
+        # on the thread of conn, cursors of sqlite3 may only be closed there
+        return await self.run(conn, self.adapter.evict, conn)
+
+    @asynccontextmanager
+    async def select_cursor(self, conn, query_name, sql, parameters):
+        ctx = self.adapter.select_cursor(conn, query_name, sql, parameters)
+        cursor = await self.run(conn, ctx.__enter__)
+        try:
+            yield _BridgedCursor(self, conn, cursor)
+        except BaseException:
+            if not await self.run(conn, ctx.__exit__, *sys.exc_info()):
+                raise
+        else:
+            await self.run(conn, ctx.__exit__, None, None, None)
+
+    async def select_iter(
+        self, conn, query_name, sql, parameters, record_class=None, fetch_size=100
+    ):
+        async with self.select_cursor(conn, query_name, sql, parameters) as cur:
+            mapper = None
+            if record_class is not None:
+                mapper = get_row_mapper(record_class, cur.description)
+            while True:
+                rows = await cur.fetchmany(fetch_size)
+                if mapper is not None:
+                    rows = list(map(mapper, rows))
+                for row in rows:
+                    yield row
+                if len(rows) < fetch_size:
+                    break
+
+    async def insert_update_delete(self, conn, query_name, sql, parameters):
+        return await self.run(
+            conn, self.adapter.insert_update_delete, conn, query_name, sql, parameters
+        )
+
+    async def execute_script(self, conn, query_name, sql):
+        return await self.run(conn, self.adapter.execute_script, conn, query_name, sql)
+
+    async def insert_update_delete_many(self, conn, query_name, sql, parameters):
+        many = self.adapter.insert_update_delete_many
+        if not hasattr(parameters, "__aiter__"):
+            # iterated on the connection's thread
+            return await self.run(conn, many, conn, query_name, sql, parameters)
+
+        rowcount = 0
+        async for chunk in aiter_chunks(parameters, self.chunk_size):
+            count = await self.run(conn, many, conn, query_name, sql, chunk)
+            if count is None or count < 0:
+                # unknown for one chunk, unknown for all of them
+                rowcount = -1
+            elif rowcount >= 0:
+                rowcount += count
+        return rowcount
+
+    def _executor(self, conn) -> ThreadPoolExecutor:
+        # objects are at least 16 byte aligned, the low bits of ids are zeros
+        return self._executors[(id(conn) >> 4) % len(self._executors)]
+
+    def _record(self, queue_wait: float, execution: float):
+        with self._stats_lock:
+            self.queue_wait.record(queue_wait)
+            self.execution.record(execution)
+
+
+def _summary(histogram: LatencyHistogram) -> Dict[str, float]:
+    count = histogram.count
+    return {
+        "total": histogram.total,
+        "mean": histogram.total / count if count else 0.0,
+        "max": histogram.max,
+        "p50": histogram.percentile(50),
+        "p99": histogram.percentile(99),
+    }
+
+
+__all__: List[str] = ["AsyncBridgeAdapter"]
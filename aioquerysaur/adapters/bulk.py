@@ -0,0 +1,62 @@
+import re
+from itertools import islice
+from typing import Any, AsyncIterator, Iterable, Iterator, List, NamedTuple, Optional
+
+# a single row INSERT ... VALUES (...) without anything after it, the shape
+# that COPY and multi-row VALUES can load just the same
+_SIMPLE_INSERT = re.compile(
+    r"""^\s*insert\s+into\s+(?P<table>\w+(?:\.\w+)?)\s*
+        \((?P<columns>[\w\s,]+)\)\s*
+        values\s*\((?P<values>(?:[^()]|\(\w+\))+)\)\s*;?\s*$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+class SimpleInsert(NamedTuple):
+    schema: Optional[str]
+    table: str
+    columns: List[str]
+    # placeholder of each column, as rendered by the adapter
+    values: List[str]
+
+
+def simple_insert(sql: str) -> Optional[SimpleInsert]:
+    match = _SIMPLE_INSERT.match(sql)
+    if match is None:
+        return None
+
+    columns = [c.strip() for c in match.group("columns").split(",")]
+    values = [v.strip() for v in match.group("values").split(",")]
+    if len(columns) != len(values):
+        return None
+
+    schema, _, table = match.group("table").rpartition(".")
+    return SimpleInsert(schema or None, table, columns, values)
+
+
+def iter_chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aiter_chunks(rows: Any, size: int) -> AsyncIterator[List[Any]]:
+    """
+    Chunks of at most size rows from an iterable or async iterable
+    """
+    if not hasattr(rows, "__aiter__"):
+        for chunk in iter_chunks(rows, size):
+            yield chunk
+        return
+
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -1,26 +1,99 @@
 import re
+from contextlib import contextmanager
+from io import TextIOBase
+from itertools import count
+from typing import Dict, Optional
 
-_VAR_PATTERN = re.compile(
-    r'(?P<dblquote>"[^"]+")|'
-    r"(?P<quote>\'[^\']+\')|"
-    r"(?P<lead>[^:]):(?P<var_name>[\w-]+)(?P<trail>[^:]?)"
-)
+try:
+    from psycopg2.extras import execute_values
+except ImportError:  # pragma: no cover
+    # without psycopg2 installed there is nothing to run the queries on anyway
+    execute_values = None
 
+from ..columns import ColumnsBuilder
+from ..mappers import get_row_mapper
+from ..tokenizer import parse_sql
+from .bulk import SimpleInsert, iter_chunks, simple_insert
 
-def replacer(match):
-    gd = match.groupdict()
-    if gd["dblquote"] is not None:
-        return gd["dblquote"]
-    elif gd["quote"] is not None:
-        return gd["quote"]
+# server-side cursor names must be unique per connection
+_cursor_ids = count()
+
+_NAMED_PLACEHOLDER = re.compile(r"^%\((\w+)\)s$")
+
+# COPY text format escapes, NULL is \N
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _bulk_insert(sql) -> Optional[SimpleInsert]:
+    # a plain INSERT taking a distinct parameter per column, as %s with the
+    # names carried by the sql or as %(name)s
+    insert = simple_insert(sql)
+    if insert is None:
+        return None
+    if all(value == "%s" for value in insert.values):
+        names = list(getattr(sql, "parameters", ()))
     else:
-        return f'{gd["lead"]}%({gd["var_name"]})s{gd["trail"]}'
+        matches = [_NAMED_PLACEHOLDER.match(value) for value in insert.values]
+        if not all(matches):
+            return None
+        names = [match.group(1) for match in matches]
+    if len(names) != len(insert.values) or len(set(names)) != len(names):
+        return None
+    return insert._replace(values=names)
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    elif value is True or value is False:
+        return "t" if value else "f"
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\\\x" + bytes(value).hex()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _CopyRows(TextIOBase):
+    """
+    Rows as COPY text, produced as copy_expert reads them
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self.rowcount = 0
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += "\t".join(map(_copy_value, row)) + "\n"
+            self.rowcount += 1
+
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
 
 
 class PsycoPG2Adapter:
+    def __init__(self, itersize=2000, chunk_size=1000, use_copy=False):
+        # rows fetched per network round trip by server-side cursors
+        self.itersize = itersize
+        # rows sent per statement by >> queries
+        self.chunk_size = chunk_size
+        # load >> plain inserts with COPY FROM STDIN, values are sent in COPY
+        # text format rather than adapted by psycopg2, so it is opt-in
+        self.use_copy = use_copy
+        self._bulk_inserts: Dict[str, Optional[SimpleInsert]] = {}
+
     @staticmethod
     def process_sql(_query_name, _op_type, sql):
-        return _VAR_PATTERN.sub(replacer, sql)
+        # one %s per occurrence, psycopg2 has no numbered placeholders
+        return parse_sql(sql).render_positional("%s", escape_percent=True)
 
     @staticmethod
     def select(conn, _query_name, sql, parameters, record_class=None):
@@ -28,8 +101,130 @@ class PsycoPG2Adapter:
             cur.execute(sql, parameters)
             results = cur.fetchall()
             if record_class is not None:
-                column_names = [c.name for c in cur.description]
-                results = [
-                    record_class(**dict(zip(column_names, row))) for row in results
-                ]
+                mapper = get_row_mapper(record_class, cur.description)
+                results = list(map(mapper, results))
         return results
+
+    @staticmethod
+    def select_one(conn, _query_name, sql, parameters, record_class=None):
+        with conn.cursor() as cur:
+            cur.execute(sql, parameters)
+            result = cur.fetchone()
+            if result is not None and record_class is not None:
+                result = get_row_mapper(record_class, cur.description)(result)
+        return result
+
+    @staticmethod
+    def explain(conn, _query_name, sql, parameters):
+        with conn.cursor() as cur:
+            cur.execute(f"EXPLAIN {sql}", parameters)
+            return cur.fetchall()
+
+    @staticmethod
+    def _execute(conn, sql):
+        with conn.cursor() as cur:
+            cur.execute(sql)
+
+    def begin(self, conn, savepoint=None):
+        # psycopg2 opens transactions itself unless in autocommit mode
+        if savepoint is not None:
+            self._execute(conn, f"SAVEPOINT {savepoint}")
+        elif conn.autocommit:
+            self._execute(conn, "BEGIN")
+
+    def commit(self, conn, savepoint=None):
+        if savepoint is not None:
+            self._execute(conn, f"RELEASE SAVEPOINT {savepoint}")
+        elif conn.autocommit:
+            self._execute(conn, "COMMIT")
+        else:
+            conn.commit()
+
+    def rollback(self, conn, savepoint=None):
+        if savepoint is not None:
+            self._execute(conn, f"ROLLBACK TO SAVEPOINT {savepoint}")
+            self._execute(conn, f"RELEASE SAVEPOINT {savepoint}")
+        elif conn.autocommit:
+            self._execute(conn, "ROLLBACK")
+        else:
+            conn.rollback()
+
+    @staticmethod
+    def select_columns(conn, _query_name, sql, parameters, fetch_size=100):
+        with conn.cursor() as cur:
+            cur.execute(sql, parameters)
+            columns = ColumnsBuilder(cur.description)
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                columns.add(rows)
+                if len(rows) < fetch_size:
+                    break
+        return columns.build()
+
+    @contextmanager
+    def select_cursor(self, conn, query_name, sql, parameters):
+        # named cursors live on the server, so rows are streamed in batches of
+        # ``itersize`` instead of being transferred all at once
+        name = f"{query_name}_{next(_cursor_ids)}"
+        with conn.cursor(name=name) as cur:
+            cur.itersize = self.itersize
+            cur.execute(sql, parameters)
+            yield cur
+
+    @staticmethod
+    def insert_update_delete(conn, _query_name, sql, parameters):
+        with conn.cursor() as cur:
+            cur.execute(sql, parameters)
+            return cur.rowcount
+
+    @staticmethod
+    def execute_script(conn, _query_name, sql):
+        # without parameters the statements are sent as they are, in a
+        # single round trip
+        with conn.cursor() as cur:
+            cur.execute(sql)
+
+    def insert_update_delete_many(self, conn, _query_name, sql, parameters):
+        if sql not in self._bulk_inserts:
+            self._bulk_inserts[sql] = _bulk_insert(sql)
+        insert = self._bulk_inserts[sql]
+
+        with conn.cursor() as cur:
+            if insert is not None:
+                rows = self._records(insert, parameters)
+                if self.use_copy:
+                    return self._copy(cur, insert, rows)
+                elif execute_values is not None:
+                    return self._insert_values(cur, insert, rows)
+
+            # executemany adds up the rows affected by each statement
+            rowcount = 0
+            for chunk in iter_chunks(parameters, self.chunk_size):
+                cur.executemany(sql, chunk)
+                rowcount += cur.rowcount
+            return rowcount
+
+    @staticmethod
+    def _records(insert, parameters):
+        # rows in column order, whether given as dicts or sequences
+        for p in parameters:
+            yield [p[name] for name in insert.values] if isinstance(p, dict) else p
+
+    def _insert_values(self, cur, insert, rows):
+        # one multi-row INSERT ... VALUES per chunk
+        table = f"{insert.schema}.{insert.table}" if insert.schema else insert.table
+        sql = f"insert into {table} ({', '.join(insert.columns)}) values %s"
+        template = "(" + ", ".join(["%s"] * len(insert.columns)) + ")"
+        rowcount = 0
+        for chunk in iter_chunks(rows, self.chunk_size):
+            execute_values(cur, sql, chunk, template, page_size=len(chunk))
+            rowcount += cur.rowcount
+        return rowcount
+
+    def _copy(self, cur, insert, rows):
+        table = f"{insert.schema}.{insert.table}" if insert.schema else insert.table
+        copy_rows = _CopyRows(rows)
+        cur.copy_expert(
+            f"copy {table} ({', '.join(insert.columns)}) from stdin", copy_rows
+        )
+        return copy_rows.rowcount
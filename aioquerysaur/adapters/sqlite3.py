@@ -1,34 +1,153 @@
+import sqlite3
+from contextlib import contextmanager
+
+from ..columns import ColumnsBuilder
+from ..mappers import get_row_mapper
+from ..tokenizer import parse_sql
+from .statements import StatementCache
+
+
+def _close_cursor(cur):
+    try:
+        cur.close()
+    except sqlite3.ProgrammingError:
+        # closed along with its connection, or owned by another thread
+        pass
+
+
 class SQLite3DriverAdapter:
+    # executescript() commits a pending transaction before the script
+    scripts_commit = True
+
+    def __init__(self, statement_cache_size=128):
+        # cursors are reused per connection and query instead of being
+        # created and closed on every call
+        self.statement_cache = StatementCache(statement_cache_size, close=_close_cursor)
+
+    def evict(self, conn):
+        """
+        Drops the statements cached for conn, call it once conn is closed
+        """
+        self.statement_cache.evict(conn)
+
     @staticmethod
     def process_sql(_query_name, _op_type, sql):
-        return sql
+        # numbered, sqlite binds them without looking up names
+        return parse_sql(sql).render_positional("?{index}")
 
-    @staticmethod
-    def select(conn, _query_name, sql, parameters, record_class=None):
-        cur = conn.cursor()
-        cur.execute(sql, parameters)
+    def _execute(self, conn, query_name, sql, parameters, many=False):
+        cur = self.statement_cache.checkout(conn, query_name)
+        if cur is None:
+            cur = conn.cursor()
+        else:
+            # cursors copy the row factory of their connection when created
+            cur.row_factory = conn.row_factory
+
+        try:
+            if many:
+                cur.executemany(sql, parameters)
+            else:
+                cur.execute(sql, parameters)
+        except sqlite3.ProgrammingError:
+            # most likely a closed connection, none of its cursors are usable
+            self.statement_cache.evict(conn)
+            raise
+        except BaseException:
+            # checked out, so it is neither put back nor left open
+            _close_cursor(cur)
+            raise
+        return cur
+
+    def select(self, conn, query_name, sql, parameters, record_class=None):
+        cur = self._execute(conn, query_name, sql, parameters)
         results = cur.fetchall()
         if record_class is not None:
-            column_names = [c[0] for c in cur.description]
-            results = [record_class(**dict(zip(column_names, row))) for row in results]
-        cur.close()
+            mapper = get_row_mapper(record_class, cur.description)
+            results = list(map(mapper, results))
+        self.statement_cache.put(conn, query_name, cur)
         return results
 
     @staticmethod
     def select_one(conn, _query_name, sql, parameters, record_class=None):
+        # not cached, closing resets a statement that may have more rows where
+        # a cached cursor would keep it active along with its read lock
         cur = conn.cursor()
         cur.execute(sql, parameters)
         result = cur.fetchone()
         if result is not None and record_class is not None:
-            column_names = [c[0] for c in cur.description]
-            result = record_class(**dict(zip(column_names, result)))
+            result = get_row_mapper(record_class, cur.description)(result)
         cur.close()
         return result
 
     @staticmethod
-    def insert_update_delete(conn, _query_name, sql, parameters):
-        conn.execute(sql, parameters)
+    def explain(conn, _query_name, sql, parameters):
+        cur = conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+        plan = cur.fetchall()
+        cur.close()
+        return plan
+
+    @staticmethod
+    def begin(conn, savepoint=None):
+        if savepoint is not None:
+            conn.execute(f"SAVEPOINT {savepoint}").close()
+        elif not conn.in_transaction:
+            # explicit, connections in autocommit mode would not open one
+            conn.execute("BEGIN").close()
+
+    @staticmethod
+    def commit(conn, savepoint=None):
+        if savepoint is not None:
+            conn.execute(f"RELEASE SAVEPOINT {savepoint}").close()
+        else:
+            conn.commit()
+
+    @staticmethod
+    def rollback(conn, savepoint=None):
+        if savepoint is not None:
+            conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}").close()
+            conn.execute(f"RELEASE SAVEPOINT {savepoint}").close()
+        else:
+            conn.rollback()
+
+    def select_columns(self, conn, query_name, sql, parameters, fetch_size=100):
+        cur = self._execute(conn, query_name, sql, parameters)
+        # plain tuples whatever the connection's row factory
+        cur.row_factory = None
+        columns = ColumnsBuilder(cur.description)
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            columns.add(rows)
+            if len(rows) < fetch_size:
+                break
+        self.statement_cache.put(conn, query_name, cur)
+        return columns.build()
 
     @staticmethod
-    def insert_update_delete_many(conn, _query_name, sql, parameters):
-        conn.execute(sql, parameters)
+    @contextmanager
+    def select_cursor(conn, _query_name, sql, parameters):
+        # handed out to the caller, so never shared through the cache
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, parameters)
+            yield cur
+        finally:
+            cur.close()
+
+    @staticmethod
+    def execute_script(conn, _query_name, sql):
+        # commits a pending transaction first, see scripts_commit
+        conn.executescript(sql).close()
+
+    def insert_update_delete(self, conn, query_name, sql, parameters):
+        cur = self._execute(conn, query_name, sql, parameters)
+        rowcount = cur.rowcount
+        self.statement_cache.put(conn, query_name, cur)
+        return rowcount
+
+    def insert_update_delete_many(self, conn, query_name, sql, parameters):
+        # executemany pulls rows from the iterable as it goes, so a generator
+        # is streamed through without being held in memory
+        cur = self._execute(conn, query_name, sql, parameters, many=True)
+        rowcount = cur.rowcount
+        self.statement_cache.put(conn, query_name, cur)
+        return rowcount
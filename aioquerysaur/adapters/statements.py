@@ -0,0 +1,158 @@
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+
+class StatementCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class StatementCache:
+    """
+    Prepared statements or driver cursors kept per connection and query name,
+    at most ``maxsize`` of them per connection in least recently used order.
+    Cached cursors and statements refer to their connection, so it is rarely
+    collected while cached: connections stay until evict() is called, e.g.
+    by a pool discarding them, or until more than ``max_connections`` are
+    cached and the least recently used one is dropped.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        close: Optional[Callable[[Any], None]] = None,
+        max_connections: int = 64,
+    ):
+        self.maxsize = maxsize
+        self.max_connections = max_connections
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # called with each statement dropped from the cache
+        self._close = close
+        # id(conn) -> (conn or a weak reference to it, statements by name)
+        self._connections: "OrderedDict[int, Tuple[Any, OrderedDict]]" = OrderedDict()
+        # reentrant, a collected connection may be forgotten while it is held
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        # adapters are sent to worker processes, where none of the
+        # connections exist, so the statements and the lock stay behind
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_connections"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def _statements(self, conn) -> Optional[OrderedDict]:
+        entry = self._connections.get(id(conn))
+        return entry[1] if entry is not None else None
+
+    def get(self, conn, query_name: str) -> Any:
+        """
+        Statement cached for query_name, it stays cached while in use
+        """
+        with self._lock:
+            statements = self._statements(conn)
+            statement = statements.get(query_name) if statements else None
+            if statement is None:
+                self.misses += 1
+                return None
+            statements.move_to_end(query_name)
+            self.hits += 1
+            return statement
+
+    def checkout(self, conn, query_name: str) -> Any:
+        """
+        Statement cached for query_name, taken out of the cache until it is
+        put back so no one else uses it meanwhile
+        """
+        with self._lock:
+            statements = self._statements(conn)
+            statement = statements.pop(query_name, None) if statements else None
+            if statement is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return statement
+
+    def put(self, conn, query_name: str, statement: Any) -> None:
+        dropped = []
+        with self._lock:
+            statements = self._statements(conn)
+            if statements is None:
+                statements = self._add_connection(conn, dropped)
+
+            previous = statements.pop(query_name, None)
+            if previous is not None and previous is not statement:
+                dropped.append(previous)
+            statements[query_name] = statement
+            self._connections.move_to_end(id(conn))
+
+            while len(statements) > self.maxsize:
+                dropped.append(statements.popitem(last=False)[1])
+                self.evictions += 1
+
+        self._close_all(dropped)
+
+    def evict(self, conn) -> None:
+        """
+        Drops everything cached for conn, e.g. once it is closed
+        """
+        with self._lock:
+            entry = self._connections.pop(id(conn), None)
+            if entry is None:
+                return
+            self.evictions += len(entry[1])
+        self._close_all(entry[1].values())
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._connections.values())
+            self._connections.clear()
+        for _, statements in entries:
+            self._close_all(statements.values())
+
+    def cache_info(self) -> StatementCacheInfo:
+        with self._lock:
+            currsize = sum(len(s) for _, s in self._connections.values())
+        return StatementCacheInfo(
+            self.hits, self.misses, self.evictions, self.maxsize, currsize
+        )
+
+    def _add_connection(self, conn, dropped) -> OrderedDict:
+        key = id(conn)
+        try:
+            # forget the connection if it is collected, before its id can be
+            # reused
+            ref: Any = weakref.ref(conn, lambda _: self._forget(key))
+        except TypeError:
+            # e.g. sqlite3.Connection, held until evicted
+            ref = conn
+        statements: OrderedDict = OrderedDict()
+        self._connections[key] = (ref, statements)
+
+        while len(self._connections) > self.max_connections:
+            _, (_, evicted) = self._connections.popitem(last=False)
+            self.evictions += len(evicted)
+            dropped.extend(evicted.values())
+        return statements
+
+    def _forget(self, key: int) -> None:
+        with self._lock:
+            entry = self._connections.pop(key, None)
+            if entry is not None:
+                self.evictions += len(entry[1])
+
+    def _close_all(self, statements) -> None:
+        if self._close is not None:
+            for statement in list(statements):
+                self._close(statement)
@@ -0,0 +1,114 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .queries import QueriesContainer
+
+Call = Tuple[Callable[..., Any], tuple, dict]
+
+
+class _BatchQueries:
+    # records calls of the query methods of a container and its children
+    # instead of making them
+
+    def __init__(self, queries: "QueriesContainer", calls: List[Call]):
+        self._queries = queries
+        self._calls = calls
+
+    def __getattr__(self, name: str):
+        from .queries import QueriesContainer, _method_names
+
+        attr = getattr(self._queries, name)
+        if isinstance(attr, QueriesContainer):
+            return _BatchQueries(attr, self._calls)
+        for query_datum in self._queries._query_data.values():
+            query_name = query_datum.query_name
+            if name in (f"{query_name}_cursor", f"{query_name}_iter"):
+                # their results are only usable while the cursor is open
+                raise AttributeError(
+                    f"{name!r} can not be batched, cursors and iterators are not"
+                    " supported in batches"
+                )
+            if name in _method_names(
+                query_name, query_datum.operation_type, self._queries.driver_adapter
+            ):
+                break
+        else:
+            raise AttributeError(f"{name!r} is not a query method that can be batched")
+
+        def record(*args, **kwargs) -> int:
+            self._calls.append((attr, args, kwargs))
+            return len(self._calls) - 1
+
+        return record
+
+
+class QueryBatch(_BatchQueries):
+    """
+    Query calls collected to be made together by run(), which returns their
+    results in call order. Calls of sync drivers are made one after another.
+
+        batch = queries.batch()
+        batch.get_user(conn, id=1)
+        batch.orders.get_open(conn, user_id=1)
+        user, open_orders = batch.run()
+    """
+
+    def __init__(self, queries: "QueriesContainer"):
+        super().__init__(queries, [])
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def run(self) -> List[Any]:
+        calls, self._calls[:] = list(self._calls), []
+        return [fn(*args, **kwargs) for fn, args, kwargs in calls]
+
+
+class AsyncQueryBatch(QueryBatch):
+    """
+    Query calls collected to be made together by ``await run()``, which
+    returns their results in call order. Calls on pooled connections run
+    concurrently, each on a connection of its own, unless a connection is
+    pinned by connection(). Calls on a given connection are made one after
+    another, calls on different connections run concurrently.
+    Once all calls are done the first error in call order is raised.
+    """
+
+    async def run(self) -> List[Any]:
+        calls, self._calls[:] = list(self._calls), []
+        pool = self._queries.pool
+
+        if self._queries.router is not None:
+            # routed calls may share a node that is a plain connection
+            groups = [list(range(len(calls)))]
+        elif pool is not None:
+            if pool.pinned() is not None:
+                groups = [list(range(len(calls)))]
+            else:
+                groups = [[i] for i in range(len(calls))]
+        else:
+            by_conn: Dict[int, List[int]] = {}
+            for i, (_, args, _) in enumerate(calls):
+                by_conn.setdefault(id(args[0]) if args else 0, []).append(i)
+            groups = list(by_conn.values())
+
+        results: List[Any] = [None] * len(calls)
+
+        async def run_group(group: List[int]):
+            for i in group:
+                fn, args, kwargs = calls[i]
+                try:
+                    results[i] = await fn(*args, **kwargs)
+                except Exception as e:
+                    results[i] = e
+                    # later calls on the connection may depend on this one
+                    for j in group[group.index(i) + 1 :]:
+                        results[j] = e
+                    return
+
+        await asyncio.gather(*map(run_group, groups))
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
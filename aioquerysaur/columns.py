@@ -0,0 +1,101 @@
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+Column = Union[List[Any], array, Any]
+
+# postgres type oids (psycopg2) and names (asyncpg) stored as machine numbers
+_INT_TYPES = {20, 21, 23, 26, "int2", "int4", "int8", "oid"}
+_FLOAT_TYPES = {700, 701, "float4", "float8"}
+_BOOL_TYPES = {16, "bool"}
+
+
+def _kind(type_code: Any) -> Optional[str]:
+    # array typecode of a described column type, "bool" or None
+    try:
+        if type_code in _INT_TYPES:
+            return "q"
+        elif type_code in _FLOAT_TYPES:
+            return "d"
+        elif type_code in _BOOL_TYPES:
+            return "bool"
+    except TypeError:
+        # unhashable type codes tell nothing
+        pass
+    return None
+
+
+def _value_typecode(value: Any) -> Optional[str]:
+    # sqlite3 describes no types, the first value of a column does
+    if type(value) is int:
+        return "q"
+    elif type(value) is float:
+        return "d"
+    return None
+
+
+class ColumnsBuilder:
+    """
+    Collects rows fetched in batches into a list or array per column,
+    without keeping the rows. Integer and float columns go into
+    ``array.array`` and become NumPy arrays when NumPy is installed,
+    other columns are lists, or NumPy object arrays.
+    """
+
+    def __init__(
+        self, description: Sequence[Sequence], use_numpy: Optional[bool] = None
+    ):
+        self.names = [column[0] for column in description]
+        self.type_codes = [
+            column[1] if len(column) > 1 else None for column in description
+        ]
+        self.kinds = [_kind(type_code) for type_code in self.type_codes]
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        if self.use_numpy and numpy is None:
+            raise ImportError("numpy is needed for use_numpy=True")
+        self._columns: Optional[List[Column]] = None
+
+    def add(self, rows: Sequence[Sequence]):
+        if not rows:
+            return
+        if self._columns is None:
+            self._columns = [self._new_column(i, rows) for i in range(len(self.names))]
+
+        for i, values in enumerate(zip(*rows)):
+            column = self._columns[i]
+            size = len(column)
+            try:
+                column.extend(values)
+            except (TypeError, OverflowError):
+                # a NULL or another type than the column started with, the
+                # values before it were added already
+                column = self._columns[i] = column[:size].tolist()
+                column.extend(values)
+
+    def build(self) -> Dict[str, Column]:
+        columns = self._columns
+        if columns is None:
+            columns = [array(kind) if kind in ("q", "d") else [] for kind in self.kinds]
+        if self.use_numpy:
+            columns = [self._to_numpy(i, column) for i, column in enumerate(columns)]
+        return dict(zip(self.names, columns))
+
+    def _new_column(self, i: int, rows: Sequence[Sequence]) -> Column:
+        kind = self.kinds[i]
+        if kind is None and self.type_codes[i] is None:
+            kind = _value_typecode(rows[0][i])
+        return array(kind) if kind in ("q", "d") else []
+
+    def _to_numpy(self, i: int, column: Column):
+        if isinstance(column, array):
+            # shares the array's buffer instead of copying it
+            return numpy.frombuffer(column, dtype=column.typecode)
+        if self.kinds[i] == "bool" and None not in column:
+            return numpy.array(column, dtype=bool)
+        result = numpy.empty(len(column), dtype=object)
+        result[:] = column
+        return result
@@ -4,3 +4,17 @@ class SQLLoadException(Exception):
 
 class SQLParseException(Exception):
     pass
+
+
+class SQLPoolException(Exception):
+    pass
+
+
+class SQLValidationException(SQLLoadException):
+    def __init__(self, problems):
+        # QueryProblem of every query that failed validation
+        self.problems = problems
+        super().__init__(
+            f"{len(problems)} problem(s) found validating queries:\n"
+            + "\n".join(map(str, problems))
+        )
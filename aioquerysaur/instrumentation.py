@@ -0,0 +1,301 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Sequence
+
+from .models import SQLOperationType
+
+# histogram bucket upper bounds in seconds, four per doubling from 1us to ~2 min
+BUCKET_BOUNDS = tuple(1e-6 * 2 ** (i / 4) for i in range(108))
+
+
+class QueryEvent(NamedTuple):
+    query_name: str
+    operation_type: SQLOperationType
+    # None in before hooks
+    duration: Optional[float] = None
+    # rows returned by selects, rows affected by writes when the driver says
+    rowcount: Optional[int] = None
+    error: Optional[BaseException] = None
+
+
+Hook = Callable[[QueryEvent], Any]
+
+
+class QuerySample(NamedTuple):
+    query_name: str
+    operation_type: SQLOperationType
+    sql: str
+    # None for >> queries
+    parameters: Any
+    duration: float
+    rowcount: Optional[int]
+    error: Optional[BaseException]
+    # time.time() of the end of the call
+    timestamp: float
+    # rows of EXPLAIN / EXPLAIN QUERY PLAN when the profiler explains
+    plan: Optional[List[Any]] = None
+
+
+_NOT_EXPLAINED = (SQLOperationType.INSERT_UPDATE_DELETE_MANY, SQLOperationType.SCRIPT)
+
+
+def result_rowcount(operation_type: SQLOperationType, result: Any) -> Optional[int]:
+    if operation_type == SQLOperationType.SELECT:
+        if isinstance(result, dict):
+            # columns of a <query>_columns call
+            return len(next(iter(result.values()), ()))
+        return len(result)
+    elif operation_type == SQLOperationType.SELECT_ONE:
+        return 0 if result is None else 1
+    return result if isinstance(result, int) else None
+
+
+class LatencyHistogram:
+    """
+    Log scale histogram of durations, percentiles are the upper bound of
+    the bucket they fall in, so within 19% of the actual value
+    """
+
+    def __init__(self, bounds: Sequence[float] = BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, duration: float):
+        self.counts[bisect_left(self.bounds, duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                bound = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+
+class QueryStats:
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def record(self, duration: float, rowcount: Optional[int], failed: bool):
+        with self._lock:
+            self.histogram.record(duration)
+            if failed:
+                self.errors += 1
+            if rowcount is not None and rowcount > 0:
+                self.rows += rowcount
+
+    def clear(self):
+        with self._lock:
+            self.histogram = LatencyHistogram()
+            self.errors = 0
+            self.rows = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            histogram = self.histogram
+            count = histogram.count
+            return {
+                "calls": count,
+                "errors": self.errors,
+                "rows": self.rows,
+                "total": histogram.total,
+                "mean": histogram.total / count if count else 0.0,
+                "min": histogram.min if count else 0.0,
+                "max": histogram.max,
+                "p50": histogram.percentile(50),
+                "p90": histogram.percentile(90),
+                "p99": histogram.percentile(99),
+            }
+
+
+class QueryProfiler:
+    """
+    Keeps the last ``maxlen`` sampled calls, a ``sample_rate`` fraction of
+    all calls plus every call taking ``threshold`` seconds or more. With
+    ``explain`` the plan of sampled queries is fetched by the adapter on
+    the connection they ran on.
+    """
+
+    def __init__(
+        self,
+        driver_adapter: Any,
+        sample_rate: float = 0.0,
+        threshold: Optional[float] = None,
+        maxlen: int = 1000,
+        explain: bool = False,
+    ):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"sample_rate must be between 0 and 1, got {sample_rate}")
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        # adapters without an explain() method give no plans
+        self._explain = getattr(driver_adapter, "explain", None) if explain else None
+        self.samples: Deque[QuerySample] = deque(maxlen=maxlen)
+
+    def wants(self, duration: float) -> bool:
+        return (self.threshold is not None and duration >= self.threshold) or (
+            self.sample_rate > 0.0 and random.random() < self.sample_rate
+        )
+
+    def record(
+        self,
+        conn: Any,
+        query_name: str,
+        operation_type: SQLOperationType,
+        sql: str,
+        parameters: Any,
+        duration: float,
+        rowcount: Optional[int],
+        error: Optional[BaseException] = None,
+    ):
+        plan = None
+        if self._should_explain(conn, operation_type, error):
+            try:
+                plan = self._explain(conn, query_name, sql, parameters)
+            except Exception:
+                pass
+        self._add(
+            query_name, operation_type, sql, parameters, duration, rowcount, error, plan
+        )
+
+    async def arecord(
+        self,
+        conn: Any,
+        query_name: str,
+        operation_type: SQLOperationType,
+        sql: str,
+        parameters: Any,
+        duration: float,
+        rowcount: Optional[int],
+        error: Optional[BaseException] = None,
+    ):
+        plan = None
+        if self._should_explain(conn, operation_type, error):
+            try:
+                plan = await self._explain(conn, query_name, sql, parameters)
+            except Exception:
+                pass
+        self._add(
+            query_name, operation_type, sql, parameters, duration, rowcount, error, plan
+        )
+
+    def clear(self):
+        self.samples.clear()
+
+    def _should_explain(self, conn, operation_type, error) -> bool:
+        # a failed query may have left the connection unusable until rollback,
+        # scripts hold several statements EXPLAIN cannot take
+        return (
+            self._explain is not None
+            and conn is not None
+            and error is None
+            and operation_type not in _NOT_EXPLAINED
+        )
+
+    def _add(
+        self,
+        query_name,
+        operation_type,
+        sql,
+        parameters,
+        duration,
+        rowcount,
+        error,
+        plan,
+    ):
+        if operation_type == SQLOperationType.INSERT_UPDATE_DELETE_MANY:
+            # possibly a consumed iterator or many thousand rows
+            parameters = None
+        self.samples.append(
+            QuerySample(
+                query_name,
+                operation_type,
+                sql,
+                parameters,
+                duration,
+                rowcount,
+                error,
+                time.time(),
+                plan,
+            )
+        )
+
+
+class Instrumentation:
+    """
+    Hooks called before and after each query execution and per query
+    latency histograms, attached to a QueriesContainer by instrument().
+    Hooks get a QueryEvent, they may be added or removed at any time.
+    """
+
+    def __init__(
+        self,
+        before: Optional[List[Hook]] = None,
+        after: Optional[List[Hook]] = None,
+    ):
+        self.before: List[Hook] = list(before or [])
+        self.after: List[Hook] = list(after or [])
+        self.query_stats: Dict[str, QueryStats] = {}
+        # set by QueriesContainer.profile()
+        self.profiler: Optional[QueryProfiler] = None
+
+    def stats_for(self, query_name: str) -> QueryStats:
+        stats = self.query_stats.get(query_name)
+        if stats is None:
+            stats = self.query_stats[query_name] = QueryStats()
+        return stats
+
+    def child(self) -> "Instrumentation":
+        # own histograms, shared hooks
+        child = Instrumentation()
+        child.before, child.after = self.before, self.after
+        child.profiler = self.profiler
+        return child
+
+    def started(self, query_name: str, operation_type: SQLOperationType):
+        if self.before:
+            event = QueryEvent(query_name, operation_type)
+            for hook in self.before:
+                hook(event)
+
+    def finished(
+        self,
+        stats: QueryStats,
+        query_name: str,
+        operation_type: SQLOperationType,
+        duration: float,
+        rowcount: Optional[int],
+        error: Optional[BaseException] = None,
+    ):
+        stats.record(duration, rowcount, error is not None)
+        if self.after:
+            event = QueryEvent(query_name, operation_type, duration, rowcount, error)
+            for hook in self.after:
+                hook(event)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: s.snapshot() for name, s in sorted(self.query_stats.items())}
+
+    def reset(self):
+        for stats in self.query_stats.values():
+            stats.clear()
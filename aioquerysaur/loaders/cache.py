@@ -0,0 +1,142 @@
+import atexit
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .. import __version__
+from ..models import DriverAdapterProtocol, QueryDatum
+
+CACHE_FORMAT_VERSION = 5
+
+# content signature of the source file and the query data parsed from it
+Signature = Tuple[int, bytes]
+CacheEntry = Tuple[Signature, List[QueryDatum]]
+
+
+def _adapter_key(driver_adapter: DriverAdapterProtocol) -> str:
+    adapter_cls = type(driver_adapter)
+    return f"{adapter_cls.__module__}.{adapter_cls.__qualname__}"
+
+
+def file_signature(file_path: Path) -> Tuple[int, int]:
+    stat = file_path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def content_signature(file_path: Path) -> Signature:
+    # size and hash of the contents, mtimes are neither precise enough to
+    # catch every edit nor kept by every checkout
+    contents = file_path.read_bytes()
+    return len(contents), hashlib.blake2b(contents, digest_size=16).digest()
+
+
+class QueryDataCache:
+    """
+    Parsed query data persisted between processes, reused for a sql file
+    as long as its contents are unchanged, see content_signature()
+    """
+
+    def __init__(
+        self, cache_path: Union[str, Path], driver_adapter: DriverAdapterProtocol
+    ):
+        self.cache_path = Path(cache_path)
+        self.header = (CACHE_FORMAT_VERSION, __version__, _adapter_key(driver_adapter))
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, CacheEntry] = self._read()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._save_delay: Optional[float] = None
+        self._save_timer: Optional[threading.Timer] = None
+
+    def _read(self) -> Dict[str, CacheEntry]:
+        try:
+            with self.cache_path.open("rb") as fp:
+                header, entries = pickle.load(fp)
+        except Exception:
+            # missing, truncated or foreign cache files are just a cold start
+            return {}
+        return entries if header == self.header else {}
+
+    def get(self, file_path: Path, signature: Signature) -> Optional[List[QueryDatum]]:
+        entry = self._entries.get(os.path.abspath(file_path))
+        if entry is not None and entry[0] == signature:
+            self.hits += 1
+            return list(entry[1])
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        file_path: Path,
+        signature: Signature,
+        query_data: List[QueryDatum],
+    ):
+        # signature must be taken before the file was read, so a concurrent
+        # edit invalidates the entry instead of being masked by it
+        with self._lock:
+            self._entries[os.path.abspath(file_path)] = (signature, list(query_data))
+            self._dirty = True
+            if self._save_delay is not None and self._save_timer is None:
+                self._save_timer = threading.Timer(self._save_delay, self._save_later)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def autosave(self, delay: float = 1.0):
+        """
+        Saves from a background thread ``delay`` seconds after query data is
+        first set, once for every file parsed meanwhile, and again when the
+        interpreter exits. For files parsed as they are first needed: writes
+        stay off the path of the calls that trigger the parsing, and are not
+        lost to processes that are killed rather than exit
+        """
+        if self._save_delay is None:
+            atexit.register(self.save)
+        self._save_delay = delay
+
+    def _save_later(self):
+        with self._lock:
+            self._save_timer = None
+        try:
+            self.save()
+        except OSError:
+            # left dirty, the next save retries
+            pass
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            ours = dict(self._entries)
+            self._dirty = False
+
+        # keep what other processes stored meanwhile, ours win on conflicts
+        entries = {
+            path: entry
+            for path, entry in {**self._read(), **ours}.items()
+            if os.path.exists(path)
+        }
+
+        # write next to the target and rename, so concurrent readers and
+        # writers only ever see a complete file
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.cache_path.parent, prefix=f".{self.cache_path.name}."
+        )
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump((self.header, entries), fp, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            with self._lock:
+                self._dirty = True
+            raise
+
+        with self._lock:
+            # entries set while writing are kept for the next save
+            self._entries = {**entries, **self._entries}
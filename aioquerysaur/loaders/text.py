@@ -1,28 +1,60 @@
 import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from copy import copy
 
 from ..exceptions import SQLLoadException, SQLParseException
+from ..mappers import AutoRecord
 from ..models import QueryDatum, SQLOperationType
+from ..results import parse_cache_options
+from ..tokenizer import PositionalSQL, parse_sql
+from .cache import content_signature
 
 
 class Patterns:
     VALID_QUERY = re.compile(r"^\w+$")
     QUERY_NAME_DEFINITION = re.compile(r"--\s*name\s*:\s*")
+    QUERY_NAME_LINE = re.compile(r"--\s*name\s*:\s*(\S*)")
+    QUERY_DIRECTIVE = re.compile(
+        r"--\s*(?P<name>cache|invalidates|record_class)\s*:\s*(?P<value>.*?)\s*$"
+    )
 
 
 class DescriptionSuffix:
     SELECT_ONE = "$"
     INSERT_UPDATE_DELETE = ">"
     INSERT_UPDATE_DELETE_MANY = ">>"
+    SCRIPT = "#"
+
+
+_READ_OPERATIONS = (SQLOperationType.SELECT, SQLOperationType.SELECT_ONE)
+
+
+def _check_unique(query_data, file_path=None):
+    # a later query of the same name would silently replace the earlier one
+    query_names = set()
+    for query_datum in query_data:
+        if query_datum.query_name in query_names:
+            where = f" in {file_path}" if file_path is not None else ""
+            raise SQLLoadException(
+                f'Duplicate query name "{query_datum.query_name}"{where}'
+            )
+        query_names.add(query_datum.query_name)
 
 
 class TextLoader:
-    def __init__(self, driver_adapter, record_classes):
+    def __init__(
+        self, driver_adapter, record_classes, cache=None, auto_record_classes=False
+    ):
         self.driver_adapter = driver_adapter
+        # record classes by the name given in "-- record_class:" directives
         self.record_classes = record_classes if record_classes is not None else {}
+        self.cache = cache
+        # selects without a record class get an AutoRecord
+        self.auto_record_classes = auto_record_classes
 
-    def _make_query_datum(self, query_str):
-        lines = [line.strip() for line in query_str.strip().splitlines()]
-        query_name = lines[0].replace("-", "_")
+    @staticmethod
+    def _parse_query_name(name_line):
+        query_name = name_line.replace("-", "_")
 
         if query_name.endswith(DescriptionSuffix.SELECT_ONE):
             operation_type = SQLOperationType.SELECT_ONE
@@ -33,48 +65,208 @@ class TextLoader:
         elif query_name.endswith(DescriptionSuffix.INSERT_UPDATE_DELETE):
             operation_type = SQLOperationType.INSERT_UPDATE_DELETE
             query_name = query_name[:-1]
+        elif query_name.endswith(DescriptionSuffix.SCRIPT):
+            operation_type = SQLOperationType.SCRIPT
+            query_name = query_name[:-1]
         else:
             operation_type = SQLOperationType.SELECT
 
-        sql = "\n".join(lines[1:])
+        return query_name, operation_type
+
+    @staticmethod
+    def _parse_directives(query_name, operation_type, sql):
+        # directive comments sit between the name line and the sql, other
+        # comments are left where they are
+        directives = {}
+        lines = sql.split("\n")
+        for i, line in enumerate(lines):
+            if not line.lstrip().startswith("--"):
+                break
+            match = Patterns.QUERY_DIRECTIVE.match(line.strip())
+            if match is not None:
+                directives[match.group("name")] = match.group("value")
+                lines[i] = None
+
+        if "cache" in directives:
+            if operation_type not in _READ_OPERATIONS:
+                raise SQLParseException(
+                    f'Only select queries can be cached, "{query_name}" is not one'
+                )
+            parse_cache_options(query_name, directives["cache"])
+        if "invalidates" in directives and operation_type in _READ_OPERATIONS:
+            raise SQLParseException(
+                f'Only write queries can invalidate caches, "{query_name}" is a select'
+            )
+        if "record_class" in directives and operation_type not in _READ_OPERATIONS:
+            raise SQLParseException(
+                f'Only select queries return records, "{query_name}" is not one'
+            )
+
+        sql = "\n".join(line for line in lines if line is not None)
+        return sql, directives or None
+
+    def _make_query_datum(self, query_str):
+        name_line, _, sql = query_str.strip().partition("\n")
+        query_name, operation_type = self._parse_query_name(name_line.strip())
 
         if not Patterns.VALID_QUERY.match(query_name) or not query_name:
             raise SQLParseException(
                 f'name must convert to valid python variable, got "{query_name}".'
             )
 
-        sql = self.driver_adapter.process_sql(query_name, operation_type, sql.strip())
+        directives = None
+        sql = sql.strip()
+        if sql.startswith("--"):
+            sql, directives = self._parse_directives(query_name, operation_type, sql)
 
-        return QueryDatum(query_name, operation_type, sql, record_class=None)
+        # tokenized once here, adapters render their placeholders from it
+        parsed_sql = parse_sql(sql.strip())
+        if operation_type == SQLOperationType.SCRIPT:
+            # run as written in one call, drivers take no parameters for those
+            if parsed_sql.parameters:
+                raise SQLParseException(
+                    f'Scripts take no parameters, "{query_name}" uses '
+                    f"{', '.join(parsed_sql.unique_parameters)}"
+                )
+            sql = str(parsed_sql)
+        else:
+            sql = self.driver_adapter.process_sql(
+                query_name, operation_type, parsed_sql
+            )
 
-    def load_query_data_from_sql(self, sql):
-        query_data = []
+        return QueryDatum(
+            query_name,
+            operation_type,
+            sql,
+            record_class=None,
+            directives=directives,
+            parameters=sql.parameters if isinstance(sql, PositionalSQL) else None,
+        )
+
+    def _with_record_class(self, query_datum):
+        # set on every load, neither the cache nor worker processes ever
+        # pickle the classes, see _parse_file
+        name = (query_datum.directives or {}).get("record_class")
+        if name is not None:
+            try:
+                record_class = self.record_classes[name]
+            except KeyError:
+                raise SQLLoadException(
+                    f'Unknown record_class "{name}" for "{query_datum.query_name}"'
+                ) from None
+        elif (
+            self.auto_record_classes and query_datum.operation_type in _READ_OPERATIONS
+        ):
+            record_class = AutoRecord(query_datum.query_name)
+        else:
+            return query_datum
+        return query_datum._replace(record_class=record_class)
+
+    def _parse_sql(self, sql):
+        # query data without record classes
         query_sql_strs = Patterns.QUERY_NAME_DEFINITION.split(sql)
+        return [self._make_query_datum(s) for s in query_sql_strs[1:]]
 
-        for query_sql_str in query_sql_strs[1:]:
-            query_data.append(self._make_query_datum(query_sql_str))
+    def load_query_data_from_sql(self, sql):
+        query_data = [self._with_record_class(d) for d in self._parse_sql(sql)]
+        _check_unique(query_data)
+        return query_data
+
+    def _parse_file(self, file_path):
+        # query data as cached and sent back by worker processes, record
+        # classes are set by the caller
+        if self.cache is not None:
+            signature = content_signature(file_path)
+            query_data = self.cache.get(file_path, signature)
+            if query_data is not None:
+                return query_data
+
+        with file_path.open() as fp:
+            query_data = self._parse_sql(fp.read())
+        if self.cache is not None:
+            self.cache.set(file_path, signature, query_data)
         return query_data
 
     def load_query_data_from_file(self, file_path):
+        query_data = [self._with_record_class(d) for d in self._parse_file(file_path)]
+        _check_unique(query_data, file_path)
+        return query_data
+
+    def load_query_names_from_file(self, file_path):
+        # header scan only, the sql itself is neither validated nor processed
         with file_path.open() as fp:
-            return self.load_query_data_from_sql(fp.read())
+            return [
+                self._parse_query_name(match.group(1))
+                for match in Patterns.QUERY_NAME_LINE.finditer(fp.read())
+            ]
+
+    def load_query_lines_from_sql(self, sql):
+        # line of the name comment of each query, for validation errors
+        lines = {}
+        for match in Patterns.QUERY_NAME_LINE.finditer(sql):
+            query_name, _ = self._parse_query_name(match.group(1))
+            lines[query_name] = sql.count("\n", 0, match.start()) + 1
+        return lines
+
+    def _load_files(self, file_paths, workers=None, use_processes=False):
+        if not workers:
+            return [self._parse_file(p) for p in file_paths]
+
+        # the cache is only touched from this thread, workers parse the misses
+        results = {}
+        pending = []
+        for file_path in file_paths:
+            signature = None
+            if self.cache is not None:
+                signature = content_signature(file_path)
+                query_data = self.cache.get(file_path, signature)
+                if query_data is not None:
+                    results[file_path] = query_data
+                    continue
+            pending.append((file_path, signature))
 
-    def load_query_data_from_dir(self, dir_path):
+        # workers only parse, the classes are set here and may not pickle
+        loader = copy(self)
+        loader.cache = None
+        loader.record_classes = {}
+        if use_processes:
+            executor_cls = ProcessPoolExecutor
+            chunksize = max(1, len(pending) // (workers * 4))
+        else:
+            executor_cls = ThreadPoolExecutor
+            chunksize = 1
+
+        with executor_cls(max_workers=workers) as executor:
+            # map yields in submission order, so the first failing file in
+            # walk order is the one reported no matter how work was scheduled
+            parsed = executor.map(
+                loader._parse_file,
+                [file_path for file_path, _ in pending],
+                chunksize=chunksize,
+            )
+            for (file_path, signature), query_data in zip(pending, parsed):
+                if self.cache is not None:
+                    self.cache.set(file_path, signature, query_data)
+                results[file_path] = query_data
+
+        return [results[file_path] for file_path in file_paths]
+
+    def load_query_data_from_dir(self, dir_path, workers=None, use_processes=False):
         if not dir_path.is_dir():
             raise ValueError(f"The path {dir_path} must be a directory")
 
-        def _recurse_load_query_data_tree(path):
-            # queries = Queries()
+        sql_files = []
+
+        def _recurse_collect_query_data_tree(path):
             query_data_tree = {}
-            for p in path.iterdir():
+            for p in sorted(path.iterdir()):
                 if p.is_file() and p.suffix != ".sql":
                     continue
                 elif p.is_file() and p.suffix == ".sql":
-                    for query_datum in self.load_query_data_from_file(p):
-                        query_data_tree[query_datum.query_name] = query_datum
+                    sql_files.append((query_data_tree, p))
                 elif p.is_dir():
                     child_name = p.relative_to(dir_path).name
-                    child_query_data_tree = _recurse_load_query_data_tree(p)
+                    child_query_data_tree = _recurse_collect_query_data_tree(p)
                     query_data_tree[child_name] = child_query_data_tree
                 else:
                     # This should be practically unreachable.
@@ -83,4 +275,18 @@ class TextLoader:
                     )
             return query_data_tree
 
-        return _recurse_load_query_data_tree(dir_path)
+        # the tree is laid out from a sorted walk before any file is parsed,
+        # parsed files are then merged back in walk order
+        root_query_data_tree = _recurse_collect_query_data_tree(dir_path)
+        file_paths = [p for _, p in sql_files]
+        loaded = self._load_files(file_paths, workers, use_processes)
+
+        for (query_data_tree, p), query_data in zip(sql_files, loaded):
+            for query_datum in map(self._with_record_class, query_data):
+                if query_datum.query_name in query_data_tree:
+                    raise SQLLoadException(
+                        f'Duplicate query name "{query_datum.query_name}" in {p}'
+                    )
+                query_data_tree[query_datum.query_name] = query_datum
+
+        return root_query_data_tree
@@ -0,0 +1,180 @@
+import inspect
+import threading
+from collections import namedtuple
+from dataclasses import MISSING, fields, is_dataclass
+from functools import lru_cache, partial
+from operator import itemgetter
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+RowMapper = Callable[[Sequence], Any]
+
+
+def column_names(description: Sequence[Sequence]) -> Tuple[str, ...]:
+    return tuple(column[0] for column in description)
+
+
+class AutoRecord:
+    """
+    Record class of a query generated from the columns of its results when
+    they are first mapped, a namedtuple named after the query, e.g.
+    GetUsersRecord for get_users, so rows cost about as much as a tuple
+    """
+
+    def __init__(self, query_name: str):
+        self.query_name = query_name
+        self.typename = "".join(p.title() for p in query_name.split("_")) + "Record"
+        # by column names, a query's columns may differ e.g. after select *
+        # picks up a new column
+        self.record_types: Dict[Tuple[str, ...], type] = {}
+        self._lock = threading.Lock()
+
+    def record_type(self, columns: Tuple[str, ...]) -> type:
+        record_type = self.record_types.get(columns)
+        if record_type is None:
+            with self._lock:
+                record_type = self.record_types.get(columns)
+                if record_type is None:
+                    # invalid or duplicated column names become _0, _1...
+                    record_type = namedtuple(self.typename, columns, rename=True)
+                    self.record_types[columns] = record_type
+        return record_type
+
+    def __repr__(self):
+        return f"AutoRecord({self.query_name!r})"
+
+
+def get_row_mapper(
+    record_class: Callable, description: Sequence[Sequence]
+) -> RowMapper:
+    """
+    Returns a callable turning a single driver row into a ``record_class``
+    instance, compiled once per (record_class, column names) pair
+    """
+    return compile_row_mapper(record_class, column_names(description))
+
+
+def _reorder(indexes: Tuple[int, ...]) -> Callable[[Sequence], Tuple]:
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda row: (row[index],)
+    return itemgetter(*indexes)
+
+
+def _positional(
+    record_class: Callable, params: Sequence[str], columns: Tuple[str, ...]
+):
+    # calls record_class(*row) when columns cover the leading params,
+    # reordering the row only if the order of columns differs
+    if set(columns) != set(params[: len(columns)]):
+        return None
+
+    if tuple(params[: len(columns)]) == columns:
+        return lambda row: record_class(*row)
+
+    getter = _reorder(tuple(columns.index(name) for name in params[: len(columns)]))
+    return lambda row: record_class(*getter(row))
+
+
+def _namedtuple_mapper(record_class, columns):
+    if set(record_class._fields) != set(columns):
+        return None
+
+    new = partial(tuple.__new__, record_class)
+    if record_class._fields == columns:
+        return new
+
+    getter = _reorder(tuple(columns.index(name) for name in record_class._fields))
+    return lambda row: new(getter(row))
+
+
+def _dataclass_mapper(record_class, columns):
+    init_fields = [f.name for f in fields(record_class) if f.init]
+    required = [f.name for f in fields(record_class) if f.init and _is_required(f)]
+    if not set(required) <= set(columns):
+        return None
+    return _positional(record_class, init_fields, columns)
+
+
+def _is_required(field) -> bool:
+    return field.default is MISSING and field.default_factory is MISSING
+
+
+def _slots_mapper(record_class, columns):
+    # plain __slots__ classes without their own __init__ are filled through
+    # the slot descriptors directly
+    if record_class.__init__ is not object.__init__:
+        return None
+
+    slots = set()
+    for klass in record_class.__mro__:
+        names = getattr(klass, "__slots__", ())
+        slots.update((names,) if isinstance(names, str) else names)
+    if not set(columns) <= slots:
+        return None
+
+    new = record_class.__new__
+    setters = tuple(getattr(record_class, name).__set__ for name in columns)
+
+    def mapper(row):
+        record = new(record_class)
+        for setter, value in zip(setters, row):
+            setter(record, value)
+        return record
+
+    return mapper
+
+
+def _signature_mapper(record_class, columns):
+    try:
+        params = inspect.signature(record_class).parameters.values()
+    except (TypeError, ValueError):
+        return None
+
+    positional = []
+    for param in params:
+        if param.kind not in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+            break
+        positional.append(param.name)
+
+    required = [
+        p.name
+        for p in params
+        if p.default is p.empty and p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+    ]
+    if not set(required) <= set(columns):
+        return None
+    return _positional(record_class, positional, columns)
+
+
+@lru_cache(maxsize=512)
+def compile_row_mapper(record_class: Callable, columns: Tuple[str, ...]) -> RowMapper:
+    if record_class is tuple:
+        return tuple
+
+    if record_class is dict:
+        return lambda row: dict(zip(columns, row))
+
+    if isinstance(record_class, AutoRecord):
+        return partial(tuple.__new__, record_class.record_type(columns))
+
+    mapper = None
+    # duplicated column names can only be resolved by keyword, last one wins
+    if len(set(columns)) == len(columns):
+        if isinstance(record_class, type) and issubclass(record_class, tuple):
+            if hasattr(record_class, "_fields"):
+                mapper = _namedtuple_mapper(record_class, columns)
+        elif is_dataclass(record_class):
+            mapper = _dataclass_mapper(record_class, columns)
+        elif hasattr(record_class, "__slots__"):
+            mapper = _slots_mapper(record_class, columns) or _signature_mapper(
+                record_class, columns
+            )
+        else:
+            mapper = _signature_mapper(record_class, columns)
+
+    if mapper is None:
+
+        def mapper(row):
+            return record_class(**dict(zip(columns, row)))
+
+    return mapper
@@ -2,11 +2,17 @@ from enum import Enum
 from pathlib import Path
 from typing import (
     Any,
+    AsyncContextManager,
+    AsyncIterable,
+    AsyncIterator,
     Callable,
+    ContextManager,
     Dict,
+    Iterable,
     List,
     NamedTuple,
     Optional,
+    Tuple,
     Union,
 )
 
@@ -18,6 +24,7 @@ class SQLOperationType(Enum):
     SELECT_ONE = 2
     INSERT_UPDATE_DELETE = 3
     INSERT_UPDATE_DELETE_MANY = 4
+    SCRIPT = 5
 
 
 class QueryDatum(NamedTuple):
@@ -25,6 +32,11 @@ class QueryDatum(NamedTuple):
     operation_type: SQLOperationType
     sql: str
     record_class: Any = None
+    # "-- <directive>: <value>" comment lines read from above the sql
+    directives: Optional[Dict[str, str]] = None
+    # name bound to each position of the sql as processed by the adapter,
+    # None for adapters taking the parameters by name
+    parameters: Optional[Tuple[str, ...]] = None
 
 
 class QueryFn(Protocol):
@@ -62,14 +74,22 @@ class SyncDriverAdapterProtocol(Protocol):
     ) -> Optional[Any]:
         ...
 
+    def select_cursor(
+        self, conn: Any, query_name: str, sql: str, parameters: Union[List, Dict]
+    ) -> ContextManager[Any]:
+        ...
+
     def insert_update_delete(
         self, conn: Any, query_name: str, sql: str, parameters: Union[List, Dict]
     ):
         ...
 
     def insert_update_delete_many(
-        self, conn: Any, query_name: str, sql: str, parameters: Union[List, Dict]
-    ):
+        self, conn: Any, query_name: str, sql: str, parameters: Iterable[Any]
+    ) -> int:
+        ...
+
+    def execute_script(self, conn: Any, query_name: str, sql: str):
         ...
 
 
@@ -97,14 +117,37 @@ class AsyncDriverAdapterProtocol(Protocol):
     ) -> Optional[Any]:
         ...
 
+    def select_cursor(
+        self, conn: Any, query_name: str, sql: str, parameters: Union[List, Dict]
+    ) -> AsyncContextManager[Any]:
+        ...
+
+    def select_iter(
+        self,
+        conn: Any,
+        query_name: str,
+        sql: str,
+        parameters: Union[List, Dict],
+        record_class: Optional[Callable],
+        fetch_size: int,
+    ) -> AsyncIterator[Any]:
+        ...
+
     async def insert_update_delete(
         self, conn: Any, query_name: str, sql: str, parameters: Union[List, Dict]
     ):
         ...
 
     async def insert_update_delete_many(
-        self, conn: Any, query_name: str, sql: str, parameters: Union[List, Dict]
-    ):
+        self,
+        conn: Any,
+        query_name: str,
+        sql: str,
+        parameters: Union[Iterable[Any], AsyncIterable[Any]],
+    ) -> int:
+        ...
+
+    async def execute_script(self, conn: Any, query_name: str, sql: str):
         ...
 
 
@@ -120,7 +163,14 @@ class FileQueryLoaderProtocol(Protocol):
     def load_query_data_from_file(self, file_path: Path) -> List[QueryDatum]:
         ...
 
-    def load_query_data_from_dir(self, dir_path: Path) -> QueryDataTree:
+    def load_query_data_from_dir(
+        self, dir_path: Path, workers: Optional[int] = None, use_processes: bool = False
+    ) -> QueryDataTree:
+        ...
+
+    def load_query_names_from_file(
+        self, file_path: Path
+    ) -> List[Tuple[str, SQLOperationType]]:
         ...
 
 
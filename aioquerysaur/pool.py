@@ -0,0 +1,368 @@
+import asyncio
+import inspect
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from .exceptions import SQLPoolException
+
+
+def _pinned_var(pool) -> ContextVar:
+    # one variable per pool, so pools never see each other's pinned connection
+    return ContextVar(f"aioquerysaur_pinned_{id(pool)}", default=None)
+
+
+class _PoolBase:
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 10,
+        timeout: Optional[float] = 30.0,
+        health_check: Optional[Callable[[Any], Any]] = None,
+        health_check_interval: float = 0.0,
+    ):
+        if max_size < 1:
+            raise ValueError(f"max_size must be at least 1, got {max_size}")
+        # opens a new connection
+        self.connect = connect
+        self.max_size = max_size
+        # seconds acquire() waits for a free connection, None waits forever
+        self.timeout = timeout
+        # called with idle connections on acquire, a falsy result or an
+        # exception means the connection is closed and another one is used
+        self.health_check = health_check
+        # connections idle for less than this many seconds are not checked
+        self.health_check_interval = health_check_interval
+        # idle connections with the time they were released, last in first out
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        # open connections, idle or in use
+        self._size = 0
+        self._closed = False
+        # called with each connection the pool closes, e.g. to drop what
+        # adapters cached for it
+        self.on_discard: List[Callable[[Any], Any]] = []
+        self._pinned = _pinned_var(self)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def pinned(self) -> Any:
+        """
+        Connection pinned by connection() in the current context, if any
+        """
+        return self._pinned.get()
+
+    def _needs_check(self, released_at: float) -> bool:
+        return (
+            self.health_check is not None
+            and monotonic() - released_at >= self.health_check_interval
+        )
+
+    def _timeout_error(self) -> SQLPoolException:
+        return SQLPoolException(
+            f"No connection available within {self.timeout}s, "
+            f"all {self.max_size} are in use"
+        )
+
+
+class ConnectionPool(_PoolBase):
+    """
+    Thread safe pool of connections of a sync driver, e.g.
+    ``ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False))``
+    """
+
+    is_aio = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = threading.Condition()
+
+    def acquire(self) -> Any:
+        deadline = None if self.timeout is None else monotonic() + self.timeout
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    if self._closed:
+                        raise SQLPoolException("The pool is closed")
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise self._timeout_error()
+                    self._condition.wait(remaining)
+                if self._closed:
+                    raise SQLPoolException("The pool is closed")
+
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    conn, released_at = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    return self.connect()
+                except BaseException:
+                    self._forget()
+                    raise
+
+            if not self._needs_check(released_at) or self._is_healthy(conn):
+                return conn
+            self.discard(conn)
+
+    def release(self, conn: Any):
+        with self._condition:
+            if not self._closed:
+                self._idle.append((conn, monotonic()))
+                self._condition.notify()
+                return
+        self.discard(conn)
+
+    def discard(self, conn: Any):
+        """
+        Closes a connection taken from the pool instead of releasing it
+        """
+        try:
+            conn.close()
+        except Exception:
+            pass
+        try:
+            for hook in self.on_discard:
+                hook(conn)
+        finally:
+            self._forget()
+
+    def close(self):
+        """
+        Closes idle connections, connections in use are closed on release
+        """
+        with self._condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        for conn in idle:
+            self.discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Pins a connection to the current thread or task for the block, calls
+        made within it share that connection. The block commits on success
+        and rolls back on error, nested blocks reuse the outer connection.
+        """
+        conn = self._pinned.get()
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self.acquire()
+        token = self._pinned.set(conn)
+        try:
+            yield conn
+        except BaseException:
+            self._pinned.reset(token)
+            self._end(conn, "rollback")
+            raise
+        else:
+            self._pinned.reset(token)
+            self._end(conn, "commit")
+
+    def _end(self, conn, how):
+        try:
+            if getattr(conn, "in_transaction", True) and hasattr(conn, how):
+                getattr(conn, how)()
+        except Exception:
+            # whatever state the connection is in, it is not reused
+            self.discard(conn)
+            if how == "commit":
+                raise
+        else:
+            self.release(conn)
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            return bool(self.health_check(conn))
+        except Exception:
+            return False
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+
+class AsyncConnectionPool(_PoolBase):
+    """
+    Pool of connections of an async driver, ``connect`` may return the
+    connection or an awaitable of it, e.g.
+    ``AsyncConnectionPool(lambda: aiosqlite.connect(path))``
+    """
+
+    is_aio = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # created on first use, within the running loop: before Python 3.10
+        # it binds to the loop current at creation
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> Any:
+        try:
+            return await asyncio.wait_for(self._acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timeout_error() from None
+
+    async def _acquire(self) -> Any:
+        while True:
+            condition = self._get_condition()
+            async with condition:
+                await condition.wait_for(
+                    lambda: self._closed or self._idle or self._size < self.max_size
+                )
+                if self._closed:
+                    raise SQLPoolException("The pool is closed")
+
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    conn, released_at = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self.connect()
+                    if inspect.isawaitable(conn):
+                        conn = await conn
+                    return conn
+                except BaseException:
+                    await self._forget()
+                    raise
+
+            if not self._needs_check(released_at) or await self._is_healthy(conn):
+                return conn
+            await self.discard(conn)
+
+    async def release(self, conn: Any):
+        condition = self._get_condition()
+        async with condition:
+            if not self._closed:
+                self._idle.append((conn, monotonic()))
+                condition.notify()
+                return
+        await self.discard(conn)
+
+    async def discard(self, conn: Any):
+        """
+        Closes a connection taken from the pool instead of releasing it
+        """
+        try:
+            result = conn.close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            pass
+        try:
+            for hook in self.on_discard:
+                result = hook(conn)
+                if inspect.isawaitable(result):
+                    await result
+        finally:
+            await self._forget()
+
+    async def close(self):
+        """
+        Closes idle connections, connections in use are closed on release
+        """
+        condition = self._get_condition()
+        async with condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            condition.notify_all()
+        for conn in idle:
+            await self.discard(conn)
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Pins a connection to the current task for the block, calls made
+        within it share that connection. The block commits on success and
+        rolls back on error, nested blocks reuse the outer connection.
+        Tasks started inside the block inherit the pinned connection.
+        """
+        conn = self._pinned.get()
+        if conn is not None:
+            yield conn
+            return
+
+        conn = await self.acquire()
+        token = self._pinned.set(conn)
+        try:
+            yield conn
+        except BaseException:
+            self._pinned.reset(token)
+            await self._end(conn, "rollback")
+            raise
+        else:
+            self._pinned.reset(token)
+            await self._end(conn, "commit")
+
+    @asynccontextmanager
+    async def _borrow(self):
+        """
+        Like connection() without pinning, for async generators: they run
+        between yields in their caller's context and may be closed in
+        another one, where a pin could neither be seen nor reset
+        """
+        conn = self._pinned.get()
+        if conn is not None:
+            yield conn
+            return
+
+        conn = await self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            await self._end(conn, "rollback")
+            raise
+        else:
+            await self._end(conn, "commit")
+
+    async def _end(self, conn, how):
+        try:
+            if getattr(conn, "in_transaction", True) and hasattr(conn, how):
+                await getattr(conn, how)()
+        except Exception:
+            # whatever state the connection is in, it is not reused
+            await self.discard(conn)
+            if how == "commit":
+                raise
+        else:
+            await self.release(conn)
+
+    async def _is_healthy(self, conn) -> bool:
+        try:
+            result = self.health_check(conn)
+            if inspect.isawaitable(result):
+                result = await result
+            return bool(result)
+        except Exception:
+            return False
+
+    async def _forget(self):
+        condition = self._get_condition()
+        async with condition:
+            self._size -= 1
+            condition.notify()
@@ -1,14 +1,51 @@
-from types import MethodType
-from typing import Any, Callable, List, Tuple, Set, cast
+import re
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from operator import itemgetter
+from pathlib import Path
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Set,
+    Union,
+    cast,
+)
 
+from .batch import AsyncQueryBatch, QueryBatch
+from .exceptions import SQLLoadException, SQLPoolException
+from .instrumentation import Hook, Instrumentation, QueryProfiler, result_rowcount
 from .models import (
     DriverAdapterProtocol,
+    FileQueryLoaderProtocol,
     QueryDatum,
     QueryDataTree,
     QueryFn,
     SQLOperationType,
 )
 
+from .results import AsyncResultCache, ResultCache, cache_key, parse_cache_options
+from .transaction import AsyncTransaction, Transaction, current_transaction
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .pool import AsyncConnectionPool, ConnectionPool
+    from .routing import AsyncReplicaRouter, ReplicaRouter
+    from .watch import QueriesWatcher
+
+    Pool = Union[ConnectionPool, AsyncConnectionPool]
+    Router = Union[ReplicaRouter, AsyncReplicaRouter]
+
+DEFAULT_FETCH_SIZE = 100
+
+_INVALIDATES_SEPARATOR = re.compile(r"[\s,]+")
+
+_READ_OPERATIONS = (SQLOperationType.SELECT, SQLOperationType.SELECT_ONE)
+
 
 def _params(args, kwargs):
     if len(kwargs) > 0:
@@ -17,6 +54,130 @@ def _params(args, kwargs):
         return args
 
 
+def _many_params(query_name, args, kwargs):
+    # >> queries take a single iterable or async iterable of rows, streamed
+    # to the driver, or the rows themselves as positional arguments
+    if len(args) == 1 and not kwargs and not isinstance(args[0], (dict, tuple)):
+        rows = args[0]
+        if isinstance(rows, list) and rows and not _is_row(rows[0]):
+            # most likely one row given as a list
+            raise TypeError(_rows_error(query_name, rows[0]))
+        return rows
+    return _params(args, kwargs)
+
+
+def _is_row(value) -> bool:
+    # dicts and sequences of values
+    return hasattr(value, "__getitem__") and not isinstance(value, (str, bytes))
+
+
+def _rows_error(query_name: str, value: Any) -> str:
+    return (
+        f"{query_name}() takes rows as dicts or sequences, got "
+        f"{type(value).__name__}, pass a single row as a tuple"
+    )
+
+
+def _values(names: Tuple[Any, ...]) -> Callable[[Any], tuple]:
+    # itemgetter returning a tuple whatever the number of names
+    if len(names) == 1:
+        name = names[0]
+        return lambda mapping: (mapping[name],)
+    elif not names:
+        return lambda mapping: ()
+    return itemgetter(*names)
+
+
+def _make_binder(query_datum: QueryDatum) -> Callable[[tuple, dict], Any]:
+    # parameters of a call as the driver takes them, in the positional form
+    # of the adapter's sql when it has one, checked against the names once
+    # here instead of by the driver on every execute
+    query_name, names = query_datum.query_name, query_datum.parameters
+
+    if not names:
+        # named parameters, or none the sql declares, e.g. with ? placeholders
+
+        def bind(args, kwargs):
+            if args and kwargs:
+                raise TypeError(_mixed_error(query_name))
+            return kwargs if kwargs else args
+
+        return bind
+
+    unique = tuple(dict.fromkeys(names))
+    by_name = _values(names)
+    # positional arguments come in order of first occurrence, repeated once
+    # per occurrence for adapters with a placeholder each
+    by_position = None if unique == names else _values(tuple(map(unique.index, names)))
+    count = len(unique)
+
+    def bind(args, kwargs):
+        if kwargs:
+            if args:
+                raise TypeError(_mixed_error(query_name))
+            if len(kwargs) != count:
+                raise TypeError(_names_error(query_name, unique, kwargs))
+            try:
+                return by_name(kwargs)
+            except KeyError:
+                raise TypeError(_names_error(query_name, unique, kwargs)) from None
+        if len(args) != count:
+            raise TypeError(
+                f"{query_name}() takes {count} parameter(s) "
+                f"({', '.join(unique)}), got {len(args)}"
+            )
+        return args if by_position is None else by_position(args)
+
+    return bind
+
+
+def _make_row_binder(query_datum: QueryDatum) -> Optional[Callable[[Any], Any]]:
+    # rows of >> queries bound one at a time, None when they are not bound
+    if not query_datum.parameters:
+        return None
+    query_name = query_datum.query_name
+    bind = _make_binder(query_datum)
+
+    def bind_row(row):
+        if isinstance(row, dict):
+            return bind((), row)
+        elif not _is_row(row):
+            raise TypeError(_rows_error(query_name, row))
+        return bind(row, {})
+
+    return bind_row
+
+
+async def _abind_rows(rows, bind_row):
+    async for row in rows:
+        yield bind_row(row)
+
+
+def _bind_rows(rows, bind_row):
+    # lazily, rows keep being streamed to the driver
+    if hasattr(rows, "__aiter__"):
+        return _abind_rows(rows, bind_row)
+    elif isinstance(rows, dict):
+        # a single row given as keyword arguments
+        return [bind_row(rows)]
+    return map(bind_row, rows)
+
+
+def _mixed_error(query_name: str) -> str:
+    return f"{query_name}() takes parameters either by position or by name, not both"
+
+
+def _names_error(query_name: str, names: Tuple[str, ...], kwargs: dict) -> str:
+    missing = [name for name in names if name not in kwargs]
+    unexpected = [name for name in kwargs if name not in names]
+    problems = []
+    if missing:
+        problems.append(f"missing parameter(s): {', '.join(missing)}")
+    if unexpected:
+        problems.append(f"unexpected parameter(s): {', '.join(unexpected)}")
+    return f"{query_name}() {'; '.join(problems)}"
+
+
 def _query_fn(fn: Callable[..., Any], name: str, sql: str) -> QueryFn:
     qfn = cast(QueryFn, fn)
     qfn.__name__ = name
@@ -24,36 +185,54 @@ def _query_fn(fn: Callable[..., Any], name: str, sql: str) -> QueryFn:
     return qfn
 
 
-def _make_sync_fn(query_datum: QueryDatum) -> QueryFn:
-    query_name, operation_type, sql, record_class = query_datum
+def _make_fn(query_datum: QueryDatum, driver_adapter: DriverAdapterProtocol) -> QueryFn:
+    # everything but the call arguments is bound here, so a call is one
+    # function frame plus the adapter's, for async adapters the coroutine
+    # returned is the adapter's own
+    query_name, operation_type = query_datum.query_name, query_datum.operation_type
+    sql, record_class = query_datum.sql, query_datum.record_class
+    bind = _make_binder(query_datum)
 
     if operation_type == SQLOperationType.SELECT:
+        select = driver_adapter.select
 
-        def fn(self: QueriesContainer, conn, *args, **kwargs):
-            return self.driver_adapter.select(
-                conn, query_name, sql, _params(args, kwargs), record_class
-            )
+        def fn(conn, *args, **kwargs):
+            return select(conn, query_name, sql, bind(args, kwargs), record_class)
 
     elif operation_type == SQLOperationType.SELECT_ONE:
+        select_one = driver_adapter.select_one
 
-        def fn(self: QueriesContainer, conn, *args, **kwargs):
-            return self.driver_adapter.select_one(
-                conn, query_name, sql, _params(args, kwargs), record_class
-            )
+        def fn(conn, *args, **kwargs):
+            return select_one(conn, query_name, sql, bind(args, kwargs), record_class)
 
     elif operation_type == SQLOperationType.INSERT_UPDATE_DELETE:
+        insert_update_delete = driver_adapter.insert_update_delete
 
-        def fn(self: QueriesContainer, conn, *args, **kwargs):
-            return self.driver_adapter.insert_update_delete(
-                conn, query_name, sql, _params(args, kwargs)
-            )
+        def fn(conn, *args, **kwargs):
+            return insert_update_delete(conn, query_name, sql, bind(args, kwargs))
 
     elif operation_type == SQLOperationType.INSERT_UPDATE_DELETE_MANY:
+        insert_update_delete_many = driver_adapter.insert_update_delete_many
+        bind_row = _make_row_binder(query_datum)
 
-        def fn(self: QueriesContainer, conn, *args, **kwargs):
-            return self.driver_adapter.insert_update_delete_many(
-                conn, query_name, sql, _params(args, kwargs)
-            )
+        if bind_row is None:
+
+            def fn(conn, *args, **kwargs):
+                return insert_update_delete_many(
+                    conn, query_name, sql, _many_params(query_name, args, kwargs)
+                )
+
+        else:
+
+            def fn(conn, *args, **kwargs):
+                rows = _bind_rows(_many_params(query_name, args, kwargs), bind_row)
+                return insert_update_delete_many(conn, query_name, sql, rows)
+
+    elif operation_type == SQLOperationType.SCRIPT:
+        execute_script = driver_adapter.execute_script
+
+        def fn(conn):
+            return execute_script(conn, query_name, sql)
 
     else:
         raise ValueError(f"Unknown operation_type: {operation_type}")
@@ -61,37 +240,494 @@ def _make_sync_fn(query_datum: QueryDatum) -> QueryFn:
     return _query_fn(fn, query_name, sql)
 
 
-def _make_async_fn(fn: QueryFn) -> QueryFn:
-    async def afn(self: QueriesContainer, conn, *args, **kwargs):
-        return await fn(self, conn, *args, **kwargs)
+def _make_ctx_mgr(
+    query_datum: QueryDatum, driver_adapter: DriverAdapterProtocol
+) -> QueryFn:
+    query_name, sql = query_datum.query_name, query_datum.sql
+    select_cursor = driver_adapter.select_cursor
+    bind = _make_binder(query_datum)
+
+    def ctx_mgr(conn, *args, **kwargs):
+        return select_cursor(conn, query_name, sql, bind(args, kwargs))
+
+    return _query_fn(ctx_mgr, f"{query_name}_cursor", sql)
 
-    return _query_fn(
-        afn,
-        fn.__name__,
-        fn.__doc__,
-    )
 
+def _make_iter(query_datum: QueryDatum, queries: "QueriesContainer") -> QueryFn:
+    query_name, sql = query_datum.query_name, query_datum.sql
+    record_class = query_datum.record_class
+    select_iter = queries.driver_adapter.select_iter
+    bind = _make_binder(query_datum)
+    # looked up per call, fetch sizes may be changed after loading
+    fetch_sizes = queries.fetch_sizes
 
-def _make_ctx_mgr(fn: QueryFn) -> QueryFn:
-    def ctx_mgr(self, conn, *args, **kwargs):
-        return self.driver_adapter.select_cursor(
-            conn, fn.__name__, fn.sql, _params(args, kwargs)
+    def iter_fn(conn, *args, **kwargs):
+        fetch_size = fetch_sizes.get(query_name, queries.fetch_size)
+        return select_iter(
+            conn, query_name, sql, bind(args, kwargs), record_class, fetch_size
         )
 
-    return _query_fn(ctx_mgr, f"{fn.__name__}_cursor", fn.__doc__)
+    return _query_fn(iter_fn, f"{query_name}_iter", sql)
+
+
+def _make_columns(query_datum: QueryDatum, queries: "QueriesContainer") -> QueryFn:
+    query_name, sql = query_datum.query_name, query_datum.sql
+    select_columns = queries.driver_adapter.select_columns
+    bind = _make_binder(query_datum)
+    fetch_sizes = queries.fetch_sizes
+
+    def columns_fn(conn, *args, **kwargs):
+        fetch_size = fetch_sizes.get(query_name, queries.fetch_size)
+        return select_columns(conn, query_name, sql, bind(args, kwargs), fetch_size)
+
+    return _query_fn(columns_fn, f"{query_name}_columns", sql)
+
+
+def _sample_binder(query_datum: QueryDatum) -> Callable[[tuple, dict], Any]:
+    # rows of >> queries are not kept in samples, scripts take none
+    if query_datum.operation_type in (
+        SQLOperationType.INSERT_UPDATE_DELETE_MANY,
+        SQLOperationType.SCRIPT,
+    ):
+        return _params
+    return _make_binder(query_datum)
+
+
+def _sample_params(bind, args, kwargs, error):
+    # failed calls may have failed binding them, they are never explained
+    return bind(args, kwargs) if error is None else _params(args, kwargs)
+
+
+def _make_instrumented_fn(
+    fn: QueryFn,
+    operation_type: SQLOperationType,
+    instrumentation: Instrumentation,
+    is_aio: bool,
+    bind: Callable[[tuple, dict], Any] = _params,
+) -> QueryFn:
+    # wraps the call on the connection, so pool waits and cache hits are not
+    # timed, and the profiler can explain the query on that connection with
+    # the parameters bound as the driver took them
+    query_name, sql = fn.__name__, fn.sql
+    stats = instrumentation.stats_for(query_name)
+    started, finished = instrumentation.started, instrumentation.finished
+
+    if is_aio:
+
+        async def instrumented(conn, *args, **kwargs):
+            started(query_name, operation_type)
+            start = perf_counter()
+            result, error = None, None
+            try:
+                result = await fn(conn, *args, **kwargs)
+            except BaseException as e:
+                error = e
+            duration = perf_counter() - start
+            rowcount = None if error else result_rowcount(operation_type, result)
+            finished(stats, query_name, operation_type, duration, rowcount, error)
+
+            profiler = instrumentation.profiler
+            if profiler is not None and profiler.wants(duration):
+                params = _sample_params(bind, args, kwargs, error)
+                await profiler.arecord(
+                    conn,
+                    query_name,
+                    operation_type,
+                    sql,
+                    params,
+                    duration,
+                    rowcount,
+                    error,
+                )
+            if error is not None:
+                raise error
+            return result
+
+    else:
+
+        def instrumented(conn, *args, **kwargs):
+            started(query_name, operation_type)
+            start = perf_counter()
+            result, error = None, None
+            try:
+                result = fn(conn, *args, **kwargs)
+            except BaseException as e:
+                error = e
+            duration = perf_counter() - start
+            rowcount = None if error else result_rowcount(operation_type, result)
+            finished(stats, query_name, operation_type, duration, rowcount, error)
+
+            profiler = instrumentation.profiler
+            if profiler is not None and profiler.wants(duration):
+                params = _sample_params(bind, args, kwargs, error)
+                profiler.record(
+                    conn,
+                    query_name,
+                    operation_type,
+                    sql,
+                    params,
+                    duration,
+                    rowcount,
+                    error,
+                )
+            if error is not None:
+                raise error
+            return result
+
+    return _query_fn(instrumented, query_name, sql)
+
+
+def _make_instrumented_iter(
+    iter_fn: QueryFn, instrumentation: Instrumentation
+) -> QueryFn:
+    # timed until the rows are exhausted or the iterator is closed, so the
+    # duration includes the time the caller spends on each row, samples
+    # are not explained as the connection may be in use by then
+    query_name, sql = iter_fn.__name__, iter_fn.sql
+    operation_type = SQLOperationType.SELECT
+    stats = instrumentation.stats_for(query_name)
+    started, finished = instrumentation.started, instrumentation.finished
+
+    async def instrumented(conn, *args, **kwargs):
+        started(query_name, operation_type)
+        start = perf_counter()
+        rows = 0
+        error = None
+        try:
+            async for row in iter_fn(conn, *args, **kwargs):
+                rows += 1
+                yield row
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            duration = perf_counter() - start
+            finished(stats, query_name, operation_type, duration, rows, error)
+            profiler = instrumentation.profiler
+            if profiler is not None and profiler.wants(duration):
+                params = _params(args, kwargs)
+                profiler.record(
+                    None, query_name, operation_type, sql, params, duration, rows, error
+                )
+
+    return _query_fn(instrumented, query_name, sql)
+
+
+async def _buffered():
+    return None
+
+
+async def _after_flush(transaction: AsyncTransaction, fn: QueryFn, conn, args, kwargs):
+    await transaction.flush()
+    return await fn(conn, *args, **kwargs)
+
+
+def _make_transaction_fn(
+    fn: QueryFn, query_datum: QueryDatum, queries: "QueriesContainer"
+) -> QueryFn:
+    # > calls on a connection with a transaction() block open are buffered by
+    # it, other calls send the buffered ones first so they read them
+    is_aio = queries.is_aio
+
+    if query_datum.operation_type == SQLOperationType.INSERT_UPDATE_DELETE:
+        operation_type = SQLOperationType.INSERT_UPDATE_DELETE_MANY
+        # rows are bound as the calls are buffered, so errors are raised
+        # by the call rather than by the flush
+        bind = _make_binder(query_datum)
+        many_fn = _make_fn(
+            query_datum._replace(operation_type=operation_type, parameters=None),
+            queries.driver_adapter,
+        )
+        if queries.instrumentation is not None:
+            many_fn = _make_instrumented_fn(
+                many_fn, operation_type, queries.instrumentation, is_aio
+            )
+
+        def transaction_fn(conn, *args, **kwargs):
+            transaction = current_transaction(conn)
+            if transaction is None:
+                return fn(conn, *args, **kwargs)
+            transaction.add(many_fn, bind(args, kwargs))
+            return _buffered() if is_aio else None
+
+    elif query_datum.operation_type == SQLOperationType.SCRIPT and getattr(
+        queries.driver_adapter, "scripts_commit", False
+    ):
+        query_name = query_datum.query_name
+
+        def transaction_fn(conn, *args, **kwargs):
+            if current_transaction(conn) is not None:
+                raise RuntimeError(
+                    f"{query_name}() would commit the open transaction, "
+                    f"{type(queries.driver_adapter).__name__} runs scripts "
+                    "outside of transactions"
+                )
+            return fn(conn, *args, **kwargs)
+
+    elif is_aio:
+
+        def transaction_fn(conn, *args, **kwargs):
+            transaction = current_transaction(conn)
+            if transaction is None or not transaction.pending:
+                return fn(conn, *args, **kwargs)
+            return _after_flush(transaction, fn, conn, args, kwargs)
+
+    else:
+
+        def transaction_fn(conn, *args, **kwargs):
+            transaction = current_transaction(conn)
+            if transaction is not None and transaction.pending:
+                transaction.flush()
+            return fn(conn, *args, **kwargs)
+
+    return _query_fn(transaction_fn, fn.__name__, fn.sql)
+
+
+def _make_pooled_fn(fn: QueryFn, pool: "Pool", is_aio: bool) -> QueryFn:
+    # the connection comes from the pool, or is the one pinned by connection()
+    connection = pool.connection
+    if is_aio:
+
+        async def pooled(*args, **kwargs):
+            async with connection() as conn:
+                return await fn(conn, *args, **kwargs)
+
+    else:
+
+        def pooled(*args, **kwargs):
+            with connection() as conn:
+                return fn(conn, *args, **kwargs)
+
+    return _query_fn(pooled, fn.__name__, fn.sql)
 
 
-def _create_methods(query_datum: QueryDatum, is_aio: bool) -> List[Tuple[str, QueryFn]]:
-    fn = _make_sync_fn(query_datum)
+def _make_pooled_ctx_mgr(ctx_mgr: QueryFn, pool: "Pool", is_aio: bool) -> QueryFn:
+    # the connection is held until the cursor is done with
+    connection = pool.connection
     if is_aio:
-        fn = _make_async_fn(fn)
 
-    ctx_mgr = _make_ctx_mgr(fn)
+        @asynccontextmanager
+        async def pooled(*args, **kwargs):
+            async with connection() as conn:
+                async with ctx_mgr(conn, *args, **kwargs) as cur:
+                    yield cur
+
+    else:
+
+        @contextmanager
+        def pooled(*args, **kwargs):
+            with connection() as conn:
+                with ctx_mgr(conn, *args, **kwargs) as cur:
+                    yield cur
+
+    return _query_fn(pooled, ctx_mgr.__name__, ctx_mgr.sql)
+
+
+def _make_pooled_iter(iter_fn: QueryFn, pool: "Pool") -> QueryFn:
+    # the connection is held until the rows are exhausted or the iterator
+    # closed, without pinning it as the generator may be closed elsewhere
+    connection = getattr(pool, "_borrow", pool.connection)
+
+    async def pooled(*args, **kwargs):
+        async with connection() as conn:
+            async for row in iter_fn(conn, *args, **kwargs):
+                yield row
+
+    return _query_fn(pooled, iter_fn.__name__, iter_fn.sql)
+
+
+def _open_transaction_finder(
+    pool: Optional["Pool"], transactions: bool
+) -> Optional[Callable[..., Optional[Transaction]]]:
+    # transaction() block open on the connection of a call, None when no
+    # block was ever opened through these queries
+    if not transactions:
+        return None
+    if pool is None:
+        return current_transaction
+    pinned = pool.pinned
+
+    def find():
+        conn = pinned()
+        return current_transaction(conn) if conn is not None else None
+
+    return find
+
+
+def _make_cached_fn(
+    fn: QueryFn,
+    query_datum: QueryDatum,
+    cache: ResultCache,
+    pool: Optional["Pool"],
+    transactions: bool,
+) -> QueryFn:
+    # the connection is not part of the key, hits never touch one. Within a
+    # transaction() block results may hold its uncommitted writes, they are
+    # neither served from nor stored in the cache
+    query_name = fn.__name__
+    call = cache.call
+    find_transaction = _open_transaction_finder(pool, transactions)
+    bind = _make_binder(query_datum)
+
+    def key(args, kwargs):
+        # parameters as bound, so calls by position and by name share entries
+        parameters = bind(args, kwargs)
+        if isinstance(parameters, dict):
+            return cache_key(query_name, (), parameters)
+        return cache_key(query_name, tuple(parameters), {})
+
+    if pool is None:
+
+        def cached(conn, *args, **kwargs):
+            if find_transaction is not None and find_transaction(conn) is not None:
+                return fn(conn, *args, **kwargs)
+            return call(key(args, kwargs), fn, conn, *args, **kwargs)
+
+    else:
+
+        def cached(*args, **kwargs):
+            if find_transaction is not None and find_transaction() is not None:
+                return fn(*args, **kwargs)
+            return call(key(args, kwargs), fn, *args, **kwargs)
+
+    return _query_fn(cached, query_name, fn.sql)
+
+
+def _make_invalidating_fn(
+    fn: QueryFn,
+    queries: "QueriesContainer",
+    query_names: List[str],
+    pool: Optional["Pool"],
+) -> QueryFn:
+    # cleared even when the write fails, it may have been applied in part.
+    # Within a transaction() block the write is only seen by others once
+    # the block commits, so the caches are cleared then
+    find_transaction = _open_transaction_finder(pool, queries.transactions)
+
+    def invalidate():
+        queries.invalidate(*query_names)
+
+    def transaction_for(args, kwargs):
+        if find_transaction is None:
+            return None
+        elif pool is not None:
+            return find_transaction()
+        return find_transaction(args[0] if args else kwargs.get("conn"))
+
+    if queries.is_aio:
+
+        async def invalidating(*args, **kwargs):
+            transaction = transaction_for(args, kwargs)
+            if transaction is not None:
+                result = await fn(*args, **kwargs)
+                transaction.after_commit(invalidate)
+                return result
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                invalidate()
+
+    else:
+
+        def invalidating(*args, **kwargs):
+            transaction = transaction_for(args, kwargs)
+            if transaction is not None:
+                result = fn(*args, **kwargs)
+                transaction.after_commit(invalidate)
+                return result
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                invalidate()
+
+    return _query_fn(invalidating, fn.__name__, fn.sql)
+
+
+def _invalidated_names(query_datum: QueryDatum) -> List[str]:
+    # of the "-- invalidates:" directive, dotted for child queries
+    text = (query_datum.directives or {}).get("invalidates", "").strip()
+    return _INVALIDATES_SEPARATOR.split(text) if text else []
+
+
+def _create_methods(
+    query_datum: QueryDatum, queries: "QueriesContainer"
+) -> List[Tuple[str, QueryFn]]:
+    driver_adapter, is_aio = queries.driver_adapter, queries.is_aio
+    pool = queries._pool_for(query_datum.operation_type)
+    instrumentation = queries.instrumentation
+    directives = query_datum.directives or {}
+
+    fn = _make_fn(query_datum, driver_adapter)
+    if instrumentation is not None:
+        fn = _make_instrumented_fn(
+            fn,
+            query_datum.operation_type,
+            instrumentation,
+            is_aio,
+            _sample_binder(query_datum),
+        )
+    if queries.transactions:
+        fn = _make_transaction_fn(fn, query_datum, queries)
+    if pool is not None:
+        fn = _make_pooled_fn(fn, pool, is_aio)
+    if "cache" in directives:
+        cache = queries._make_result_cache(query_datum)
+        fn = _make_cached_fn(fn, query_datum, cache, pool, queries.transactions)
+    elif "invalidates" in directives:
+        fn = _make_invalidating_fn(fn, queries, _invalidated_names(query_datum), pool)
+    methods = [fn]
 
     if query_datum.operation_type == SQLOperationType.SELECT:
-        return [(fn.__name__, fn), (ctx_mgr.__name__, ctx_mgr)]
+        ctx_mgr = _make_ctx_mgr(query_datum, driver_adapter)
+        if pool is not None:
+            ctx_mgr = _make_pooled_ctx_mgr(ctx_mgr, pool, is_aio)
+        methods.append(ctx_mgr)
+
+        if is_aio:
+            iter_fn = _make_iter(query_datum, queries)
+            if instrumentation is not None:
+                iter_fn = _make_instrumented_iter(iter_fn, instrumentation)
+            if pool is not None:
+                iter_fn = _make_pooled_iter(iter_fn, pool)
+            methods.append(iter_fn)
+
+        # only for adapters able to return columns
+        if hasattr(driver_adapter, "select_columns"):
+            columns_fn = _make_columns(query_datum, queries)
+            if instrumentation is not None:
+                columns_fn = _make_instrumented_fn(
+                    columns_fn,
+                    SQLOperationType.SELECT,
+                    instrumentation,
+                    is_aio,
+                    _make_binder(query_datum),
+                )
+            if queries.transactions:
+                columns_fn = _make_transaction_fn(columns_fn, query_datum, queries)
+            if pool is not None:
+                columns_fn = _make_pooled_fn(columns_fn, pool, is_aio)
+            methods.append(columns_fn)
+
+    return [(method.__name__, method) for method in methods]
+
+
+def _method_names(
+    query_name: str,
+    operation_type: SQLOperationType,
+    driver_adapter: DriverAdapterProtocol,
+) -> List[str]:
+    # names of the methods _create_methods makes for a query
+    if operation_type == SQLOperationType.SELECT:
+        names = [query_name, f"{query_name}_cursor"]
+        if getattr(driver_adapter, "is_aio_driver", False):
+            names.append(f"{query_name}_iter")
+        if hasattr(driver_adapter, "select_columns"):
+            names.append(f"{query_name}_columns")
+        return names
     else:
-        return [(fn.__name__, fn)]
+        return [query_name]
 
 
 class QueriesContainer:
@@ -99,14 +735,75 @@ class QueriesContainer:
     Dynamic methods build from SQL queries
     """
 
-    def __init__(self, driver_adapter: DriverAdapterProtocol):
+    def __init__(
+        self,
+        driver_adapter: DriverAdapterProtocol,
+        fetch_size: Optional[int] = None,
+        pool: Optional["Pool"] = None,
+    ):
         self.driver_adapter: DriverAdapterProtocol = driver_adapter
         self.is_aio: bool = getattr(driver_adapter, "is_aio_driver", False)
+        # with a pool attached methods take no connection argument
+        self._check_pool(pool)
+        self._evict_on_discard(pool)
+        self.pool: Optional["Pool"] = pool
+        # sends reads to replicas and writes to the primary, in place of a pool
+        self.router: Optional["Router"] = None
+        # query data by name, methods are rebuilt from it when the pool changes
+        self._query_data: Dict[str, QueryDatum] = {}
+        # results of queries declared with a "-- cache:" directive
+        self.result_caches: Dict[str, ResultCache] = {}
+        # hooks and latency histograms, methods are only wrapped while set
+        self.instrumentation: Optional[Instrumentation] = None
+        # set once transaction() is used, methods only look for an open
+        # transaction from then on
+        self.transactions: bool = False
+        # rows pulled per fetchmany() call by the <query>_iter methods,
+        # fetch_sizes holds per query overrides
+        self.fetch_size: int = fetch_size or DEFAULT_FETCH_SIZE
+        self.fetch_sizes: Dict[str, int] = {}
         self._available_queries: Set[str] = set()
+        self._children: Dict[str, QueriesContainer] = {}
+        # sql file or directory the queries came from, used by watch()
+        self._source_path: Optional[Path] = None
+        # method / child container name -> path, used by lazily loaded containers
+        self._lazy_methods: Dict[str, Path] = {}
+        self._lazy_children: Dict[str, Path] = {}
+        self._lazy_lock = threading.RLock()
+        self._query_loader: Optional[FileQueryLoaderProtocol] = None
+
+    def __getattr__(self, name: str):
+        # only reached when regular lookup fails, i.e. for lazily indexed
+        # queries and child containers that were not created yet
+        lazy_methods = self.__dict__.get("_lazy_methods")
+        lazy_children = self.__dict__.get("_lazy_children")
+
+        if lazy_methods and name in lazy_methods:
+            with self._lazy_lock:
+                path = lazy_methods.get(name)
+                if path is not None:
+                    self._load_lazy_file(path)
+        elif lazy_children and name in lazy_children:
+            with self._lazy_lock:
+                if name in lazy_children:
+                    self._load_lazy_child(name)
+
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
+            ) from None
 
     @property
     def available(self) -> List[str]:
-        return sorted(self._available_queries)
+        for child_name in list(self._lazy_children):
+            getattr(self, child_name)
+
+        available = set(self._available_queries)
+        for child_name, child_queries in self._children.items():
+            available.update(f"{child_name}.{q}" for q in child_queries.available)
+        return sorted(available)
 
     def __repr__(self):
         return "Queries(" + self.available.__repr__() + ")"
@@ -116,25 +813,375 @@ class QueriesContainer:
         self._available_queries.add(query_name)
 
     def add_queries(self, queries: List[Tuple[str, QueryFn]]):
+        # the functions are closures over everything they need, they are set
+        # as they are rather than bound as methods
         for query_name, fn in queries:
-            self.add_query(query_name, MethodType(fn, self))
+            self.add_query(query_name, fn)
 
     def add_child_queries(self, child_name: str, child_queries: "QueriesContainer"):
         setattr(self, child_name, child_queries)
-        for child_query_name in child_queries.available:
-            self._available_queries.add(f"{child_name}.{child_query_name}")
+        self._children[child_name] = child_queries
+
+    def remove_query(self, query_name: str):
+        self.__dict__.pop(query_name, None)
+        self._available_queries.discard(query_name)
+        self._query_data.pop(query_name, None)
+        self.result_caches.pop(query_name, None)
+
+    def invalidate(self, *query_names: str):
+        """
+        Drops the cached results of the named queries, or of all queries of
+        this container and its children when no name is given. Names of
+        child queries are dotted, e.g. "config.get_value", unknown names
+        are ignored.
+        """
+        if not query_names:
+            for cache in self.result_caches.values():
+                cache.clear()
+            for child_queries in self._children.values():
+                child_queries.invalidate()
+            return
+
+        for query_name in query_names:
+            child_name, _, name = query_name.rpartition(".")
+            queries = self._descendant(child_name)
+            cache = queries.result_caches.get(name) if queries is not None else None
+            if cache is not None:
+                cache.clear()
 
     def load_from_list(self, query_data: List[QueryDatum]):
         for query_datum in query_data:
-            self.add_queries(_create_methods(query_datum, self.is_aio))
+            self.add_queries(self._create_methods(query_datum))
+        self._check_invalidates(query_data)
         return self
 
     def load_from_tree(self, query_data_tree: QueryDataTree):
+        query_data = []
         for key, value in query_data_tree.items():
             if isinstance(value, dict):
-                self.add_child_queries(
-                    key, QueriesContainer(self.driver_adapter).load_from_tree(value)
-                )
+                self.add_child_queries(key, self._make_child().load_from_tree(value))
             else:
-                self.add_queries(_create_methods(value, self.is_aio))
+                self.add_queries(self._create_methods(value))
+                query_data.append(value)
+        self._check_invalidates(query_data)
         return self
+
+    def set_pool(self, pool: Optional["Pool"]):
+        """
+        Attaches a connection pool to these queries and their children,
+        methods then run on a pooled connection instead of taking one.
+        None detaches it again.
+        """
+        self._check_pool(pool)
+        if pool is not None and self.router is not None:
+            raise ValueError("Queries with a router take no pool")
+        self._evict_on_discard(pool)
+        self.pool = pool
+        self._rebuild_methods()
+        for child_queries in self._children.values():
+            child_queries.set_pool(pool)
+        return self
+
+    def set_router(self, router: Optional["Router"]):
+        """
+        Attaches a ReplicaRouter to these queries and their children, in
+        place of a pool. Methods then take no connection argument, reads
+        run on a replica and writes on the primary. None detaches it again.
+        """
+        self._check_pool(router)
+        if router is not None and self.pool is not None:
+            raise ValueError("Queries with a pool take no router")
+        if router is not None:
+            self._evict_on_discard(router.primary, *router.replicas)
+        self.router = router
+        self._rebuild_methods()
+        for child_queries in self._children.values():
+            child_queries.set_router(router)
+        return self
+
+    def instrument(
+        self,
+        before: Optional[Hook] = None,
+        after: Optional[Hook] = None,
+    ) -> Instrumentation:
+        """
+        Times every query execution of these queries and their children,
+        calling before(event) and after(event) around it when given.
+        Uninstrumented methods are not wrapped at all.
+        """
+        if self.instrumentation is None:
+            self._set_instrumentation(Instrumentation())
+        if before is not None:
+            self.instrumentation.before.append(before)
+        if after is not None:
+            self.instrumentation.after.append(after)
+        return self.instrumentation
+
+    def profile(
+        self,
+        sample_rate: float = 0.0,
+        threshold: Optional[float] = None,
+        maxlen: int = 1000,
+        explain: bool = False,
+    ) -> QueryProfiler:
+        """
+        Instruments these queries and keeps a ring buffer of sampled calls
+        with their sql and parameters, see QueryProfiler. Replaces the
+        profiler of an earlier call.
+        """
+        profiler = QueryProfiler(
+            self.driver_adapter, sample_rate, threshold, maxlen, explain
+        )
+        self.instrument()
+        self._set_profiler(profiler)
+        return profiler
+
+    def uninstrument(self):
+        """
+        Removes the hooks, histograms and profiler of instrument() and profile()
+        """
+        self._set_instrumentation(None)
+        return self
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Calls, errors, rows and latency percentiles in seconds by query name,
+        names of child queries are dotted
+        """
+        stats = self.instrumentation.stats() if self.instrumentation else {}
+        for child_name, child_queries in self._children.items():
+            for query_name, query_stats in child_queries.stats().items():
+                stats[f"{child_name}.{query_name}"] = query_stats
+        return dict(sorted(stats.items()))
+
+    def batch(self) -> QueryBatch:
+        """
+        Collects calls of query methods, e.g. ``batch.get_user(conn, id=1)``,
+        to be made together by ``batch.run()``, await it for async drivers
+        """
+        return AsyncQueryBatch(self) if self.is_aio else QueryBatch(self)
+
+    def transaction(self, conn: Any = None) -> Transaction:
+        """
+        Context manager buffering the > calls made on conn through these
+        queries and their children within it, see Transaction, async with
+        for async drivers. Without conn the block pins a pooled connection,
+        or a primary one with a router, which reads within it go to as well.
+        """
+        if getattr(self.driver_adapter, "begin", None) is None:
+            raise ValueError(
+                f"{type(self.driver_adapter).__name__} does not support transactions"
+            )
+        pool = self._pinning_pool()
+        if conn is None and pool is None:
+            raise SQLPoolException("transaction() needs a connection or a pool")
+        if not self.transactions:
+            self._set_transactions(True)
+        transaction_cls = AsyncTransaction if self.is_aio else Transaction
+        return transaction_cls(
+            self.driver_adapter, conn, pool if conn is None else None
+        )
+
+    def connection(self):
+        """
+        Context manager pinning one pooled connection for the calls made
+        within it, async with for async drivers. With a router that is a
+        primary connection, reads within the block go to it too.
+        """
+        pool = self._pinning_pool()
+        if pool is None:
+            raise SQLPoolException("connection() needs a pool, see set_pool()")
+        return pool.connection()
+
+    def load_lazily(self, path: Path, query_loader: FileQueryLoaderProtocol):
+        """
+        Indexes the query names of a sql file or directory, reading the sql
+        and creating methods is deferred until they are first accessed
+        """
+        self.set_source(path, query_loader)
+        if path.is_file():
+            self._index_file(path)
+        else:
+            for p in sorted(path.iterdir()):
+                if p.is_file() and p.suffix == ".sql":
+                    self._index_file(p)
+                elif p.is_dir():
+                    self._lazy_children[p.name] = p
+        return self
+
+    def set_source(self, path: Path, query_loader: FileQueryLoaderProtocol):
+        self._source_path = path
+        self._query_loader = query_loader
+
+    def watch(self, interval: float = 1.0) -> "QueriesWatcher":
+        """
+        Returns a watcher re-parsing changed sql files of the path these
+        queries were loaded from and swapping their methods in place
+        """
+        from .watch import QueriesWatcher
+
+        if self._source_path is None or self._query_loader is None:
+            raise SQLLoadException("watch() needs queries loaded with load_from_file")
+        return QueriesWatcher(self, self._source_path, self._query_loader, interval)
+
+    def reload_file(
+        self, path: Path, old_names: List[str], query_data: List[QueryDatum]
+    ) -> List[str]:
+        """
+        Replaces the methods created from one sql file, returns the new names
+        """
+        with self._lazy_lock:
+            if path in self._lazy_methods.values():
+                # never accessed yet, the index is all there is to update
+                for name in old_names:
+                    if self._lazy_methods.get(name) == path:
+                        del self._lazy_methods[name]
+                        self._available_queries.discard(name)
+                if query_data:
+                    # names moved from files not reloaded yet are still indexed
+                    self._index_file(path, unique=False)
+                return [n for n, p in self._lazy_methods.items() if p == path]
+
+            methods = [
+                method
+                for query_datum in query_data
+                for method in self._create_methods(query_datum)
+            ]
+            new_names = [name for name, _ in methods]
+            # no awaits from here on, so coroutines see either all old or
+            # all new methods of the file
+            for name in set(old_names) - set(new_names):
+                self.remove_query(name)
+            self.add_queries(methods)
+            return new_names
+
+    def _check_invalidates(self, query_data: List[QueryDatum]):
+        # names are resolved on every write, unknown ones would never clear
+        # a cache, so they are rejected once all queries of a load exist
+        for query_datum in query_data:
+            for query_name in _invalidated_names(query_datum):
+                if not self._defines(query_name):
+                    raise SQLLoadException(
+                        f'"{query_datum.query_name}" invalidates unknown query '
+                        f'"{query_name}"'
+                    )
+
+    def _defines(self, query_name: str) -> bool:
+        child_name, _, name = query_name.rpartition(".")
+        queries = self._descendant(child_name)
+        return queries is not None and name in queries._available_queries
+
+    def _descendant(self, child_name: str) -> Optional["QueriesContainer"]:
+        # child container by dotted name, None when there is none
+        queries: Optional[QueriesContainer] = self
+        for part in child_name.split(".") if child_name else []:
+            if part in queries._lazy_children:
+                getattr(queries, part)
+            queries = queries._children.get(part)
+            if queries is None:
+                return None
+        return queries
+
+    def _make_child(self) -> "QueriesContainer":
+        child = QueriesContainer(self.driver_adapter, self.fetch_size, self.pool)
+        child.router = self.router
+        if self.instrumentation is not None:
+            child.instrumentation = self.instrumentation.child()
+        child.transactions = self.transactions
+        return child
+
+    def _set_instrumentation(self, instrumentation: Optional[Instrumentation]):
+        self.instrumentation = instrumentation
+        self._rebuild_methods()
+        for child_queries in self._children.values():
+            child_queries._set_instrumentation(
+                instrumentation.child() if instrumentation is not None else None
+            )
+
+    def _set_transactions(self, transactions: bool):
+        self.transactions = transactions
+        self._rebuild_methods()
+        for child_queries in self._children.values():
+            child_queries._set_transactions(transactions)
+
+    def _set_profiler(self, profiler: Optional[QueryProfiler]):
+        self.instrumentation.profiler = profiler
+        for child_queries in self._children.values():
+            child_queries._set_profiler(profiler)
+
+    def _rebuild_methods(self):
+        for query_datum in list(self._query_data.values()):
+            self.add_queries(self._create_methods(query_datum))
+
+    def _create_methods(self, query_datum: QueryDatum) -> List[Tuple[str, QueryFn]]:
+        if self._query_data.get(query_datum.query_name) is not query_datum:
+            # methods rebuilt from the same query data, e.g. once transaction()
+            # is used, keep its cached results
+            self.result_caches.pop(query_datum.query_name, None)
+        self._query_data[query_datum.query_name] = query_datum
+        return _create_methods(query_datum, self)
+
+    def _make_result_cache(self, query_datum: QueryDatum) -> ResultCache:
+        cache = self.result_caches.get(query_datum.query_name)
+        if cache is None:
+            options = parse_cache_options(
+                query_datum.query_name, query_datum.directives["cache"]
+            )
+            cache_cls = AsyncResultCache if self.is_aio else ResultCache
+            cache = self.result_caches[query_datum.query_name] = cache_cls(**options)
+        return cache
+
+    def _pool_for(self, operation_type: SQLOperationType) -> Optional["Pool"]:
+        # a router stands in for the pool, by its reads or writes side
+        if self.router is None:
+            return self.pool
+        elif operation_type in _READ_OPERATIONS:
+            return self.router.reads
+        return self.router.writes
+
+    def _pinning_pool(self) -> Optional["Pool"]:
+        # for blocks pinning a connection, with a router a primary one that
+        # only counts as written to once a write runs in the block
+        return self.pool if self.router is None else self.router.pins
+
+    def _check_pool(self, pool: Optional["Pool"]):
+        if pool is not None and getattr(pool, "is_aio", False) != self.is_aio:
+            kind = "an async" if self.is_aio else "a sync"
+            raise ValueError(f"{type(self.driver_adapter).__name__} needs {kind} pool")
+
+    def _evict_on_discard(self, *nodes: Any):
+        # statements the adapter cached for a connection go when a pool
+        # closes it, nodes of a router may be plain connections
+        evict = getattr(self.driver_adapter, "evict", None)
+        if evict is None:
+            return
+        for node in nodes:
+            hooks = getattr(node, "on_discard", None)
+            if hooks is not None and evict not in hooks:
+                hooks.append(evict)
+
+    def _index_file(self, path: Path, unique: bool = True):
+        query_names = self._query_loader.load_query_names_from_file(path)
+        for query_name, operation_type in query_names:
+            if unique and query_name in self._lazy_methods:
+                raise SQLLoadException(f'Duplicate query name "{query_name}" in {path}')
+            for method_name in _method_names(
+                query_name, operation_type, self.driver_adapter
+            ):
+                self._lazy_methods[method_name] = path
+                self._available_queries.add(method_name)
+
+    def _load_lazy_file(self, path: Path):
+        # cached query data is saved in the background, see QueryDataCache.autosave
+        query_data = self._query_loader.load_query_data_from_file(path)
+        self.load_from_list(query_data)
+        for method_name, method_path in list(self._lazy_methods.items()):
+            if method_path == path:
+                del self._lazy_methods[method_name]
+
+    def _load_lazy_child(self, child_name: str):
+        child = self._make_child().load_lazily(
+            self._lazy_children[child_name], self._query_loader
+        )
+        self.add_child_queries(child_name, child)
+        del self._lazy_children[child_name]
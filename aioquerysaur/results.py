@@ -0,0 +1,237 @@
+import asyncio
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from .exceptions import SQLParseException
+
+_OPTION = re.compile(r"(\w+)\s*=\s*([^\s,]+)")
+
+_MISSING = object()
+
+
+class ResultCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: Optional[int]
+    currsize: int
+    currbytes: int
+
+
+def parse_cache_options(query_name: str, text: str) -> Dict[str, Any]:
+    """
+    Options of a ``-- cache: ttl=60 maxsize=1000 maxbytes=1048576`` line.
+    Results are keyed by the query name and its bound parameters only, the
+    connection is not part of the key: queries called on connections to
+    different databases share their cached results.
+    """
+    options: Dict[str, Any] = {}
+    for name, value in _OPTION.findall(text):
+        if name not in ("ttl", "maxsize", "maxbytes"):
+            raise SQLParseException(
+                f'Unknown cache option "{name}" for query "{query_name}"'
+            )
+        try:
+            options[name] = float(value) if name == "ttl" else int(value)
+        except ValueError:
+            raise SQLParseException(
+                f'Invalid cache option {name}={value} for query "{query_name}"'
+            ) from None
+
+    if _OPTION.sub("", text).strip(" ,"):
+        raise SQLParseException(
+            f'Cache options must be name=value pairs, got "{text}" for "{query_name}"'
+        )
+    return options
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def cache_key(query_name: str, args: tuple, kwargs: dict) -> Hashable:
+    """
+    The query name and its parameters, keyword order does not matter
+    """
+    key = (query_name, args, tuple(sorted(kwargs.items())) if kwargs else ())
+    try:
+        hash(key)
+    except TypeError:
+        key = (query_name, _freeze(args), _freeze(kwargs))
+    return key
+
+
+def estimate_size(result: Any) -> int:
+    """
+    Rough size in bytes of a result set or row and the values in it
+    """
+    rows = result if isinstance(result, list) else [result]
+    size = sys.getsizeof(result) if rows is result else 0
+    for row in rows:
+        size += sys.getsizeof(row)
+        if isinstance(row, dict):
+            values: Any = row.values()
+        elif isinstance(row, (tuple, list)):
+            values = row
+        else:
+            values = getattr(row, "__dict__", {}).values()
+        size += sum(map(sys.getsizeof, values))
+    return size
+
+
+class ResultCache:
+    """
+    Results of one query by parameters, expiring ``ttl`` seconds after they
+    were fetched and evicted least recently used first once there are more
+    than ``maxsize`` of them or they take more than ``maxbytes``.
+    Concurrent misses for the same parameters share a single query.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        maxsize: Optional[int] = 1024,
+        maxbytes: Optional[int] = None,
+    ):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (expires at, size in bytes, result)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        # bumped by clear(), results fetched before that are not stored
+        self._generation = 0
+        self._inflight: Dict[Hashable, Any] = {}
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                self._pop(key)
+            self.misses += 1
+            return _MISSING
+
+    def set(self, key: Hashable, result: Any, generation: Optional[int] = None):
+        size = estimate_size(result) if self.maxbytes is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+        expires_at = monotonic() + self.ttl if self.ttl is not None else float("inf")
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # invalidated while the result was being fetched
+                return
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (expires_at, size, result)
+            self._bytes += size
+
+            while (self.maxsize is not None and len(self._entries) > self.maxsize) or (
+                self.maxbytes is not None and self._bytes > self.maxbytes
+            ):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._generation += 1
+
+    def cache_info(self) -> ResultCacheInfo:
+        with self._lock:
+            return ResultCacheInfo(
+                self.hits,
+                self.misses,
+                self.evictions,
+                self.maxsize,
+                len(self._entries),
+                self._bytes,
+            )
+
+    def call(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Cached result for key, fn(*args, **kwargs) fetches it on a miss
+        """
+        with self._lock:
+            result = self.get(key)
+            if result is not _MISSING:
+                return _copy(result)
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                generation = self._generation
+
+        if not leader:
+            return _copy(future.result())
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.set(key, result, generation)
+            future.set_result(result)
+            return _copy(result)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _pop(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class AsyncResultCache(ResultCache):
+    """
+    ResultCache for async queries, concurrent misses await a single fetch
+    """
+
+    async def call(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs):
+        result = self.get(key)
+        if result is not _MISSING:
+            return _copy(result)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, fn, args, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # a cancelled caller leaves the fetch running for the others
+        return _copy(await asyncio.shield(task))
+
+    async def _fetch(self, key, fn, args, kwargs):
+        generation = self._generation
+        result = await fn(*args, **kwargs)
+        self.set(key, result, generation)
+        return result
+
+
+def _copy(result: Any) -> Any:
+    # callers may change the list they get, not the cached one
+    return list(result) if isinstance(result, list) else result
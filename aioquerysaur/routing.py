@@ -0,0 +1,239 @@
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from .pool import AsyncConnectionPool, ConnectionPool
+
+STRATEGIES = ("round_robin", "least_outstanding")
+
+
+class _Session:
+    def __init__(self):
+        self.wrote = False
+
+
+class _RouterBase:
+    def __init__(
+        self, primary: Any, replicas: Sequence[Any], strategy: str = "round_robin"
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"strategy must be one of {', '.join(STRATEGIES)}, got {strategy!r}"
+            )
+        # connections or pools, writes always go to the primary
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        # calls running on each replica
+        self.outstanding = [0] * len(self.replicas)
+        self._next = 0
+        self._lock = threading.Lock()
+        # per router, so routers never see each other's blocks
+        self._writing: ContextVar[Optional[Any]] = ContextVar(
+            f"aioquerysaur_writing_{id(self)}", default=None
+        )
+        self._override: ContextVar[Optional[Any]] = ContextVar(
+            f"aioquerysaur_override_{id(self)}", default=None
+        )
+        self._session: ContextVar[Optional[_Session]] = ContextVar(
+            f"aioquerysaur_session_{id(self)}", default=None
+        )
+
+    def pinned(self) -> Any:
+        """
+        Primary connection held by a transaction() or connection() block in
+        the current context, if any
+        """
+        return self._writing.get()
+
+    @contextmanager
+    def use(self, node: Any):
+        """
+        Reads within the block go to node, the primary or one of the
+        replicas, writes still go to the primary
+        """
+        if node is not self.primary and not any(r is node for r in self.replicas):
+            raise ValueError("node is neither the primary nor one of the replicas")
+        token = self._override.set(node)
+        try:
+            yield node
+        finally:
+            self._override.reset(token)
+
+    @contextmanager
+    def sticky(self):
+        """
+        Reads within the block go to the primary once a write was made in
+        it, so they see that write even while replicas lag behind. Tasks
+        started inside the block share it.
+        """
+        if self._session.get() is not None:
+            yield
+            return
+        token = self._session.set(_Session())
+        try:
+            yield
+        finally:
+            self._session.reset(token)
+
+    def _read_node(self) -> Tuple[Any, Optional[int]]:
+        # the node for a read, with the index of the replica to be released
+        override = self._override.get()
+        if override is not None:
+            return override, None
+        session = self._session.get()
+        if (
+            not self.replicas
+            or self._writing.get() is not None
+            or (session is not None and session.wrote)
+        ):
+            return self.primary, None
+
+        with self._lock:
+            count = len(self.replicas)
+            index, self._next = self._next, (self._next + 1) % count
+            if self.strategy == "least_outstanding":
+                # ties go round robin, so idle replicas share the load
+                candidates = [(index + i) % count for i in range(count)]
+                index = min(candidates, key=self.outstanding.__getitem__)
+            self.outstanding[index] += 1
+        return self.replicas[index], index
+
+    def _wrote(self):
+        session = self._session.get()
+        if session is not None:
+            session.wrote = True
+
+    def _done(self, index: Optional[int]):
+        if index is not None:
+            with self._lock:
+                self.outstanding[index] -= 1
+
+
+class ReplicaRouter(_RouterBase):
+    """
+    Routes the queries of a sync driver, see QueriesContainer.set_router().
+    Reads run on one of ``replicas``, picked round robin or by the least
+    outstanding calls, writes and scripts on ``primary``. Nodes are
+    connections, or ConnectionPools to take a connection from per call.
+    """
+
+    is_aio = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = _Route(self, self._read)
+        self.writes = _Route(self, self._write)
+        # for connection() and transaction() blocks, which may only read
+        self.pins = _Route(self, self._pin)
+
+    @contextmanager
+    def _connect(self, node):
+        if isinstance(node, ConnectionPool):
+            with node.connection() as conn:
+                yield conn
+        else:
+            yield node
+
+    @contextmanager
+    def _read(self):
+        node, index = self._read_node()
+        try:
+            with self._connect(node) as conn:
+                yield conn
+        finally:
+            self._done(index)
+
+    @contextmanager
+    def _write(self):
+        self._wrote()
+        with self._pin() as conn:
+            yield conn
+
+    @contextmanager
+    def _pin(self):
+        conn = self._writing.get()
+        if conn is not None:
+            yield conn
+            return
+
+        with self._connect(self.primary) as conn:
+            # reads within the block, e.g. of a transaction, see its writes
+            token = self._writing.set(conn)
+            try:
+                yield conn
+            finally:
+                self._writing.reset(token)
+
+
+class AsyncReplicaRouter(_RouterBase):
+    """
+    Routes the queries of an async driver like ReplicaRouter, pools are
+    AsyncConnectionPools. use() and sticky() are plain with blocks.
+    """
+
+    is_aio = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = _Route(self, self._read)
+        self.writes = _Route(self, self._write)
+        # for connection() and transaction() blocks, which may only read
+        self.pins = _Route(self, self._pin)
+
+    @asynccontextmanager
+    async def _connect(self, node):
+        if isinstance(node, AsyncConnectionPool):
+            # not pinned, reads may run in async generators
+            async with node._borrow() as conn:
+                yield conn
+        else:
+            yield node
+
+    @asynccontextmanager
+    async def _read(self):
+        node, index = self._read_node()
+        try:
+            async with self._connect(node) as conn:
+                yield conn
+        finally:
+            self._done(index)
+
+    @asynccontextmanager
+    async def _write(self):
+        self._wrote()
+        async with self._pin() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def _pin(self):
+        conn = self._writing.get()
+        if conn is not None:
+            yield conn
+            return
+
+        async with self._connect(self.primary) as conn:
+            token = self._writing.set(conn)
+            try:
+                yield conn
+            finally:
+                self._writing.reset(token)
+
+
+class _Route:
+    """
+    Reads, writes or pinned primary connections of a router, taking the
+    place of a pool for queries
+    """
+
+    def __init__(self, router: _RouterBase, connection: Callable[[], Any]):
+        self.router = router
+        self.is_aio = router.is_aio
+        self.connection = connection
+
+    def pinned(self) -> Any:
+        return self.router.pinned()
+
+
+__all__: List[str] = ["AsyncReplicaRouter", "ReplicaRouter"]
@@ -0,0 +1,114 @@
+import re
+from typing import Dict, Tuple, Union
+
+# Everything that may contain a colon without it starting a parameter is
+# matched as a whole, so a single left to right scan finds the parameters.
+# The leading lookahead lets the scan skip plain text without trying every
+# alternative at each position.
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?=['"\-/$:]|[eE]')
+    (?:
+      (?P<estring>[eE]'(?:[^'\\]|\\.|'')*')
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<ident>"(?:[^"]|"")*")
+    | (?P<line_comment>--[^\n]*)
+    | (?P<block_comment>/\*.*?\*/)
+    | (?P<dollar>\$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$)
+    | (?P<cast>::)
+    | :(?P<param>[A-Za-z_]\w*)
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class PositionalSQL(str):
+    """
+    SQL with positional placeholders, parameters holds the name bound to
+    each position
+    """
+
+    parameters: Tuple[str, ...]
+
+    def __new__(cls, sql: str, parameters: Tuple[str, ...]):
+        positional_sql = super().__new__(cls, sql)
+        positional_sql.parameters = parameters
+        return positional_sql
+
+    def __reduce__(self):
+        return PositionalSQL, (str(self), self.parameters)
+
+
+class ParsedSQL(str):
+    """
+    SQL text with the positions of its ``:name`` parameters, string
+    literals, quoted identifiers, comments, dollar-quoted strings and
+    ``::`` casts are never mistaken for parameters
+    """
+
+    # literal text around the parameters, always one more than parameters
+    chunks: Tuple[str, ...]
+    # parameter names in order of occurrence, repeated names included
+    parameters: Tuple[str, ...]
+
+    def __new__(cls, sql: str, chunks: Tuple[str, ...], parameters: Tuple[str, ...]):
+        parsed = super().__new__(cls, sql)
+        parsed.chunks = chunks
+        parsed.parameters = parameters
+        return parsed
+
+    def __reduce__(self):
+        return ParsedSQL, (str(self), self.chunks, self.parameters)
+
+    @property
+    def unique_parameters(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(self.parameters))
+
+    def render(self, placeholder: str, escape_percent: bool = False) -> str:
+        """
+        Renders the sql with each parameter replaced by ``placeholder``
+        formatted with the parameter ``name`` and its 1-based ``index`` among
+        unique parameters, e.g. ``"%({name})s"``, ``"${index}"`` or ``"?"``
+        """
+        chunks = self.chunks
+        if escape_percent:
+            chunks = tuple(chunk.replace("%", "%%") for chunk in chunks)
+
+        indexes: Dict[str, int] = {}
+        parts = [chunks[0]]
+        for name, chunk in zip(self.parameters, chunks[1:]):
+            index = indexes.setdefault(name, len(indexes) + 1)
+            parts.append(placeholder.format(name=name, index=index))
+            parts.append(chunk)
+        return "".join(parts)
+
+    def render_positional(
+        self, placeholder: str, escape_percent: bool = False
+    ) -> PositionalSQL:
+        """
+        Renders the sql like render() for parameters passed by position.
+        Placeholders with an ``{index}``, e.g. ``"?{index}"``, take each unique
+        parameter once, others, e.g. ``"%s"``, take one per occurrence.
+        """
+        sql = self.render(placeholder, escape_percent)
+        if "{index}" in placeholder:
+            return PositionalSQL(sql, self.unique_parameters)
+        return PositionalSQL(sql, self.parameters)
+
+
+def parse_sql(sql: Union[str, ParsedSQL]) -> ParsedSQL:
+    if isinstance(sql, ParsedSQL):
+        return sql
+
+    chunks = []
+    parameters = []
+    start = 0
+    for match in _TOKEN_PATTERN.finditer(sql):
+        name = match.group("param")
+        if name is not None:
+            chunks.append(sql[start : match.start()])
+            parameters.append(name)
+            start = match.end()
+    chunks.append(sql[start:])
+    return ParsedSQL(sql, tuple(chunks), tuple(parameters))
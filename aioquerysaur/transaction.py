@@ -0,0 +1,199 @@
+import sys
+from contextvars import ContextVar
+from itertools import groupby
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from .models import DriverAdapterProtocol, QueryFn
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .queries import Pool
+
+# >> method of a buffered > query and the parameters of one call
+Write = Tuple[QueryFn, Any]
+
+# innermost transaction of the current thread or task by id(conn), replaced
+# rather than changed so tasks started within a transaction share it
+_transactions: ContextVar[Dict[int, "Transaction"]] = ContextVar(
+    "aioquerysaur_transactions", default={}
+)
+
+
+def current_transaction(conn: Any) -> Optional["Transaction"]:
+    transaction = _transactions.get().get(id(conn))
+    return transaction if transaction is not None and transaction.conn is conn else None
+
+
+class Transaction:
+    """
+    Buffers the > calls made on ``conn`` within the block and sends them on
+    flush(), each run of calls of one query as a single executemany. The
+    block commits once at the end, or rolls back on error. Transactions
+    nested on the same connection flush the outer one and use a savepoint.
+
+    Other query methods called on ``conn`` within the block flush it first,
+    rows read through <query>_cursor and <query>_iter methods are not.
+    """
+
+    def __init__(
+        self,
+        driver_adapter: DriverAdapterProtocol,
+        conn: Any = None,
+        pool: Optional["Pool"] = None,
+    ):
+        self.driver_adapter = driver_adapter
+        # with a pool the connection pinned by the block, once entered
+        self.conn = conn
+        self.pool = pool
+        self.parent: Optional[Transaction] = None
+        # nesting level, 0 for the outermost transaction on the connection
+        self.depth = 0
+        self.savepoint: Optional[str] = None
+        self._writes: List[Write] = []
+        # called once the outermost transaction commits
+        self._on_commit: List[Callable[[], Any]] = []
+        self._connection: Any = None
+        self._token: Any = None
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of buffered > calls
+        """
+        return len(self._writes)
+
+    def add(self, many_fn: QueryFn, parameters: Any):
+        self._writes.append((many_fn, parameters))
+
+    def after_commit(self, callback: Callable[[], Any]):
+        """
+        Calls callback once the outermost transaction on the connection has
+        committed, never if this one or an enclosing one rolls back
+        """
+        self._on_commit.append(callback)
+
+    def flush(self):
+        for many_fn, rows in self._take_batches():
+            many_fn(self.conn, rows)
+
+    def __enter__(self):
+        if self.pool is not None:
+            self._connection = self.pool.connection()
+            self.conn = self._connection.__enter__()
+        try:
+            self._nest()
+            if self.parent is not None:
+                self.parent.flush()
+            self.driver_adapter.begin(self.conn, self.savepoint)
+        except BaseException:
+            self._exit_connection(*sys.exc_info())
+            raise
+        self._activate()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _transactions.reset(self._token)
+        try:
+            if exc_type is None:
+                try:
+                    self.flush()
+                except BaseException:
+                    self.driver_adapter.rollback(self.conn, self.savepoint)
+                    raise
+                self.driver_adapter.commit(self.conn, self.savepoint)
+            else:
+                self._writes.clear()
+                self._on_commit.clear()
+                self.driver_adapter.rollback(self.conn, self.savepoint)
+        except BaseException:
+            self._exit_connection(*sys.exc_info())
+            raise
+        self._exit_connection(exc_type, exc, tb)
+        if exc_type is None:
+            self._committed()
+        return False
+
+    def _nest(self):
+        self.parent = current_transaction(self.conn)
+        if self.parent is not None:
+            self.depth = self.parent.depth + 1
+            self.savepoint = f"aioquerysaur_{self.depth}"
+
+    def _activate(self):
+        self._token = _transactions.set({**_transactions.get(), id(self.conn): self})
+
+    def _committed(self):
+        callbacks, self._on_commit = self._on_commit, []
+        if self.parent is not None:
+            # a savepoint was released, the outer transaction may still roll
+            # back
+            self.parent._on_commit.extend(callbacks)
+            return
+        for callback in callbacks:
+            callback()
+
+    def _take_batches(self) -> List[Tuple[QueryFn, List[Any]]]:
+        # runs of calls of one query in call order, later calls may depend
+        # on earlier ones so nothing is reordered
+        writes, self._writes = self._writes, []
+        return [
+            (many_fn, [parameters for _, parameters in run])
+            for many_fn, run in groupby(writes, key=itemgetter(0))
+        ]
+
+    def _exit_connection(self, exc_type, exc, tb):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            connection.__exit__(exc_type, exc, tb)
+
+
+class AsyncTransaction(Transaction):
+    """
+    Transaction of an async driver, used with async with and ``await flush()``
+    """
+
+    async def flush(self):
+        for many_fn, rows in self._take_batches():
+            await many_fn(self.conn, rows)
+
+    async def __aenter__(self):
+        if self.pool is not None:
+            self._connection = self.pool.connection()
+            self.conn = await self._connection.__aenter__()
+        try:
+            self._nest()
+            if self.parent is not None:
+                await self.parent.flush()
+            await self.driver_adapter.begin(self.conn, self.savepoint)
+        except BaseException:
+            await self._aexit_connection(*sys.exc_info())
+            raise
+        self._activate()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        _transactions.reset(self._token)
+        try:
+            if exc_type is None:
+                try:
+                    await self.flush()
+                except BaseException:
+                    await self.driver_adapter.rollback(self.conn, self.savepoint)
+                    raise
+                await self.driver_adapter.commit(self.conn, self.savepoint)
+            else:
+                self._writes.clear()
+                self._on_commit.clear()
+                await self.driver_adapter.rollback(self.conn, self.savepoint)
+        except BaseException:
+            await self._aexit_connection(*sys.exc_info())
+            raise
+        await self._aexit_connection(exc_type, exc, tb)
+        if exc_type is None:
+            self._committed()
+        return False
+
+    async def _aexit_connection(self, exc_type, exc, tb):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.__aexit__(exc_type, exc, tb)
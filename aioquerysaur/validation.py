@@ -0,0 +1,267 @@
+import asyncio
+import inspect
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from .exceptions import SQLLoadException, SQLValidationException
+from .models import DriverAdapterProtocol, QueryDatum, SQLOperationType
+from .tokenizer import PositionalSQL, parse_sql
+
+# full table scans in EXPLAIN QUERY PLAN details and EXPLAIN lines
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(?P<table>[\w.]+)"?(?: AS \w+)?$')
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (?P<table>[\w.\"]+)")
+
+# row count estimates tried in order until one gives a count: the first row
+# of sqlite_stat1 starts with the rows of its table, once ANALYZE ran, the
+# exact count is the fallback and scans the whole table
+_SQLITE_TABLE_ROWS = (
+    "select cast(stat as integer) from sqlite_stat1 where tbl = :table limit 1",
+    'select count(*) from "{table}"',
+)
+_POSTGRES_TABLE_ROWS = (
+    "select cast(reltuples as bigint) from pg_class where oid = to_regclass(:table)",
+)
+
+# statements EXPLAIN does not take on postgres, skipped like scripts
+_UNEXPLAINABLE = re.compile(
+    r"^\s*(?:(?:--[^\n]*(?:\n|$)|/\*.*?\*/)\s*)*"
+    r"(?:create|alter|drop|truncate|grant|revoke|comment|vacuum|analyze|reindex"
+    r"|lock|set|reset|copy|refresh)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# query, path of the file it is in and line of its name comment
+QueryLocation = Tuple[QueryDatum, Optional[str], Optional[int]]
+
+
+class QueryProblem(NamedTuple):
+    query_name: str
+    path: Optional[str]
+    line: Optional[int]
+    message: str
+
+    def __str__(self):
+        location = f"{self.path or '<string>'}:{self.line or '?'}"
+        return f"{location}: {self.query_name}: {self.message}"
+
+
+class _Nulls(dict):
+    # NULL for every named parameter
+    def __missing__(self, key):
+        return None
+
+
+def _nulls(sql: str, **values: Any) -> Any:
+    # values by name, NULL for the other parameters, positional for sql
+    # processed into positional form
+    if isinstance(sql, PositionalSQL):
+        return tuple(values.get(name) for name in sql.parameters)
+    return _Nulls(values)
+
+
+def _full_scans(plan: Iterable[Any]) -> List[Tuple[str, str]]:
+    scans = []
+    for row in plan:
+        detail = str(row[-1])
+        match = _SQLITE_SCAN.match(detail)
+        if match is not None:
+            scans.append((_SQLITE_TABLE_ROWS, match.group("table")))
+            continue
+        match = _POSTGRES_SCAN.search(detail)
+        if match is not None:
+            scans.append((_POSTGRES_TABLE_ROWS, match.group("table")))
+    return scans
+
+
+def _run(coro):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # loading is synchronous, a running loop can only be left to wait
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class QueryValidator:
+    """
+    Checks queries when they are loaded by running EXPLAIN (EXPLAIN QUERY
+    PLAN on sqlite) for each of them with NULL parameters, on ``workers``
+    connections opened by ``connect`` in parallel, e.g. to a local copy of
+    the database. With ``max_scan_rows`` full table scans of tables
+    estimated to hold more rows than that are reported as well. On sqlite
+    the estimate comes from sqlite_stat1, tables ANALYZE never ran on are
+    counted, which reads all of their rows.
+    Statements EXPLAIN does not take, e.g. DDL, are skipped like scripts.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        workers: int = 4,
+        max_scan_rows: Optional[int] = None,
+    ):
+        # opens a connection, may return an awaitable for async drivers
+        self.connect = connect
+        self.workers = workers
+        self.max_scan_rows = max_scan_rows
+
+    def validate(
+        self, driver_adapter: DriverAdapterProtocol, queries: List[QueryLocation]
+    ):
+        """
+        Raises an SQLValidationException listing every problem found
+        """
+        if getattr(driver_adapter, "explain", None) is None:
+            raise SQLLoadException(
+                f"{type(driver_adapter).__name__} has no explain(), "
+                "its queries cannot be validated"
+            )
+        # scripts hold several statements, EXPLAIN takes a single one
+        queries = [
+            location
+            for location in queries
+            if location[0].operation_type != SQLOperationType.SCRIPT
+            and not _UNEXPLAINABLE.match(str(location[0].sql))
+        ]
+        if not queries:
+            return
+
+        if getattr(driver_adapter, "is_aio_driver", False):
+            results = _run(self._avalidate(driver_adapter, queries))
+        else:
+            results = self._validate(driver_adapter, queries)
+
+        problems = [problem for result in results for problem in result]
+        if problems:
+            raise SQLValidationException(problems)
+
+    def _validate(self, driver_adapter, queries):
+        results: List[List[QueryProblem]] = [[] for _ in queries]
+        pending = iter(enumerate(queries))
+        lock = threading.Lock()
+
+        def worker():
+            conn = self.connect()
+            try:
+                while True:
+                    with lock:
+                        item = next(pending, None)
+                    if item is None:
+                        return
+                    i, location = item
+                    results[i] = self._check(driver_adapter, conn, location)
+            finally:
+                conn.close()
+
+        workers = min(self.workers, len(queries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(worker) for _ in range(workers)]:
+                future.result()
+        return results
+
+    def _check(self, driver_adapter, conn, location):
+        query_datum, path, line = location
+        try:
+            plan = driver_adapter.explain(
+                conn, query_datum.query_name, query_datum.sql, _nulls(query_datum.sql)
+            )
+            problems = []
+            for estimates, table in self._scans(plan):
+                rows = None
+                for i, sql in enumerate(estimates):
+                    sql = self._render(driver_adapter, sql, table)
+                    try:
+                        rows = driver_adapter.select_one(
+                            conn, "_table_rows", sql, _nulls(sql, table=table)
+                        )
+                    except Exception:
+                        # e.g. no sqlite_stat1 before ANALYZE ran
+                        if i == len(estimates) - 1:
+                            raise
+                    if rows is not None and rows[0] is not None:
+                        break
+                problems.append(self._scan_problem(location, table, rows))
+            return [problem for problem in problems if problem is not None]
+        except Exception as e:
+            return [QueryProblem(query_datum.query_name, path, line, _message(e))]
+        finally:
+            # a failed statement aborts the transaction on postgres
+            rollback = getattr(conn, "rollback", None)
+            if rollback is not None:
+                rollback()
+
+    async def _avalidate(self, driver_adapter, queries):
+        results: List[List[QueryProblem]] = [[] for _ in queries]
+        pending = iter(enumerate(queries))
+
+        async def worker():
+            conn = self.connect()
+            if inspect.isawaitable(conn):
+                conn = await conn
+            try:
+                for i, location in pending:
+                    results[i] = await self._acheck(driver_adapter, conn, location)
+            finally:
+                closed = conn.close()
+                if inspect.isawaitable(closed):
+                    await closed
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.workers, len(queries))))
+        )
+        return results
+
+    async def _acheck(self, driver_adapter, conn, location):
+        query_datum, path, line = location
+        try:
+            plan = await driver_adapter.explain(
+                conn, query_datum.query_name, query_datum.sql, _nulls(query_datum.sql)
+            )
+            problems = []
+            for estimates, table in self._scans(plan):
+                rows = None
+                for i, sql in enumerate(estimates):
+                    sql = self._render(driver_adapter, sql, table)
+                    try:
+                        rows = await driver_adapter.select_one(
+                            conn, "_table_rows", sql, _nulls(sql, table=table)
+                        )
+                    except Exception:
+                        if i == len(estimates) - 1:
+                            raise
+                    if rows is not None and rows[0] is not None:
+                        break
+                problems.append(self._scan_problem(location, table, rows))
+            return [problem for problem in problems if problem is not None]
+        except Exception as e:
+            return [QueryProblem(query_datum.query_name, path, line, _message(e))]
+
+    def _scans(self, plan):
+        return _full_scans(plan) if self.max_scan_rows is not None else []
+
+    @staticmethod
+    def _render(driver_adapter, sql, table):
+        sql = sql.format(table=table.replace('"', '""'))
+        return driver_adapter.process_sql(
+            "_table_rows", SQLOperationType.SELECT_ONE, parse_sql(sql)
+        )
+
+    def _scan_problem(self, location, table, rows) -> Optional[QueryProblem]:
+        query_datum, path, line = location
+        rows = rows[0] if rows is not None else None
+        if rows is None or rows <= self.max_scan_rows:
+            return None
+        return QueryProblem(
+            query_datum.query_name,
+            path,
+            line,
+            f"full scan of {table}, about {rows} rows",
+        )
+
+
+def _message(error: Exception) -> str:
+    message = str(error).strip().split("\n")[0]
+    return f"{type(error).__name__}: {message}" if message else type(error).__name__
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .loaders.cache import file_signature
+from .models import FileQueryLoaderProtocol, QueryDatum
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .queries import QueriesContainer
+
+logger = logging.getLogger(__name__)
+
+# file signature and the method names created from the file
+FileState = Tuple[Tuple[int, int], List[str]]
+# a changed file with its new signature and query data, None when deleted
+FileChange = Tuple[Path, Optional[Tuple[int, int]], Optional[List[QueryDatum]]]
+
+
+class QueriesWatcher:
+    """
+    Polls the sql files queries were loaded from, re-parses only the files
+    whose mtime or size changed and swaps their methods in place
+    """
+
+    def __init__(
+        self,
+        queries: "QueriesContainer",
+        path: Path,
+        query_loader: FileQueryLoaderProtocol,
+        interval: float = 1.0,
+    ):
+        from .queries import _method_names
+
+        self.queries = queries
+        self.path = path
+        self.query_loader = query_loader
+        self.interval = interval
+        # the last error raised parsing a changed file, the file is retried
+        # on every poll until it parses again
+        self.last_error: Optional[Exception] = None
+        self._errors: List[Exception] = []
+        self._task: Optional[asyncio.Task] = None
+        self._files: Dict[Path, FileState] = {}
+
+        for file_path in self._sql_files():
+            try:
+                signature = file_signature(file_path)
+            except OSError:
+                # removed since it was listed
+                continue
+            names = [
+                method_name
+                for query_name, op_type in query_loader.load_query_names_from_file(
+                    file_path
+                )
+                for method_name in _method_names(
+                    query_name, op_type, queries.driver_adapter
+                )
+            ]
+            self._files[file_path] = (signature, names)
+
+    def _sql_files(self) -> List[Path]:
+        if self.path.is_file():
+            return [self.path]
+        return sorted(self.path.rglob("*.sql"))
+
+    def _container_for(self, file_path: Path) -> Optional["QueriesContainer"]:
+        container = self.queries
+        if self.path.is_file():
+            return container
+
+        for part in file_path.parent.relative_to(self.path).parts:
+            if part in container._lazy_children:
+                # not indexed yet, it will be read from disk on first access
+                return None
+            child = container._children.get(part)
+            if child is None:
+                child = container._make_child()
+                container.add_child_queries(part, child)
+            container = child
+        return container
+
+    def poll(self) -> List[FileChange]:
+        """
+        Stats the sql files and parses the changed ones, nothing is swapped
+        """
+        changes = []
+        self._errors = []
+        seen = set()
+        for file_path in self._sql_files():
+            try:
+                signature = file_signature(file_path)
+            except OSError:
+                # deleted or renamed since it was listed, so it counts as removed
+                continue
+            seen.add(file_path)
+            state = self._files.get(file_path)
+            if state is None or state[0] != signature:
+                try:
+                    query_data = self.query_loader.load_query_data_from_file(file_path)
+                except Exception as e:
+                    # keep the previous methods of a file that does not parse
+                    self._errors.append(e)
+                    self.last_error = e
+                    continue
+                changes.append((file_path, signature, query_data))
+
+        for file_path in set(self._files) - seen:
+            changes.append((file_path, None, None))
+
+        cache = getattr(self.query_loader, "cache", None)
+        if changes and cache is not None:
+            cache.save()
+        return changes
+
+    def apply(self, changes: List[FileChange]):
+        """
+        Swaps the methods of changed files, this never awaits so concurrently
+        running coroutines observe each file either before or after reload
+        """
+        from .queries import _method_names
+
+        # names defined by any changed file are kept, so queries moved from
+        # one file to another are not removed by the file they left
+        defined: Dict[int, set] = {}
+        for file_path, _, query_data in changes:
+            container = self._container_for(file_path)
+            if container is not None:
+                defined.setdefault(id(container), set()).update(
+                    method_name
+                    for d in query_data or []
+                    for method_name in _method_names(
+                        d.query_name, d.operation_type, container.driver_adapter
+                    )
+                )
+
+        for file_path, signature, query_data in changes:
+            _, old_names = self._files.pop(file_path, (None, []))
+            container = self._container_for(file_path)
+            new_names = []
+            if container is not None:
+                kept = defined[id(container)]
+                new_names = container.reload_file(
+                    file_path,
+                    [name for name in old_names if name not in kept],
+                    query_data or [],
+                )
+            if signature is not None:
+                self._files[file_path] = (signature, new_names)
+
+    def check(self) -> List[Path]:
+        """
+        Reloads changed files synchronously, returns their paths. Files that
+        failed to parse are skipped and the first error is raised afterwards
+        """
+        changes = self.poll()
+        self.apply(changes)
+        if self._errors:
+            raise self._errors[0]
+        return [file_path for file_path, _, _ in changes]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # stat and parse off the loop, swap on it
+                changes = await loop.run_in_executor(None, self.poll)
+                self.apply(changes)
+            except Exception:
+                # reloading goes on with the next poll
+                logger.exception("Reloading sql files from %s failed", self.path)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
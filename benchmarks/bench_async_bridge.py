@@ -0,0 +1,113 @@
+"""
+Event loop lag while tasks make sqlite3 queries, with the sync adapter
+called from the loop and with the calls run by AsyncBridgeAdapter threads.
+
+A ticker task sleeps for 1ms in a loop and records how late it wakes up,
+meanwhile TASKS tasks each make CALLS slow queries on connections of their
+own to a temporary database file.
+
+    python -m benchmarks.bench_async_bridge
+"""
+
+import asyncio
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from aioquerysaur import load_from_str
+from aioquerysaur.adapters.bridge import AsyncBridgeAdapter
+
+TASKS = 8
+CALLS = 20
+ROWS = 20_000
+TICK = 0.001
+
+SQL = """
+-- name: count_pairs$
+select count(*) from items a join items b on a.bucket = b.bucket where a.id < :id;
+"""
+
+
+def create_db(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("create table items (id integer primary key, bucket integer)")
+    conn.executemany(
+        "insert into items (bucket) values (?)", ((i % 500,) for i in range(ROWS))
+    )
+    conn.commit()
+    conn.close()
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def run(db_path, queries, call):
+    conns = [sqlite3.connect(db_path, check_same_thread=False) for _ in range(TASKS)]
+    lags, stop = [], asyncio.Event()
+    tick = asyncio.ensure_future(ticker(lags, stop))
+
+    async def task(conn):
+        for i in range(CALLS):
+            await call(queries, conn, 1000 + i)
+            # lets the ticker run between calls of the sync adapter
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*map(task, conns))
+    seconds = time.perf_counter() - start
+    stop.set()
+    await tick
+    for conn in conns:
+        conn.close()
+    return lags, seconds
+
+
+async def call_sync(queries, conn, id):
+    return queries.count_pairs(conn, id=id)
+
+
+async def call_bridged(queries, conn, id):
+    return await queries.count_pairs(conn, id=id)
+
+
+def report(label, lags, seconds):
+    lags = sorted(lags)
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    print(
+        f"{label:10} {TASKS * CALLS / seconds:8.0f} calls/s   loop lag "
+        f"p50 {statistics.median(lags) * 1000:8.2f}ms  "
+        f"p99 {p99 * 1000:8.2f}ms  max {lags[-1] * 1000:8.2f}ms"
+    )
+
+
+async def amain(db_path):
+    queries = load_from_str(SQL, "sqlite3")
+    report("sqlite3", *await run(db_path, queries, call_sync))
+
+    bridge = AsyncBridgeAdapter("sqlite3", max_workers=4)
+    queries = load_from_str(SQL, lambda: bridge)
+    report("bridged", *await run(db_path, queries, call_bridged))
+    stats = bridge.stats()
+    bridge.close()
+    for name in ("queue_wait", "execution"):
+        print(
+            f"{'':10} {name:10} mean {stats[name]['mean'] * 1000:8.2f}ms  "
+            f"p99 {stats[name]['p99'] * 1000:8.2f}ms"
+        )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        create_db(db_path)
+        asyncio.run(amain(db_path))
+
+
+if __name__ == "__main__":
+    main()
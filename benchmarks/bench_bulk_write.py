@@ -0,0 +1,187 @@
+"""
+Rows per second written by >> queries against one > call per row.
+
+sqlite3 and aiosqlite run against a temporary database file. psycopg2 and
+asyncpg run as well when AIOQUERYSAUR_BENCH_DSN points at a postgres
+database the benchmark may create and drop an ``items`` table in.
+
+    python -m benchmarks.bench_bulk_write
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from aioquerysaur import load_from_str
+
+ROWS = 100_000
+DSN = os.environ.get("AIOQUERYSAUR_BENCH_DSN")
+
+SQL = """
+-- name: create_item>
+insert into items (title, flag, revealed) values (:title, :flag, :revealed);
+
+-- name: create_items>>
+insert into items (title, flag, revealed) values (:title, :flag, :revealed);
+
+-- name: reveal_items>>
+update items set revealed = :revealed where title = :title;
+"""
+
+CREATE_TABLE = (
+    "create table items (id {id}, title text, flag boolean, revealed boolean)"
+)
+CREATE_INDEX = "create index items_title on items (title)"
+
+
+def rows(n):
+    return ({"title": str(i), "flag": i % 2 == 0, "revealed": False} for i in range(n))
+
+
+def report(adapter, results):
+    for label, n, seconds in results:
+        print(f"{adapter:10} {label:20} {n / seconds:12.0f} rows/s")
+
+
+def bench_sqlite3(db_path):
+    queries = load_from_str(SQL, "sqlite3")
+    conn = sqlite3.connect(db_path)
+    conn.execute(CREATE_TABLE.format(id="integer primary key"))
+    conn.execute(CREATE_INDEX)
+    results = []
+
+    start = time.perf_counter()
+    for row in rows(ROWS // 10):
+        queries.create_item(conn, **row)
+    conn.commit()
+    results.append(("> per row", ROWS // 10, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    queries.create_items(conn, rows(ROWS))
+    conn.commit()
+    results.append((">> insert", ROWS, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    queries.reveal_items(conn, rows(ROWS))
+    conn.commit()
+    results.append((">> update", ROWS, time.perf_counter() - start))
+
+    conn.close()
+    report("sqlite3", results)
+
+
+async def bench_aiosqlite(db_path):
+    import aiosqlite
+
+    queries = load_from_str(SQL, "aiosqlite")
+    conn = await aiosqlite.connect(db_path)
+    await conn.execute(CREATE_TABLE.format(id="integer primary key"))
+    await conn.execute(CREATE_INDEX)
+    results = []
+
+    start = time.perf_counter()
+    for row in rows(ROWS // 10):
+        await queries.create_item(conn, **row)
+    await conn.commit()
+    results.append(("> per row", ROWS // 10, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await queries.create_items(conn, rows(ROWS))
+    await conn.commit()
+    results.append((">> insert", ROWS, time.perf_counter() - start))
+
+    async def async_rows():
+        for row in rows(ROWS):
+            yield row
+
+    start = time.perf_counter()
+    await queries.create_items(conn, async_rows())
+    await conn.commit()
+    results.append((">> insert async rows", ROWS, time.perf_counter() - start))
+
+    await conn.close()
+    report("aiosqlite", results)
+
+
+def bench_psycopg2():
+    import psycopg2
+
+    from aioquerysaur.adapters.psycopg2 import PsycoPG2Adapter
+
+    conn = psycopg2.connect(DSN)
+    results = []
+    for label, use_copy in ((">> execute_values", False), (">> copy", True)):
+        queries = load_from_str(SQL, lambda: PsycoPG2Adapter(use_copy=use_copy))
+        with conn, conn.cursor() as cur:
+            cur.execute("drop table if exists items")
+            cur.execute(CREATE_TABLE.format(id="serial primary key"))
+            cur.execute(CREATE_INDEX)
+
+        start = time.perf_counter()
+        with conn:
+            queries.create_items(conn, rows(ROWS))
+        results.append((label, ROWS, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with conn:
+        for row in rows(ROWS // 10):
+            queries.create_item(conn, **row)
+    results.insert(0, ("> per row", ROWS // 10, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with conn:
+        queries.reveal_items(conn, rows(ROWS // 10))
+    results.append((">> executemany", ROWS // 10, time.perf_counter() - start))
+
+    with conn, conn.cursor() as cur:
+        cur.execute("drop table items")
+    conn.close()
+    report("psycopg2", results)
+
+
+async def bench_asyncpg():
+    import asyncpg
+
+    conn = await asyncpg.connect(DSN)
+    await conn.execute("drop table if exists items")
+    await conn.execute(CREATE_TABLE.format(id="serial primary key"))
+    await conn.execute(CREATE_INDEX)
+    queries = load_from_str(SQL, "asyncpg")
+    results = []
+
+    start = time.perf_counter()
+    async with conn.transaction():
+        for row in rows(ROWS // 10):
+            await queries.create_item(conn, **row)
+    results.append(("> per row", ROWS // 10, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await queries.create_items(conn, rows(ROWS))
+    results.append((">> copy", ROWS, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await queries.reveal_items(conn, rows(ROWS // 10))
+    results.append((">> executemany", ROWS // 10, time.perf_counter() - start))
+
+    await conn.execute("drop table items")
+    await conn.close()
+    report("asyncpg", results)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bench_sqlite3(str(Path(tmp_dir) / "sqlite3.db"))
+        asyncio.run(bench_aiosqlite(str(Path(tmp_dir) / "aiosqlite.db")))
+
+    if DSN is None:
+        print("set AIOQUERYSAUR_BENCH_DSN to run the postgres adapters")
+        return
+    bench_psycopg2()
+    asyncio.run(bench_asyncpg())
+
+
+if __name__ == "__main__":
+    main()
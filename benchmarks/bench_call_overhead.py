@@ -0,0 +1,65 @@
+"""
+Calls per second of a generated async method against calling its adapter
+directly, with an adapter doing no work, so what is left is the overhead
+of the generated method itself.
+
+    python -m benchmarks.bench_call_overhead
+"""
+
+import asyncio
+import time
+
+from aioquerysaur import load_from_str
+
+SQL = "-- name: get_item$\nselect * from items where id = :id"
+CALLS = 200_000
+
+
+class NoopAdapter:
+    is_aio_driver = True
+
+    @staticmethod
+    def process_sql(_query_name, _op_type, sql):
+        return sql
+
+    @staticmethod
+    async def select_one(conn, _query_name, sql, parameters, record_class=None):
+        return parameters
+
+
+def calls_per_second(loop):
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        asyncio.run(loop())
+        best = min(best, time.perf_counter() - start)
+    return CALLS / best
+
+
+def bench():
+    queries = load_from_str(SQL, NoopAdapter)
+    get_item, sql = queries.get_item, queries.get_item.sql
+    select_one = queries.driver_adapter.select_one
+
+    async def direct_calls():
+        for _ in range(CALLS):
+            await select_one(None, "get_item", sql, {"id": 1})
+
+    async def generated_calls():
+        for _ in range(CALLS):
+            await get_item(None, id=1)
+
+    return calls_per_second(direct_calls), calls_per_second(generated_calls)
+
+
+def report(direct, generated):
+    print(f"direct     {direct:12.0f} calls/s")
+    print(f"generated  {generated:12.0f} calls/s  {generated / direct:5.2f}x")
+
+
+def main():
+    report(*bench())
+
+
+if __name__ == "__main__":
+    main()
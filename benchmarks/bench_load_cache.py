@@ -0,0 +1,44 @@
+"""
+Cold vs warm startup of load_from_file on a generated tree of sql files.
+
+    python -m benchmarks.bench_load_cache
+"""
+
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from aioquerysaur import load_from_file
+
+from .sqltree import make_sql_tree
+
+
+def timed(fn):
+    start = perf_counter()
+    fn()
+    return perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_sql_tree(Path(tmp) / "sql")
+        cache_path = Path(tmp) / "queries.cache"
+        files = sum(1 for _ in root.rglob("*.sql"))
+        print(f"{files} files, psycopg2 adapter")
+
+        uncached = min(
+            timed(lambda: load_from_file(root, "psycopg2")) for _ in range(5)
+        )
+        cold = timed(lambda: load_from_file(root, "psycopg2", cache_path=cache_path))
+        warm = min(
+            timed(lambda: load_from_file(root, "psycopg2", cache_path=cache_path))
+            for _ in range(5)
+        )
+
+        print(f"no cache            {uncached * 1000:8.1f}ms")
+        print(f"cold (cache write)  {cold * 1000:8.1f}ms")
+        print(f"warm (cache read)   {warm * 1000:8.1f}ms  {uncached / warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
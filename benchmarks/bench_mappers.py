@@ -0,0 +1,72 @@
+"""
+Compares precompiled row mappers against per-row ``dict(zip(...))`` mapping.
+
+    python -m benchmarks.bench_mappers
+"""
+
+from collections import namedtuple
+from dataclasses import dataclass
+from timeit import timeit
+
+from aioquerysaur.mappers import get_row_mapper
+
+ROWS = 100_000
+COLUMNS = ("id", "title", "flag", "revealed")
+DESCRIPTION = tuple((name, None, None, None, None, None, None) for name in COLUMNS)
+
+Item = namedtuple("Item", COLUMNS)
+
+
+@dataclass
+class ItemData:
+    id: int
+    title: str
+    flag: bool
+    revealed: bool
+
+
+class SlottedItem:
+    __slots__ = COLUMNS
+
+    def __init__(self, id, title, flag, revealed):
+        self.id = id
+        self.title = title
+        self.flag = flag
+        self.revealed = revealed
+
+
+class KwargsItem:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def dict_zip(record_class, description, rows):
+    column_names = [c[0] for c in description]
+    return [record_class(**dict(zip(column_names, row))) for row in rows]
+
+
+def mapped(record_class, description, rows):
+    return list(map(get_row_mapper(record_class, description), rows))
+
+
+def main():
+    rows = [(i, f"title {i}", i % 2 == 0, False) for i in range(ROWS)]
+    print(f"{ROWS} rows, best of 5 runs")
+    print(f"{'record_class':<14}{'dict(zip)':>12}{'mapper':>12}{'speedup':>10}")
+    for record_class in (Item, ItemData, KwargsItem, SlottedItem):
+        baseline = min(
+            timeit(lambda: dict_zip(record_class, DESCRIPTION, rows), number=1)
+            for _ in range(5)
+        )
+        compiled = min(
+            timeit(lambda: mapped(record_class, DESCRIPTION, rows), number=1)
+            for _ in range(5)
+        )
+        print(
+            f"{record_class.__name__:<14}{baseline:>11.3f}s{compiled:>11.3f}s"
+            f"{baseline / compiled:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
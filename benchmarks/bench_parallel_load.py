@@ -0,0 +1,47 @@
+"""
+Sequential vs thread / process pool loading of a generated sql tree.
+
+    python -m benchmarks.bench_parallel_load
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from aioquerysaur import load_from_file
+
+from .sqltree import make_sql_tree
+
+
+def best_of(fn, runs=3):
+    timings = []
+    for _ in range(runs):
+        start = perf_counter()
+        fn()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    workers = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_sql_tree(Path(tmp), dirs=20, files_per_dir=50, queries_per_file=10)
+        queries = sum(1 for _ in load_from_file(root, "psycopg2").available)
+        print(f"{queries} methods from 1000 files, {workers} workers")
+
+        sequential = best_of(lambda: load_from_file(root, "psycopg2"))
+        threads = best_of(lambda: load_from_file(root, "psycopg2", workers=workers))
+        processes = best_of(
+            lambda: load_from_file(
+                root, "psycopg2", workers=workers, use_processes=True
+            )
+        )
+
+        print(f"sequential  {sequential * 1000:8.1f}ms")
+        print(f"threads     {threads * 1000:8.1f}ms  {sequential / threads:.2f}x")
+        print(f"processes   {processes * 1000:8.1f}ms  {sequential / processes:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Calls per second of generated sqlite3 methods with the parameters bound
+by position, as loaded now, against the named parameters and dicts the
+driver took before.
+
+Runs against an in-memory database, so the binding and the driver's
+handling of the parameters make up a large share of each call.
+
+    python -m benchmarks.bench_params
+"""
+
+import sqlite3
+import time
+
+from aioquerysaur import load_from_str
+from aioquerysaur.adapters.sqlite3 import SQLite3DriverAdapter
+from aioquerysaur.tokenizer import parse_sql
+
+CALLS = 100_000
+
+SQL = """
+-- name: get_item$
+select title from items where id = :id and flag = :flag;
+
+-- name: find_items
+select id from items where title >= :low and title < :high and flag = :flag limit 1;
+
+-- name: create_item>
+insert into items (id, title, flag) values (:id, :title, :flag);
+"""
+
+
+class NamedSQLite3Adapter(SQLite3DriverAdapter):
+    # the named placeholders sqlite3 queries were rendered with before
+    @staticmethod
+    def process_sql(_query_name, _op_type, sql):
+        return parse_sql(sql).render(":{name}")
+
+
+def connect():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table items (id integer primary key, title text, flag int)")
+    conn.executemany(
+        "insert into items values (?, ?, ?)", ((i, str(i), i % 2) for i in range(1000))
+    )
+    return conn
+
+
+def calls_per_second(fn):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return CALLS / best
+
+
+def bench(adapter):
+    queries = load_from_str(SQL, adapter)
+    conn = connect()
+    get_item, find_items = queries.get_item, queries.find_items
+    create_item = queries.create_item
+
+    def select_one_kwargs():
+        for i in range(CALLS):
+            get_item(conn, id=i % 1000, flag=1)
+
+    def select_kwargs():
+        for i in range(CALLS):
+            find_items(conn, low="1", high="2", flag=i % 2)
+
+    def insert_kwargs():
+        conn.execute("delete from items where id >= 1000")
+        for i in range(1000, 1000 + CALLS):
+            create_item(conn, id=i, title="t", flag=0)
+
+    def select_one_args():
+        for i in range(CALLS):
+            get_item(conn, i % 1000, 1)
+
+    results = [
+        ("$ by name", calls_per_second(select_one_kwargs)),
+        ("select by name", calls_per_second(select_kwargs)),
+        ("> by name", calls_per_second(insert_kwargs)),
+        ("$ by position", calls_per_second(select_one_args)),
+    ]
+    conn.close()
+    return results
+
+
+def report(before, after):
+    for (label, named), (_, positional) in zip(before, after):
+        print(
+            f"{label:16} {named:10.0f} calls/s named  {positional:10.0f} calls/s "
+            f"positional  {positional / named:5.2f}x"
+        )
+
+
+def main():
+    report(bench(NamedSQLite3Adapter), bench("sqlite3"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Parse throughput of the single pass tokenizer against the previous line
+split + regex rewrite loader path, for the psycopg2 placeholder style.
+
+    python -m benchmarks.bench_parse
+"""
+
+import re
+from timeit import timeit
+
+from aioquerysaur.adapters.psycopg2 import PsycoPG2Adapter
+from aioquerysaur.exceptions import SQLParseException
+from aioquerysaur.loaders.text import Patterns, TextLoader
+from aioquerysaur.models import QueryDatum
+
+from .sqltree import QUERY
+
+_VAR_PATTERN = re.compile(
+    r'(?P<dblquote>"[^"]+")|'
+    r"(?P<quote>\'[^\']+\')|"
+    r"(?P<lead>[^:]):(?P<var_name>[\w-]+)(?P<trail>[^:]?)"
+)
+
+
+def replacer(match):
+    gd = match.groupdict()
+    if gd["dblquote"] is not None:
+        return gd["dblquote"]
+    elif gd["quote"] is not None:
+        return gd["quote"]
+    else:
+        return f'{gd["lead"]}%({gd["var_name"]})s{gd["trail"]}'
+
+
+class PreviousTextLoader(TextLoader):
+    """
+    TextLoader as it was before the tokenizer, the psycopg2 rewrite inlined
+    """
+
+    def _make_query_datum(self, query_str):
+        lines = [line.strip() for line in query_str.strip().splitlines()]
+        query_name, operation_type = self._parse_query_name(lines[0])
+        sql = "\n".join(lines[1:])
+
+        if not Patterns.VALID_QUERY.match(query_name) or not query_name:
+            raise SQLParseException(
+                f'name must convert to valid python variable, got "{query_name}".'
+            )
+
+        sql = _VAR_PATTERN.sub(replacer, sql.strip())
+        return QueryDatum(query_name, operation_type, sql, record_class=None)
+
+
+def main():
+    queries = 10_000
+    sql = "".join(QUERY.format(n=n) for n in range(queries))
+    results = {}
+    for loader_cls in (PreviousTextLoader, TextLoader):
+        loader = loader_cls(PsycoPG2Adapter(), None)
+        results[loader_cls] = min(
+            timeit(lambda: loader.load_query_data_from_sql(sql), number=1)
+            for _ in range(5)
+        )
+    previous, current = results[PreviousTextLoader], results[TextLoader]
+
+    print(f"{queries} queries, {len(sql) / 1e6:.1f}MB of sql")
+    print(f"line split + regex  {queries / previous:10.0f} queries/s")
+    print(f"tokenizer           {queries / current:10.0f} queries/s")
+
+
+if __name__ == "__main__":
+    main()
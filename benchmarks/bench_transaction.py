@@ -0,0 +1,57 @@
+"""
+Rows per second written by > calls made one by one in autocommit mode
+against the same calls buffered by queries.transaction().
+
+Runs against a temporary sqlite3 database file.
+
+    python -m benchmarks.bench_transaction
+"""
+
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from aioquerysaur import load_from_str
+
+ROWS = 2000
+
+SQL = """
+-- name: add_item>
+insert into items (id, title) values (:id, :title);
+"""
+
+
+def report(results):
+    for label, n, seconds in results:
+        print(f"sqlite3    {label:20} {n / seconds:12.0f} rows/s")
+
+
+def bench_sqlite3(db_path):
+    queries = load_from_str(SQL, "sqlite3")
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("create table items (id integer primary key, title text)")
+    results = []
+
+    start = time.perf_counter()
+    for i in range(ROWS):
+        queries.add_item(conn, id=i, title=str(i))
+    results.append(("> autocommit", ROWS, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with queries.transaction(conn):
+        for i in range(ROWS, ROWS * 2):
+            queries.add_item(conn, id=i, title=str(i))
+    results.append(("> in transaction()", ROWS, time.perf_counter() - start))
+
+    conn.close()
+    return results
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        report(bench_sqlite3(str(Path(tmp) / "bench.db")))
+
+
+if __name__ == "__main__":
+    main()
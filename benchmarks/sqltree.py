@@ -0,0 +1,31 @@
+from pathlib import Path
+
+QUERY = """-- name: get_items_{n}
+  select id,
+         title,
+         revealed
+    from items
+   where flag = :flag
+     and title like '%:not_a_param%'
+     and id > :min_id
+order by revealed desc;
+
+"""
+
+
+def make_sql_tree(root, dirs=10, files_per_dir=50, queries_per_file=10):
+    """
+    Writes dirs x files_per_dir sql files with queries_per_file queries each,
+    query names are unique per directory
+    """
+    root = Path(root)
+    for d in range(dirs):
+        dir_path = root / f"dir_{d}"
+        dir_path.mkdir(parents=True, exist_ok=True)
+        for f in range(files_per_dir):
+            first = f * queries_per_file
+            sql = "".join(
+                QUERY.format(n=n) for n in range(first, first + queries_per_file)
+            )
+            (dir_path / f"queries_{f}.sql").write_text(sql)
+    return root
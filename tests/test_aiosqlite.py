@@ -1,7 +1,10 @@
+import sqlite3
 from pathlib import Path
 
+import aiosqlite
 import pytest
 from aioquerysaur import load_from_str
+from aioquerysaur.adapters.aiosqlite import AioSQLiteAdapter
 
 
 @pytest.fixture
@@ -33,3 +36,96 @@ async def test_connect_to_aiosqlite_db_and_select_items(sql, aiosqlite_conn):
     )
     items1 = await queries.get_list(conn=aiosqlite_conn, flag=False)
     assert len(items1) == 1
+
+
+@pytest.mark.asyncio
+async def test_select_cursor_streams_rows_from_aiosqlite(sql, aiosqlite_conn):
+    queries = load_from_str(sql, "aiosqlite")
+
+    async with queries.get_list_cursor(aiosqlite_conn, flag=True) as cur:
+        rows = [row async for row in cur]
+
+    assert rows == [("a", 1)]
+
+
+@pytest.mark.asyncio
+async def test_iter_fetches_rows_in_batches(mocker, sql, aiosqlite_conn):
+    queries = load_from_str(sql, "aiosqlite", fetch_size=2)
+    for title in "bcd":
+        await queries.create_item(
+            conn=aiosqlite_conn, flag=True, revealed=False, title=title
+        )
+    fetchmany = mocker.spy(aiosqlite.Cursor, "fetchmany")
+
+    rows = [row async for row in queries.get_list_iter(aiosqlite_conn, flag=True)]
+    assert sorted(title for title, _ in rows) == ["a", "b", "c", "d"]
+    assert [call.args[1] for call in fetchmany.call_args_list] == [2, 2, 2]
+
+    fetchmany.reset_mock()
+    queries.fetch_sizes["get_list"] = 3
+    rows = [row async for row in queries.get_list_iter(aiosqlite_conn, flag=True)]
+    assert len(rows) == 4
+    assert [call.args[1] for call in fetchmany.call_args_list] == [3, 3]
+
+
+@pytest.mark.asyncio
+async def test_cursors_are_reused_unless_left_mid_way(sql, aiosqlite_conn):
+    queries = load_from_str(sql, "aiosqlite", fetch_size=1)
+    statement_cache = queries.driver_adapter.statement_cache
+    await queries.create_item(conn=aiosqlite_conn, flag=True, revealed=False, title="b")
+
+    await queries.get_list(aiosqlite_conn, flag=True)
+    cur = statement_cache.get(aiosqlite_conn, "get_list")
+    await queries.get_list(aiosqlite_conn, flag=True)
+    assert statement_cache.get(aiosqlite_conn, "get_list") is cur
+
+    rows = queries.get_list_iter(aiosqlite_conn, flag=True)
+    await rows.__anext__()
+    await rows.aclose()
+    assert statement_cache.get(aiosqlite_conn, "get_list") is None
+
+
+@pytest.mark.asyncio
+async def test_cursors_failing_to_execute_are_closed(aiosqlite_conn):
+    queries = load_from_str(
+        "-- name: add_item>\ninsert into items (id, title) values (:id, :title);",
+        "aiosqlite",
+    )
+    await queries.add_item(aiosqlite_conn, id=2, title="b")
+    cur = queries.driver_adapter.statement_cache.get(aiosqlite_conn, "add_item")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        await queries.add_item(aiosqlite_conn, id=2, title="b")
+    with pytest.raises(sqlite3.ProgrammingError, match="closed cursor"):
+        await cur.fetchall()
+    assert await queries.add_item(aiosqlite_conn, id=3, title="c") == 1
+
+
+@pytest.mark.asyncio
+async def test_insert_many_consumes_async_iterables_in_chunks(mocker, aiosqlite_conn):
+    queries = load_from_str(
+        "-- name: create_items>>\ninsert into items (title) values (:title);",
+        lambda: AioSQLiteAdapter(chunk_size=2),
+    )
+    executemany = mocker.spy(aiosqlite.Cursor, "executemany")
+
+    async def rows():
+        for n in range(5):
+            yield {"title": str(n)}
+
+    assert await queries.create_items(aiosqlite_conn, rows()) == 5
+    assert [len(call.args[2]) for call in executemany.call_args_list] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_scripts_run_all_statements_in_one_call(aiosqlite_conn):
+    queries = load_from_str(
+        "-- name: reset_items#\n"
+        "delete from items;\n"
+        "insert into items (title, revealed, flag) values ('x', 0, 1);",
+        "aiosqlite",
+    )
+
+    await queries.reset_items(aiosqlite_conn)
+    async with aiosqlite_conn.execute("select title from items") as cur:
+        assert await cur.fetchall() == [("x",)]
@@ -0,0 +1,200 @@
+from collections import namedtuple
+from pathlib import Path
+
+import pytest
+from aioquerysaur import load_from_str
+from aioquerysaur.adapters.asyncpg import AsyncPGAdapter
+
+Attribute = namedtuple("Attribute", ["name", "type"])
+Item = namedtuple("Item", ["title", "revealed"])
+
+
+class StubCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.fetches = []
+
+    async def fetch(self, n):
+        self.fetches.append(n)
+        rows, self.rows = self.rows[:n], self.rows[n:]
+        return rows
+
+
+class StubStatement:
+    def __init__(self, conn, sql):
+        self.conn = conn
+        self.sql = sql
+
+    def get_attributes(self):
+        return (Attribute("title", None), Attribute("revealed", None))
+
+    async def fetch(self, *args):
+        self.conn.calls.append(("fetch", self.sql, args))
+        return list(self.conn.rows)
+
+    def get_statusmsg(self):
+        return f"UPDATE {len(self.conn.rows)}"
+
+    async def fetchrow(self, *args):
+        self.conn.calls.append(("fetchrow", self.sql, args))
+        return self.conn.rows[0] if self.conn.rows else None
+
+    def cursor(self, *args):
+        self.conn.calls.append(("cursor", self.sql, args))
+        self.conn.cursor = StubCursor(self.conn.rows)
+
+        async def factory():
+            return self.conn.cursor
+
+        return factory()
+
+
+class StubTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.in_transaction = True
+
+    async def __aexit__(self, *exc_info):
+        self.conn.in_transaction = False
+
+
+class StubConnection:
+    """
+    Records what the adapter asks of an asyncpg connection
+    """
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+        self.prepared = []
+        self.in_transaction = False
+
+    async def prepare(self, sql):
+        self.prepared.append(sql)
+        return StubStatement(self, sql)
+
+    def is_in_transaction(self):
+        return self.in_transaction
+
+    def transaction(self):
+        return StubTransaction(self)
+
+    async def executemany(self, sql, args):
+        self.calls.append(("executemany", sql, list(args)))
+
+    async def copy_records_to_table(self, table, records, columns, schema_name):
+        records = [record async for record in records]
+        self.calls.append(("copy", table, records, columns, schema_name))
+        return f"COPY {len(records)}"
+
+
+@pytest.fixture
+def sql():
+    with open(Path(__file__).parent / "sql/items.sql") as f:
+        return f.read()
+
+
+def test_process_sql_compiles_named_parameters_to_positions():
+    queries = load_from_str(
+        "-- name: get_item$\nselect * from items where id = :id and :flag or :id",
+        "asyncpg",
+    )
+
+    assert queries.get_item.sql == "select * from items where id = $1 and $2 or $1"
+    assert queries.get_item.sql.parameters == ("id", "flag")
+
+
+@pytest.mark.asyncio
+async def test_statements_are_prepared_once_per_connection(sql):
+    queries = load_from_str(sql, "asyncpg")
+    conn, other_conn = StubConnection([("a", True)]), StubConnection()
+
+    assert await queries.get_list(conn, flag=True) == [("a", True)]
+    assert await queries.get_list(conn, flag=False) == [("a", True)]
+    await queries.get_list(other_conn, flag=True)
+
+    assert conn.prepared == [queries.get_list.sql]
+    assert other_conn.prepared == [queries.get_list.sql]
+    assert [args for _, _, args in conn.calls] == [(True,), (False,)]
+
+
+@pytest.mark.asyncio
+async def test_select_one_maps_record_class(sql):
+    queries = load_from_str(sql, "asyncpg")
+    conn = StubConnection([("a", True)])
+
+    result = await queries.driver_adapter.select_one(
+        conn, "get_list", queries.get_list.sql, {"flag": True}, Item
+    )
+
+    assert result == Item(title="a", revealed=True)
+
+
+@pytest.mark.asyncio
+async def test_iter_fetches_in_batches_inside_a_transaction(sql):
+    queries = load_from_str(sql, "asyncpg", fetch_size=2)
+    conn = StubConnection([("a", True), ("b", True), ("c", False)])
+
+    rows = [row async for row in queries.get_list_iter(conn, flag=True)]
+
+    assert rows == [("a", True), ("b", True), ("c", False)]
+    assert conn.cursor.fetches == [2, 2]
+    assert not conn.in_transaction
+
+
+@pytest.mark.asyncio
+async def test_columns_are_fetched_in_batches(sql):
+    queries = load_from_str(sql, "asyncpg", fetch_size=2)
+    conn = StubConnection([("a", True), ("b", True), ("c", False)])
+
+    columns = await queries.get_list_columns(conn, flag=True)
+
+    assert columns == {"title": ["a", "b", "c"], "revealed": [True, True, False]}
+    assert conn.cursor.fetches == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_plain_insert_many_uses_copy(sql):
+    queries = load_from_str(
+        sql + "\n-- name: create_items>>\ninsert into items (title, flag)"
+        " values (:title, :flag);",
+        "asyncpg",
+    )
+    conn = StubConnection()
+
+    async def rows():
+        yield {"title": "a", "flag": True}
+        yield ("b", False)
+
+    assert await queries.create_items(conn, rows()) == 2
+    assert conn.calls == [
+        ("copy", "items", [("a", True), ("b", False)], ["title", "flag"], None)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_other_many_queries_use_executemany():
+    queries = load_from_str(
+        "-- name: flag_items>>\nupdate items set flag = :flag where id = :id",
+        lambda: AsyncPGAdapter(chunk_size=2),
+    )
+    conn = StubConnection()
+    rows = ({"id": n, "flag": True} for n in range(3))
+
+    assert await queries.flag_items(conn, rows) == -1
+    assert conn.calls == [
+        ("executemany", queries.flag_items.sql, [(True, 0), (True, 1)]),
+        ("executemany", queries.flag_items.sql, [(True, 2)]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_writes_return_the_rowcount_of_their_status():
+    queries = load_from_str(
+        "-- name: flag_items>\nupdate items set flag = :flag", "asyncpg"
+    )
+    conn = StubConnection([("a", True), ("b", True)])
+
+    assert await queries.flag_items(conn, flag=False) == 2
@@ -0,0 +1,135 @@
+import asyncio
+
+import aiosqlite
+import pytest
+from aioquerysaur import AsyncConnectionPool, load_from_str
+from aioquerysaur.queries import QueriesContainer
+from aioquerysaur.models import QueryDatum, SQLOperationType
+
+SQL = """
+-- name: get-items
+select id, title from items order by id;
+
+-- name: get-item$
+select title from items where id = :id;
+
+-- name: create-item>
+insert into items (id, title) values (:id, :title);
+
+-- name: broken
+select * from missing;
+"""
+
+
+def test_sync_batch_runs_calls_in_order(sqlite3_conn):
+    queries = load_from_str(SQL, "sqlite3")
+    batch = queries.batch()
+    assert batch.create_item(sqlite3_conn, id=2, title="b") == 0
+    batch.get_item(sqlite3_conn, id=2)
+    batch.get_items(sqlite3_conn)
+    assert len(batch) == 3
+
+    assert batch.run() == [1, ("b",), [(1, "a"), (2, "b")]]
+    assert len(batch) == 0
+
+
+def test_only_query_methods_can_be_batched():
+    batch = load_from_str(SQL, "sqlite3").batch()
+    with pytest.raises(AttributeError, match="not supported in batches"):
+        batch.get_items_cursor
+    with pytest.raises(AttributeError):
+        batch.missing
+    with pytest.raises(AttributeError, match="not a query method"):
+        batch.batch
+
+
+@pytest.mark.asyncio
+async def test_async_batch_runs_columns_methods(aiosqlite_conn):
+    batch = load_from_str(SQL, "aiosqlite").batch()
+    batch.get_items_columns(aiosqlite_conn)
+    batch.get_item(aiosqlite_conn, id=1)
+    with pytest.raises(AttributeError, match="not supported in batches"):
+        batch.get_items_iter
+
+    columns, item = await batch.run()
+    assert list(columns["id"]) == [1]
+    assert columns["title"] == ["a"]
+    assert item == ("a",)
+
+
+@pytest.mark.asyncio
+async def test_async_batch_on_one_connection(aiosqlite_conn):
+    queries = load_from_str(SQL, "aiosqlite")
+    batch = queries.batch()
+    batch.create_item(aiosqlite_conn, id=2, title="b")
+    batch.get_item(aiosqlite_conn, id=2)
+    batch.get_items(aiosqlite_conn)
+
+    assert await batch.run() == [1, ("b",), [(1, "a"), (2, "b")]]
+
+
+@pytest.mark.asyncio
+async def test_async_batch_raises_the_first_error(aiosqlite_conn):
+    queries = load_from_str(SQL, "aiosqlite")
+    batch = queries.batch()
+    batch.get_items(aiosqlite_conn)
+    batch.broken(aiosqlite_conn)
+
+    with pytest.raises(Exception, match="missing"):
+        await batch.run()
+
+
+@pytest.mark.asyncio
+async def test_async_batch_runs_concurrently_on_pooled_connections(sqlite3_path):
+    pool = AsyncConnectionPool(lambda: aiosqlite.connect(sqlite3_path), max_size=3)
+    queries = load_from_str(SQL, "aiosqlite", pool=pool)
+    batch = queries.batch()
+    for _ in range(3):
+        batch.get_items()
+    assert await batch.run() == [[(1, "a")]] * 3
+    assert pool.size == 3
+
+    async with queries.connection():
+        batch.get_item(id=1)
+        batch.get_items()
+        assert await batch.run() == [("a",), [(1, "a")]]
+    assert pool.size == 3
+    await pool.close()
+
+
+class SerialAdapter:
+    # one call at a time per connection, like asyncpg
+    is_aio_driver = True
+
+    def __init__(self):
+        self.active = set()
+        self.log = []
+
+    async def select(self, conn, query_name, sql, parameters, record_class=None):
+        assert conn not in self.active, "connection in use"
+        self.active.add(conn)
+        self.log.append((conn, "start"))
+        await asyncio.sleep(0)
+        self.log.append((conn, "end"))
+        self.active.discard(conn)
+        return [conn]
+
+    def select_cursor(self, conn, query_name, sql, parameters):
+        raise NotImplementedError
+
+    select_iter = select_cursor
+
+
+@pytest.mark.asyncio
+async def test_async_batch_keeps_calls_per_connection_serial():
+    adapter = SerialAdapter()
+    queries = QueriesContainer(adapter).load_from_list(
+        [QueryDatum("get", SQLOperationType.SELECT, "select 1")]
+    )
+    batch = queries.batch()
+    for conn in ("a", "b", "a", "b"):
+        batch.get(conn)
+
+    assert await batch.run() == [["a"], ["b"], ["a"], ["b"]]
+    # the two connections ran side by side
+    assert adapter.log[:2] == [("a", "start"), ("b", "start")]
@@ -0,0 +1,111 @@
+import asyncio
+import sqlite3
+import threading
+from functools import partial
+
+import pytest
+from aioquerysaur import load_from_str
+from aioquerysaur.adapters.bridge import AsyncBridgeAdapter
+
+SQL = """
+-- name: get-items
+select id, title from items order by id;
+
+-- name: get-item$
+select title from items where id = :id;
+
+-- name: add-item>
+insert into items (id, title) values (:id, :title);
+
+-- name: add-items>>
+insert into items (id, title) values (:id, :title);
+"""
+
+
+@pytest.fixture
+def bridge():
+    adapter = AsyncBridgeAdapter("sqlite3", max_workers=2)
+    yield adapter
+    adapter.close()
+
+
+def connect(path):
+    return sqlite3.connect(path, uri=True, check_same_thread=False)
+
+
+@pytest.mark.asyncio
+async def test_sync_adapter_calls_are_awaitable(sqlite3_path, bridge):
+    queries = load_from_str(SQL, lambda: bridge)
+    assert queries.is_aio
+    conn = connect(sqlite3_path)
+
+    await queries.add_item(conn, id=2, title="b")
+    assert await queries.get_item(conn, id=2) == ("b",)
+
+    async def titles():
+        for i in range(3, 6):
+            yield {"id": i, "title": str(i)}
+
+    assert await queries.add_items(conn, titles()) == 3
+    assert await queries.add_items(conn, [{"id": 6, "title": "6"}]) == 1
+    assert len(await queries.get_items(conn)) == 6
+
+    async with queries.get_items_cursor(conn) as cur:
+        assert await cur.fetchone() == (1, "a")
+        assert [row async for row in cur][0] == (2, "b")
+    assert [row async for row in queries.get_items_iter(conn)][-1] == (6, "6")
+    assert list(await queries.get_items_columns(conn)) == ["id", "title"]
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_connections_keep_their_thread(sqlite3_path, bridge):
+    conns = [connect(sqlite3_path) for _ in range(4)]
+    threads = {id(conn): set() for conn in conns}
+
+    def thread_of(conn):
+        threads[id(conn)].add(threading.get_ident())
+
+    await asyncio.gather(*(bridge.run(conn, thread_of, conn) for conn in conns * 10))
+    assert all(len(idents) == 1 for idents in threads.values())
+    for conn in conns:
+        conn.close()
+
+
+@pytest.mark.asyncio
+async def test_calls_wait_for_a_free_slot(sqlite3_path):
+    bridge = AsyncBridgeAdapter("sqlite3", max_workers=2, max_pending=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    first = asyncio.ensure_future(bridge.run(object(), block))
+    second = asyncio.ensure_future(bridge.run(object(), lambda: "done"))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+    await asyncio.sleep(0.01)
+    # the other thread is idle, the call waits on the loop for the slot
+    assert not second.done()
+
+    release.set()
+    await first
+    assert await second == "done"
+
+    stats = bridge.stats()
+    assert stats["calls"] == 2
+    assert stats["queue_wait"]["max"] >= stats["queue_wait"]["p50"] > 0
+    assert stats["execution"]["total"] > 0
+    bridge.close()
+
+
+def test_only_sync_adapters_are_bridged():
+    with pytest.raises(ValueError):
+        AsyncBridgeAdapter("aiosqlite")
+    with pytest.raises(ValueError):
+        AsyncBridgeAdapter("nope")
+    # e.g. registered as a driver adapter of its own
+    queries = load_from_str(SQL, partial(AsyncBridgeAdapter, "sqlite3"))
+    assert queries.driver_adapter.adapter.__class__.__name__ == "SQLite3DriverAdapter"
+    assert queries.driver_adapter.explain is not None
@@ -0,0 +1,46 @@
+import asyncio
+import sys
+
+from aioquerysaur import load_from_str
+
+SQL = "-- name: get_item$\nselect * from items where id = :id"
+
+
+class NoopAdapter:
+    is_aio_driver = True
+
+    @staticmethod
+    def process_sql(_query_name, _op_type, sql):
+        return sql
+
+    @staticmethod
+    async def select_one(conn, _query_name, sql, parameters, record_class=None):
+        return parameters
+
+
+def test_async_methods_return_the_adapter_coroutine():
+    queries = load_from_str(SQL, NoopAdapter)
+
+    coro = queries.get_item(None, id=1)
+    assert coro.cr_code is NoopAdapter.select_one.__code__
+    assert asyncio.run(coro) == {"id": 1}
+
+
+def test_generated_methods_do_no_work_per_call_beyond_binding():
+    queries = load_from_str(SQL, NoopAdapter)
+    frames = []
+
+    def profile(frame, event, _arg):
+        if event == "call":
+            frames.append((frame.f_globals["__name__"], frame.f_code.co_name))
+
+    sys.setprofile(profile)
+    try:
+        coro = queries.get_item(None, id=1)
+    finally:
+        sys.setprofile(None)
+    coro.close()
+
+    # no parsing or lookups, the method and its binder are the only python
+    # frames before the adapter's coroutine, see benchmarks/bench_call_overhead
+    assert frames == [("aioquerysaur.queries", "fn"), ("aioquerysaur.queries", "bind")]
@@ -0,0 +1,89 @@
+import sqlite3
+from array import array
+
+import pytest
+from aioquerysaur import load_from_str
+from aioquerysaur.columns import ColumnsBuilder
+
+SQL = """
+-- name: get-items
+select id, title, flag from items order by id;
+
+-- name: get-ratios
+select id, id / 4.0 as ratio from items where id > :min_id order by id;
+"""
+
+
+def fill(conn, n):
+    conn.executemany(
+        "insert into items (id, title, flag) values (?, ?, ?)",
+        [(i, f"t{i}", None if i % 10 == 0 else i % 2) for i in range(2, n + 2)],
+    )
+
+
+def test_columns_are_built_from_batches(sqlite3_conn):
+    fill(sqlite3_conn, 250)
+    queries = load_from_str(SQL, "sqlite3", fetch_size=100)
+    assert "get_items_columns" in queries.available
+
+    columns = queries.get_items_columns(sqlite3_conn)
+    rows = queries.get_items(sqlite3_conn)
+    assert list(columns) == ["id", "title", "flag"]
+    assert isinstance(columns["id"], array) and columns["id"].typecode == "q"
+    # NULLs turn the column into a list
+    assert isinstance(columns["flag"], list)
+    assert isinstance(columns["title"], list)
+    assert list(zip(*columns.values())) == rows
+
+    ratios = queries.get_ratios_columns(sqlite3_conn, min_id=200)
+    assert ratios["ratio"].typecode == "d"
+    assert list(ratios["ratio"]) == [i / 4 for i in range(201, 252)]
+
+
+def test_row_factory_is_ignored(sqlite3_conn):
+    sqlite3_conn.row_factory = sqlite3.Row
+    queries = load_from_str(SQL, "sqlite3")
+    assert queries.get_items_columns(sqlite3_conn)["title"] == ["a"]
+    assert queries.get_items(sqlite3_conn)[0]["title"] == "a"
+
+
+@pytest.mark.asyncio
+async def test_async_columns(aiosqlite_conn):
+    queries = load_from_str(SQL, "aiosqlite")
+    columns = await queries.get_ratios_columns(aiosqlite_conn, min_id=0)
+    assert dict(columns) == {"id": array("q", [1]), "ratio": array("d", [0.25])}
+    # sqlite describes no types, without rows there is nothing to go by
+    assert (await queries.get_ratios_columns(aiosqlite_conn, min_id=1)) == {
+        "id": [],
+        "ratio": [],
+    }
+
+
+def test_builder_types_from_description():
+    columns = ColumnsBuilder(
+        [("id", 23), ("score", 701), ("ok", 16), ("name", 25)], use_numpy=False
+    )
+    columns.add([(1, 0.5, True, "a"), (2, 1.5, False, "b")])
+    columns.add([(2**70, None, None, "c")])
+
+    assert columns.build() == {
+        "id": [1, 2, 2**70],
+        "score": [0.5, 1.5, None],
+        "ok": [True, False, None],
+        "name": ["a", "b", "c"],
+    }
+
+    empty = ColumnsBuilder([("id", "int8"), ("name", "text")], use_numpy=False)
+    assert empty.build() == {"id": array("q"), "name": []}
+
+
+def test_builder_numpy_arrays():
+    numpy = pytest.importorskip("numpy")
+    columns = ColumnsBuilder([("id", 20), ("ok", 16), ("name", 25)], use_numpy=True)
+    columns.add([(1, True, "a"), (2, False, None)])
+    result = columns.build()
+
+    assert result["id"].dtype == numpy.int64
+    assert result["ok"].dtype == numpy.bool_
+    assert result["name"].dtype == object
+    assert result["name"].tolist() == ["a", None]
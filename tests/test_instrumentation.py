@@ -0,0 +1,178 @@
+import pytest
+from aioquerysaur import load_from_file, load_from_str
+from aioquerysaur.instrumentation import LatencyHistogram
+from aioquerysaur.models import SQLOperationType
+
+SQL = """
+-- name: get-items
+select id, title from items;
+
+-- name: get-item$
+select id, title from items where id = :id;
+
+-- name: create-items>>
+insert into items (title, flag) values (:title, :flag);
+
+-- name: broken
+select * from missing;
+"""
+
+
+def test_methods_are_only_wrapped_while_instrumented():
+    queries = load_from_str(SQL, "sqlite3")
+    plain = queries.get_items
+
+    queries.instrument()
+    assert queries.get_items.__code__ is not plain.__code__
+
+    queries.uninstrument()
+    assert queries.get_items.__code__ is plain.__code__
+    assert queries.stats() == {}
+
+
+def test_hooks_and_stats(sqlite3_conn):
+    queries = load_from_str(SQL, "sqlite3")
+    events = []
+    queries.instrument(before=events.append, after=events.append)
+
+    queries.get_items(sqlite3_conn)
+    queries.get_item(sqlite3_conn, id=5)
+    queries.create_items(sqlite3_conn, [{"title": "b", "flag": 1}] * 3)
+    with pytest.raises(Exception):
+        queries.broken(sqlite3_conn)
+
+    before, after = events[0::2], events[1::2]
+    assert [e.query_name for e in before] == [
+        "get_items",
+        "get_item",
+        "create_items",
+        "broken",
+    ]
+    assert before[0].duration is None
+    assert [(e.operation_type, e.rowcount) for e in after] == [
+        (SQLOperationType.SELECT, 1),
+        (SQLOperationType.SELECT_ONE, 0),
+        (SQLOperationType.INSERT_UPDATE_DELETE_MANY, 3),
+        (SQLOperationType.SELECT, None),
+    ]
+    assert all(e.duration > 0 for e in after)
+    assert after[-1].error is not None
+
+    stats = queries.stats()
+    assert {name for name, s in stats.items() if s["calls"]} == {
+        "get_items",
+        "get_item",
+        "create_items",
+        "broken",
+    }
+    assert stats["create_items"]["rows"] == 3
+    assert stats["broken"]["errors"] == 1
+    assert stats["get_items"]["calls"] == 1
+    assert 0 < stats["get_items"]["p50"] <= stats["get_items"]["max"] * 1.2
+
+
+def test_children_are_instrumented_with_dotted_names(sqlite3_conn, tmpdir):
+    sql_dir = tmpdir.mkdir("sql")
+    sql_dir.mkdir("child").join("items.sql").write(SQL)
+    queries = load_from_file(str(sql_dir), "sqlite3")
+    queries.instrument()
+    queries.child.get_items(sqlite3_conn)
+
+    stats = queries.stats()
+    assert stats["child.get_items"]["calls"] == 1
+    assert stats["child.get_item"]["calls"] == 0
+
+
+def test_writes_record_their_rowcount(sqlite3_conn):
+    queries = load_from_str(
+        SQL + "\n-- name: flag-items>\nupdate items set flag = :flag;", "sqlite3"
+    )
+    events = []
+    queries.instrument(after=events.append)
+
+    assert queries.flag_items(sqlite3_conn, flag=0) == 1
+    assert [(e.query_name, e.rowcount) for e in events] == [("flag_items", 1)]
+    assert queries.stats()["flag_items"]["rows"] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_iterators_count_rows(aiosqlite_conn):
+    queries = load_from_str(SQL, "aiosqlite")
+    events = []
+    queries.instrument(after=events.append)
+
+    assert [row async for row in queries.get_items_iter(aiosqlite_conn)] == [(1, "a")]
+    assert await queries.get_item(aiosqlite_conn, id=1) == (1, "a")
+
+    assert [(e.query_name, e.rowcount) for e in events] == [
+        ("get_items_iter", 1),
+        ("get_item", 1),
+    ]
+    assert queries.stats()["get_items_iter"]["rows"] == 1
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+
+    assert histogram.count == 100
+    assert histogram.percentile(50) == pytest.approx(0.05, rel=0.2)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.2)
+    assert histogram.percentile(100) == 0.1
+
+
+def test_profiler_samples_slow_calls_with_plans(sqlite3_conn):
+    queries = load_from_str(SQL, "sqlite3")
+    profiler = queries.profile(threshold=0.0, maxlen=2, explain=True)
+
+    queries.get_items(sqlite3_conn)
+    queries.get_item(sqlite3_conn, id=1)
+    queries.create_items(sqlite3_conn, [{"title": "b", "flag": 1}])
+    with pytest.raises(Exception):
+        queries.broken(sqlite3_conn)
+
+    create_items, broken = profiler.samples
+    assert create_items.query_name == "create_items"
+    assert create_items.parameters is None
+    assert create_items.plan is None
+    assert broken.sql == "select * from missing;"
+    assert broken.error is not None and broken.plan is None
+
+    profiler.clear()
+    queries.get_item(sqlite3_conn, id=1)
+    (sample,) = profiler.samples
+    # as bound for the driver, in the positional form of the sql
+    assert sample.parameters == (1,)
+    assert sample.rowcount == 1
+    assert "items" in str(sample.plan)
+
+
+def test_profiler_sample_rate(sqlite3_conn):
+    queries = load_from_str(SQL, "sqlite3")
+    profiler = queries.profile(sample_rate=0.0)
+    for _ in range(10):
+        queries.get_items(sqlite3_conn)
+    assert not profiler.samples
+
+    profiler.sample_rate = 1.0
+    for _ in range(10):
+        queries.get_items(sqlite3_conn)
+    assert len(profiler.samples) == 10
+
+    with pytest.raises(ValueError):
+        queries.profile(sample_rate=2)
+
+
+@pytest.mark.asyncio
+async def test_async_profiler_explains_on_the_same_connection(aiosqlite_conn):
+    queries = load_from_str(SQL, "aiosqlite")
+    profiler = queries.profile(sample_rate=1.0, explain=True)
+
+    await queries.get_items(aiosqlite_conn)
+    [row async for row in queries.get_items_iter(aiosqlite_conn)]
+
+    get_items, get_items_iter = profiler.samples
+    assert "SCAN" in str(get_items.plan)
+    assert get_items_iter.query_name == "get_items_iter"
+    assert get_items_iter.rowcount == 1 and get_items_iter.plan is None
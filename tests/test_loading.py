@@ -1,8 +1,11 @@
+import os
 from pathlib import Path
 import pytest
 
 from aioquerysaur import load_from_file, load_from_str, load_here
-from aioquerysaur.exceptions import SQLLoadException
+from aioquerysaur.exceptions import SQLLoadException, SQLParseException
+from aioquerysaur.loaders.cache import QueryDataCache, content_signature
+from aioquerysaur.loaders.text import TextLoader
 from aioquerysaur.queries import QueriesContainer
 
 
@@ -80,3 +83,151 @@ def test_correct_names_are_made_for_loaded_queries(sql):
 
     assert "get_list" in queries.available
     assert "get_list_alt" in queries.available
+
+
+def test_load_from_file_reuses_cached_query_data(mocker, tmpdir, sql_dir):
+    cache_path = Path(tmpdir.strpath) / "queries.cache"
+    queries = load_from_file(sql_dir, "psycopg2", cache_path=cache_path)
+    assert cache_path.exists()
+
+    parse = mocker.spy(TextLoader, "_parse_sql")
+    cached_queries = load_from_file(sql_dir, "psycopg2", cache_path=cache_path)
+
+    parse.assert_not_called()
+    assert cached_queries.available == queries.available
+    assert cached_queries.nested.get_list_3.sql == queries.nested.get_list_3.sql
+
+
+def test_load_from_file_reparses_changed_files(mocker, tmpdir, sql):
+    cache_path = Path(tmpdir.strpath) / "queries.cache"
+    sql_file = Path(tmpdir.strpath) / "items.sql"
+    sql_file.write_text(sql)
+    load_from_file(sql_file, "sqlite3", cache_path=cache_path)
+
+    sql_file.write_text(sql + "\n\n-- name: get_all\nselect * from items;")
+    queries = load_from_file(sql_file, "sqlite3", cache_path=cache_path)
+
+    assert "get_all" in queries.available
+
+
+def test_load_from_file_reparses_edits_that_keep_mtime_and_size(tmpdir, sql):
+    cache_path = Path(tmpdir.strpath) / "queries.cache"
+    sql_file = Path(tmpdir.strpath) / "items.sql"
+    sql_file.write_text(sql)
+    load_from_file(sql_file, "sqlite3", cache_path=cache_path)
+
+    stat = sql_file.stat()
+    sql_file.write_text(sql.replace("get-list", "get-lust"))
+    os.utime(sql_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    queries = load_from_file(sql_file, "sqlite3", cache_path=cache_path)
+
+    assert "get_lust" in queries.available
+
+
+def test_load_from_file_ignores_corrupted_cache(tmpdir, sql_file):
+    cache_path = Path(tmpdir.strpath) / "queries.cache"
+    cache_path.write_bytes(b"not a pickle")
+
+    queries = load_from_file(sql_file, "sqlite3", cache_path=cache_path)
+
+    assert "get_list" in queries.available
+    cache = QueryDataCache(cache_path, queries.driver_adapter)
+    assert cache.get(sql_file, content_signature(sql_file)) is not None
+
+
+def test_lazy_load_defers_parsing_until_first_access(mocker, sql_dir):
+    queries = load_from_file(sql_dir, "psycopg2")
+    parse = mocker.spy(TextLoader, "_parse_sql")
+
+    lazy_queries = load_from_file(sql_dir, "psycopg2", lazy=True)
+    assert lazy_queries.available == queries.available
+    parse.assert_not_called()
+
+    assert lazy_queries.nested.get_list_3.sql == queries.nested.get_list_3.sql
+    assert parse.call_count == 1
+
+    lazy_queries.nested.get_list_4
+    assert parse.call_count == 1
+
+
+def test_lazy_load_saves_the_cache_soon_after_parsing(mocker, tmpdir, sql_dir):
+    cache_path = Path(tmpdir.strpath) / "queries.cache"
+    register = mocker.patch("atexit.register")
+    timer = mocker.patch("threading.Timer")
+
+    queries = load_from_file(sql_dir, "psycopg2", cache_path=cache_path, lazy=True)
+    queries.get_list_1
+    queries.nested.get_list_3
+    assert not cache_path.exists()
+
+    # one save for both files, and one more on exit
+    ((delay, save_later),) = [call.args for call in timer.call_args_list]
+    (save,) = [call.args[0] for call in register.call_args_list]
+    save_later()
+    assert cache_path.exists()
+    parse = mocker.spy(TextLoader, "_parse_sql")
+    cached_queries = load_from_file(sql_dir, "psycopg2", cache_path=cache_path)
+    parse.assert_not_called()
+    assert cached_queries.nested.get_list_3.sql == queries.nested.get_list_3.sql
+    assert save == save_later.__self__.save
+
+
+def test_lazy_load_raises_attribute_error_for_unknown_query(sql_file):
+    queries = load_from_file(sql_file, "sqlite3", lazy=True)
+
+    assert "get_list_cursor" in queries.available
+    with pytest.raises(AttributeError):
+        queries.i_dont_exist
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+@pytest.mark.parametrize("adapter", ["psycopg2", "sqlite3", "aiosqlite", "asyncpg"])
+def test_parallel_load_builds_same_tree(sql_dir, adapter, use_processes):
+    queries = load_from_file(sql_dir, adapter)
+
+    parallel_queries = load_from_file(
+        sql_dir, adapter, workers=2, use_processes=use_processes
+    )
+
+    assert parallel_queries.available == queries.available
+    assert parallel_queries.nested.get_list_3.sql == queries.nested.get_list_3.sql
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_duplicate_query_names_raise(tmpdir, sql, workers):
+    for name in ("a.sql", "b.sql", "c.sql"):
+        (Path(tmpdir.strpath) / name).write_text(sql)
+
+    with pytest.raises(SQLLoadException, match='"get_list" in .*b.sql'):
+        load_from_file(tmpdir.strpath, "sqlite3", workers=workers)
+
+
+def test_duplicate_query_names_raise_within_a_file_or_string(tmpdir, sql):
+    sql_path = Path(tmpdir.strpath) / "a.sql"
+    sql_path.write_text(sql + "\n" + sql)
+
+    with pytest.raises(SQLLoadException, match='"get_list"$'):
+        load_from_str(sql + "\n" + sql, "sqlite3")
+    with pytest.raises(SQLLoadException, match='"get_list" in .*a.sql'):
+        load_from_file(sql_path, "sqlite3")
+    with pytest.raises(SQLLoadException, match='"get_list" in .*a.sql'):
+        load_from_file(sql_path, "sqlite3", lazy=True)
+
+
+def test_lazy_directory_loads_raise_on_duplicate_query_names(tmpdir, sql):
+    for name in ("a.sql", "b.sql"):
+        (Path(tmpdir.strpath) / name).write_text(sql)
+
+    with pytest.raises(SQLLoadException, match='"get_list" in .*b.sql'):
+        load_from_file(tmpdir.strpath, "sqlite3", lazy=True)
+
+
+@pytest.mark.parametrize("options", [{"workers": 2}, {"use_processes": True}])
+def test_lazy_loads_take_no_workers(sql_dir, options):
+    with pytest.raises(ValueError, match="lazy"):
+        load_from_file(sql_dir, "sqlite3", lazy=True, **options)
+
+
+def test_scripts_take_no_parameters():
+    with pytest.raises(SQLParseException, match='"setup" uses flag'):
+        load_from_str("-- name: setup#\nupdate items set flag = :flag;", "sqlite3")
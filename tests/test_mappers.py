@@ -0,0 +1,160 @@
+from collections import namedtuple
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import NamedTuple
+
+import pytest
+from aioquerysaur import (
+    SQLLoadException,
+    SQLParseException,
+    load_from_file,
+    load_from_str,
+)
+from aioquerysaur.adapters.sqlite3 import SQLite3DriverAdapter
+from aioquerysaur.mappers import compile_row_mapper, get_row_mapper
+
+Item = namedtuple("Item", ["title", "revealed"])
+
+
+@dataclass
+class ItemData:
+    title: str
+    revealed: bool
+    tags: list = field(default_factory=list)
+
+
+class SlottedItem:
+    __slots__ = ("title", "revealed")
+
+
+class PlainItem:
+    def __init__(self, title, revealed=None, **extra):
+        self.title = title
+        self.revealed = revealed
+        self.extra = extra
+
+
+def test_mapper_is_cached_per_record_class_and_columns():
+    description = (("title", None), ("revealed", None))
+    mapper = get_row_mapper(Item, description)
+
+    assert get_row_mapper(Item, description) is mapper
+    assert get_row_mapper(Item, description[::-1]) is not mapper
+
+
+def test_namedtuple_mapper_reorders_columns():
+    mapper = compile_row_mapper(Item, ("revealed", "title"))
+
+    assert mapper((True, "a")) == Item(title="a", revealed=True)
+
+
+def test_dataclass_mapper_builds_positionally():
+    mapper = compile_row_mapper(ItemData, ("revealed", "title"))
+
+    assert mapper((False, "a")) == ItemData(title="a", revealed=False)
+
+
+def test_slots_mapper_fills_slots():
+    record = compile_row_mapper(SlottedItem, ("title", "revealed"))(("a", True))
+
+    assert (record.title, record.revealed) == ("a", True)
+
+
+def test_tuple_and_dict_mappers():
+    assert compile_row_mapper(tuple, ("title",))(("a",)) == ("a",)
+    assert compile_row_mapper(dict, ("title",))(("a",)) == {"title": "a"}
+
+
+def test_falls_back_to_keyword_arguments():
+    record = compile_row_mapper(PlainItem, ("title", "flag"))(("a", True))
+
+    assert record.title == "a"
+    assert record.extra == {"flag": True}
+
+
+def test_sqlite3_select_maps_rows_to_record_class(sqlite3_conn):
+    rows = SQLite3DriverAdapter().select(
+        sqlite3_conn, "get_items", "select title, revealed from items", [], Item
+    )
+
+    assert rows == [Item(title="a", revealed=1)]
+
+
+RECORD_SQL = """
+-- name: get-items
+-- record_class: Item
+select title, revealed from items;
+
+-- name: get-item$
+select id, title, count(*) from items where id = :id;
+"""
+
+
+def test_record_classes_are_given_by_name(sqlite3_conn):
+    queries = load_from_str(RECORD_SQL, "sqlite3", record_classes={"Item": Item})
+
+    assert queries.get_items(sqlite3_conn) == [Item(title="a", revealed=1)]
+    assert queries.get_item(sqlite3_conn, id=1) == (1, "a", 1)
+
+    with pytest.raises(SQLLoadException):
+        load_from_str(RECORD_SQL, "sqlite3")
+    with pytest.raises(SQLParseException):
+        load_from_str("-- name: add>\n-- record_class: Item\nselect 1", "sqlite3")
+
+
+def test_auto_record_classes_are_generated_per_query(sqlite3_conn):
+    queries = load_from_str(
+        RECORD_SQL, "sqlite3", record_classes={"Item": Item}, auto_record_classes=True
+    )
+
+    item = queries.get_item(sqlite3_conn, id=1)
+    assert type(item).__name__ == "GetItemRecord"
+    assert (item.id, item.title, item._2) == (1, "a", 1)
+    assert not hasattr(item, "__dict__")
+    assert type(queries.get_item(sqlite3_conn, id=1)) is type(item)
+    # an explicit record class wins
+    assert type(queries.get_items(sqlite3_conn)[0]) is Item
+
+
+def test_record_classes_are_not_cached(tmpdir, sqlite3_conn):
+    sql_file = Path(tmpdir.strpath) / "items.sql"
+    sql_file.write_text(RECORD_SQL)
+    cache_path = Path(tmpdir.strpath) / "cache"
+
+    class LocalItem(NamedTuple):
+        title: str
+        revealed: bool
+
+    for _ in range(2):
+        queries = load_from_file(
+            sql_file,
+            "sqlite3",
+            cache_path=cache_path,
+            record_classes={"Item": LocalItem},
+        )
+        assert queries.get_items(sqlite3_conn) == [LocalItem("a", 1)]
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_record_classes_are_set_after_parallel_parsing(
+    tmpdir, sqlite3_conn, use_processes
+):
+    for name in ("a.sql", "b.sql"):
+        (Path(tmpdir.strpath) / name).write_text(RECORD_SQL.replace("get-", name[0]))
+
+    class LocalItem(NamedTuple):
+        title: str
+        revealed: bool
+
+    queries = load_from_file(
+        tmpdir.strpath,
+        "sqlite3",
+        workers=2,
+        use_processes=use_processes,
+        record_classes={"Item": LocalItem},
+        auto_record_classes=True,
+    )
+
+    assert queries.aitems(sqlite3_conn) == [LocalItem("a", 1)]
+    assert queries.bitems(sqlite3_conn) == [LocalItem("a", 1)]
+    assert type(queries.bitem(sqlite3_conn, id=1)).__name__ == "BitemRecord"
@@ -0,0 +1,190 @@
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+
+import aiosqlite
+import pytest
+from aioquerysaur import (
+    AsyncConnectionPool,
+    ConnectionPool,
+    SQLPoolException,
+    load_from_str,
+)
+
+
+@pytest.fixture
+def sql():
+    with open(Path(__file__).parent / "sql/items.sql") as f:
+        return f.read()
+
+
+@pytest.fixture
+def pool(sqlite3_path):
+    pool = ConnectionPool(
+        lambda: sqlite3.connect(sqlite3_path, check_same_thread=False),
+        max_size=2,
+        timeout=0.1,
+    )
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+async def aio_pool(sqlite3_path):
+    pool = AsyncConnectionPool(lambda: aiosqlite.connect(sqlite3_path), max_size=2)
+    yield pool
+    await pool.close()
+
+
+def test_methods_run_on_pooled_connections(sql, pool):
+    queries = load_from_str(sql, "sqlite3", pool=pool)
+
+    queries.create_item(title="b", revealed=False, flag=True)
+    assert len(queries.get_list(flag=True)) == 2
+    with queries.get_list_cursor(flag=True) as cur:
+        assert len(cur.fetchall()) == 2
+    assert (pool.size, pool.idle) == (1, 1)
+
+
+def test_pinned_connection_is_shared_and_committed_at_the_end(sql, pool):
+    queries = load_from_str(sql, "sqlite3", pool=pool)
+
+    with queries.connection() as conn:
+        queries.create_item(title="b", revealed=False, flag=True)
+        assert conn.in_transaction
+        assert len(queries.get_list(flag=True)) == 2
+        assert pool.pinned() is conn
+    assert not conn.in_transaction
+
+    with pytest.raises(ZeroDivisionError):
+        with queries.connection():
+            queries.create_item(title="c", revealed=False, flag=True)
+            1 / 0
+    assert len(queries.get_list(flag=True)) == 2
+
+
+def test_acquire_times_out_when_all_connections_are_in_use(pool):
+    conns = [pool.acquire(), pool.acquire()]
+
+    with pytest.raises(SQLPoolException):
+        pool.acquire()
+
+    waiter = threading.Timer(0.01, pool.release, [conns[0]])
+    waiter.start()
+    assert pool.acquire() is conns[0]
+
+
+def test_unhealthy_connections_are_replaced(sqlite3_path):
+    pool = ConnectionPool(
+        lambda: sqlite3.connect(sqlite3_path),
+        health_check=lambda conn: conn.execute("select 1"),
+    )
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()
+
+    assert pool.acquire() is not conn
+    assert pool.size == 1
+
+
+def test_pool_must_match_driver(sql, pool):
+    with pytest.raises(ValueError):
+        load_from_str(sql, "aiosqlite", pool=pool)
+
+
+def test_set_pool_rebuilds_methods(sql, pool, sqlite3_conn):
+    queries = load_from_str(sql, "sqlite3")
+    assert len(queries.get_list(sqlite3_conn, flag=True)) == 1
+
+    queries.set_pool(pool)
+    assert len(queries.get_list(flag=True)) == 1
+
+    queries.set_pool(None)
+    assert len(queries.get_list(sqlite3_conn, flag=True)) == 1
+
+
+def test_closed_connections_are_evicted_from_the_statement_cache(sql, pool):
+    queries = load_from_str(sql, "sqlite3", pool=pool)
+    queries.set_pool(pool)
+    assert pool.on_discard == [queries.driver_adapter.evict]
+
+    queries.get_list(flag=True)
+    statements = queries.driver_adapter.statement_cache
+    assert statements.cache_info().currsize == 1
+    pool.close()
+    assert statements.cache_info().currsize == 0
+
+
+@pytest.mark.asyncio
+async def test_async_methods_run_on_pooled_connections(sql, aio_pool):
+    queries = load_from_str(sql, "aiosqlite", pool=aio_pool)
+
+    await queries.create_item(title="b", revealed=False, flag=True)
+    assert len(await queries.get_list(flag=True)) == 2
+    assert len([row async for row in queries.get_list_iter(flag=True)]) == 2
+    async with queries.get_list_cursor(flag=True) as cur:
+        assert len(await cur.fetchall()) == 2
+
+    async with queries.connection() as conn:
+        await queries.create_item(title="c", revealed=False, flag=True)
+        assert aio_pool.pinned() is conn
+        assert conn.in_transaction
+    assert not conn.in_transaction
+    assert (aio_pool.size, aio_pool.idle) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_iterators_broken_out_of_leave_no_pinned_connection(sql, aio_pool):
+    queries = load_from_str(sql, "aiosqlite", pool=aio_pool)
+    await queries.create_item(title="b", revealed=False, flag=True)
+
+    rows = queries.get_list_iter(flag=True)
+    async for _ in rows:
+        break
+    assert aio_pool.pinned() is None
+    await rows.aclose()
+    assert (aio_pool.size, aio_pool.idle) == (1, 1)
+
+    # closed from another task, as the finalizer of the loop does
+    rows = queries.get_list_iter(flag=True)
+    async for _ in rows:
+        break
+    await asyncio.create_task(rows.aclose())
+    assert (aio_pool.size, aio_pool.idle) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_times_out(sqlite3_path):
+    pool = AsyncConnectionPool(
+        lambda: aiosqlite.connect(sqlite3_path), max_size=1, timeout=0.01
+    )
+    conn = await pool.acquire()
+
+    with pytest.raises(SQLPoolException):
+        await pool.acquire()
+
+    await pool.release(conn)
+    assert await pool.acquire() is conn
+    await pool.release(conn)
+    await pool.close()
+
+
+def test_async_pool_can_be_created_outside_the_loop(sqlite3_path):
+    pool = AsyncConnectionPool(lambda: aiosqlite.connect(sqlite3_path), max_size=1)
+
+    async def use_twice():
+        conn = await pool.acquire()
+        # waits on the condition until the first connection is released
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        await pool.release(conn)
+        assert await waiter is conn
+        await pool.release(conn)
+        await pool.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(use_twice())
+    finally:
+        loop.close()
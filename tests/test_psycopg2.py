@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+from aioquerysaur import load_from_str
+from aioquerysaur.adapters.psycopg2 import PsycoPG2Adapter
+
+
+@pytest.fixture
+def sql():
+    with open(Path(__file__).parent / "sql/items.sql") as f:
+        return f.read()
+
+
+def test_select_cursor_uses_server_side_cursor(mocker, sql):
+    conn = mocker.MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    queries = load_from_str(sql, lambda: PsycoPG2Adapter(itersize=50))
+
+    with queries.get_list_cursor(conn, flag=True) as cur:
+        assert cur is cursor
+
+    _, kwargs = conn.cursor.call_args
+    assert kwargs["name"].startswith("get_list_")
+    assert cursor.itersize == 50
+    # positional, bound in the order of the sql's placeholders
+    cursor.execute.assert_called_once_with(queries.get_list.sql, (True,))
+
+
+@pytest.fixture
+def insert_sql():
+    return "-- name: create_items>>\ninsert into items (title, flag) values (:title, :flag);"
+
+
+def test_insert_many_sends_multi_row_values_per_chunk(mocker, insert_sql):
+    conn = mocker.MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.rowcount = 2
+    execute_values = mocker.patch("aioquerysaur.adapters.psycopg2.execute_values")
+    queries = load_from_str(insert_sql, lambda: PsycoPG2Adapter(chunk_size=2))
+
+    rows = [{"title": "a", "flag": True}, ("b", False), {"title": "c", "flag": None}]
+    assert queries.create_items(conn, rows) == 4
+
+    sql = "insert into items (title, flag) values %s"
+    assert execute_values.call_args_list == [
+        mocker.call(cursor, sql, [("a", True), ("b", False)], "(%s, %s)", page_size=2),
+        mocker.call(cursor, sql, [("c", None)], "(%s, %s)", page_size=1),
+    ]
+
+
+def test_insert_many_copies_rows_from_stdin(mocker, insert_sql):
+    conn = mocker.MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    copied = []
+    cursor.copy_expert.side_effect = lambda sql, fp: copied.append((sql, fp.read()))
+    queries = load_from_str(insert_sql, lambda: PsycoPG2Adapter(use_copy=True))
+
+    rows = ({"title": t, "flag": f} for t, f in [("a\tb", True), ("c\\", None)])
+    assert queries.create_items(conn, rows) == 2
+    assert copied == [("copy items (title, flag) from stdin", "a\\tb\tt\nc\\\\\t\\N\n")]
+
+
+def test_other_many_queries_run_executemany_per_chunk(mocker):
+    conn = mocker.MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.rowcount = 2
+    queries = load_from_str(
+        "-- name: flag_items>>\nupdate items set flag = :flag where id = :id",
+        lambda: PsycoPG2Adapter(chunk_size=2),
+    )
+
+    rows = [{"id": 1, "flag": True}, (False, 2), {"id": 3, "flag": None}]
+    assert queries.flag_items(conn, iter(rows)) == 4
+    sql = queries.flag_items.sql
+    assert cursor.executemany.call_args_list == [
+        mocker.call(sql, [(True, 1), (False, 2)]),
+        mocker.call(sql, [(None, 3)]),
+    ]
+
+
+def test_positional_arguments_repeat_for_each_placeholder(mocker):
+    conn = mocker.MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    queries = load_from_str(
+        "-- name: get_items\nselect * from items where id > :low and (flag or id = :low)",
+        "psycopg2",
+    )
+
+    queries.get_items(conn, 1)
+    queries.get_items(conn, low=2)
+    assert cursor.execute.call_args_list == [
+        mocker.call("select * from items where id > %s and (flag or id = %s)", (1, 1)),
+        mocker.call("select * from items where id > %s and (flag or id = %s)", (2, 2)),
+    ]
+
+
+def test_scripts_are_sent_in_one_execute_as_written(mocker):
+    conn = mocker.MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    script = "create table t (p text);\ninsert into t values ('100%'), ('a::b');"
+    queries = load_from_str(f"-- name: setup#\n{script}", "psycopg2")
+
+    queries.setup(conn)
+    cursor.execute.assert_called_once_with(script)
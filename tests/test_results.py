@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from aioquerysaur import (
+    SQLLoadException,
+    SQLParseException,
+    load_from_file,
+    load_from_str,
+)
+from aioquerysaur.results import AsyncResultCache, ResultCache, cache_key
+
+SQL = """
+-- name: get-titles
+-- Titles of flagged items
+-- cache: ttl=60, maxsize=10
+select title from items where flag = :flag;
+
+-- name: create-item>
+-- invalidates: get_titles
+insert into items (title, flag) values (:title, :flag);
+
+-- name: create-items>>
+insert into items (title, flag) values (:title, :flag);
+"""
+
+
+def test_directives_are_read_from_comments_above_the_sql():
+    queries = load_from_str(SQL, "sqlite3")
+    get_titles = queries._query_data["get_titles"]
+
+    assert get_titles.directives == {"cache": "ttl=60, maxsize=10"}
+    assert get_titles.sql == (
+        "-- Titles of flagged items\nselect title from items where flag = ?1;"
+    )
+    assert queries._query_data["create_item"].directives == {
+        "invalidates": "get_titles"
+    }
+    assert queries._query_data["create_items"].directives is None
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "-- name: create>\n-- cache: ttl=1\ninsert into items (title) values (1)",
+        "-- name: get\n-- invalidates: get\nselect 1",
+        "-- name: get\n-- cache: ttl=soon\nselect 1",
+        "-- name: get\n-- cache: size=1\nselect 1",
+    ],
+)
+def test_misplaced_or_invalid_directives_are_rejected(sql):
+    with pytest.raises(SQLParseException):
+        load_from_str(sql, "sqlite3")
+
+
+@pytest.mark.parametrize("name", ["get_itemz", "nested.get_titles"])
+def test_unknown_invalidated_queries_are_rejected(name):
+    sql = SQL.replace("invalidates: get_titles", f"invalidates: {name}")
+    with pytest.raises(SQLLoadException, match=f'invalidates unknown query "{name}"'):
+        load_from_str(sql, "sqlite3")
+
+
+def test_invalidated_queries_may_be_in_child_containers(tmpdir, sqlite3_conn):
+    path = Path(tmpdir.strpath)
+    (path / "nested").mkdir()
+    (path / "nested" / "titles.sql").write_text(SQL.split("-- name: create")[0])
+    (path / "items.sql").write_text(
+        "-- name: create-item>\n-- invalidates: nested.get_titles\n"
+        "insert into items (title, flag) values (:title, :flag);"
+    )
+
+    for lazy in (False, True):
+        queries = load_from_file(path, "sqlite3", lazy=lazy)
+        count = len(queries.nested.get_titles(sqlite3_conn, flag=True))
+        queries.create_item(sqlite3_conn, title="b", flag=True)
+        assert len(queries.nested.get_titles(sqlite3_conn, flag=True)) == count + 1
+
+
+def test_cached_results_until_invalidated_by_a_write(sqlite3_conn):
+    queries = load_from_str(SQL, "sqlite3")
+    cache = queries.result_caches["get_titles"]
+
+    assert queries.get_titles(sqlite3_conn, flag=True) == [("a",)]
+    queries.create_items(sqlite3_conn, {"title": "b", "flag": True})
+    assert queries.get_titles(sqlite3_conn, flag=True) == [("a",)]
+    assert queries.get_titles(sqlite3_conn, True) == [("a",)]
+    assert cache.cache_info()[:2] == (2, 1)
+
+    queries.create_item(sqlite3_conn, title="c", flag=True)
+    assert queries.get_titles(sqlite3_conn, flag=True) == [("a",), ("b",), ("c",)]
+
+
+def test_entries_expire_and_are_evicted_least_recently_used(mocker):
+    now = mocker.patch("aioquerysaur.results.monotonic", return_value=0.0)
+    cache = ResultCache(ttl=10, maxsize=2)
+    for key in "abc":
+        cache.set(key, [key])
+
+    assert cache.get("a") != ["a"]
+    assert cache.get("b") == ["b"]
+    now.return_value = 11.0
+    assert cache.get("c") != ["c"]
+    assert cache.cache_info()[:3] == (1, 2, 1)
+
+
+def test_entries_are_bounded_by_estimated_bytes():
+    cache = ResultCache(maxsize=None, maxbytes=1000)
+    for n in range(10):
+        cache.set(n, [("x" * 100,)])
+
+    assert 0 < cache.cache_info().currbytes <= 1000
+    assert cache.cache_info().currsize < 10
+
+
+def test_cache_key_ignores_keyword_order_and_handles_unhashable_values():
+    assert cache_key("q", (), {"a": 1, "b": 2}) == cache_key("q", (), {"b": 2, "a": 1})
+    assert cache_key("q", ([1, 2],), {}) == cache_key("q", ([1, 2],), {})
+
+
+def test_concurrent_misses_share_one_query():
+    cache = ResultCache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return [1]
+
+    threads = [
+        threading.Thread(target=cache.call, args=("key", fetch)) for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_async_misses_share_one_query():
+    cache = AsyncResultCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [1]
+
+    results = await asyncio.gather(*(cache.call("key", fetch) for _ in range(5)))
+
+    assert results == [[1]] * 5
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_aiosqlite_results_are_cached(aiosqlite_conn):
+    queries = load_from_str(SQL, "aiosqlite")
+
+    assert await queries.get_titles(aiosqlite_conn, flag=True) == [("a",)]
+    await queries.create_items(aiosqlite_conn, {"title": "b", "flag": True})
+    assert await queries.get_titles(aiosqlite_conn, flag=True) == [("a",)]
+
+    await queries.create_item(aiosqlite_conn, title="c", flag=True)
+    assert len(await queries.get_titles(aiosqlite_conn, flag=True)) == 3
@@ -0,0 +1,135 @@
+import sqlite3
+from pathlib import Path
+
+import aiosqlite
+import pytest
+from aioquerysaur import (
+    AsyncConnectionPool,
+    AsyncReplicaRouter,
+    ReplicaRouter,
+    load_from_str,
+)
+
+SQL = """
+-- name: get-node$
+select node from info;
+
+-- name: get-nodes
+select node from info;
+
+-- name: set-node>
+update info set node = :node;
+"""
+
+
+def make_db(path, node):
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        f"create table info (node text); insert into info values ('{node}');"
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def paths(tmpdir):
+    return [
+        make_db(str(Path(tmpdir.strpath) / f"{node}.db"), node)
+        for node in ("primary", "replica_1", "replica_2")
+    ]
+
+
+@pytest.fixture
+def conns(paths):
+    conns = [sqlite3.connect(path, isolation_level=None) for path in paths]
+    yield conns
+    for conn in conns:
+        conn.close()
+
+
+def test_reads_go_round_robin_to_replicas_and_writes_to_primary(conns):
+    primary, *replicas = conns
+    queries = load_from_str(SQL, "sqlite3").set_router(ReplicaRouter(primary, replicas))
+
+    assert [queries.get_node() for _ in range(3)] == [
+        ("replica_1",),
+        ("replica_2",),
+        ("replica_1",),
+    ]
+    queries.set_node(node="written")
+    assert primary.execute("select node from info").fetchone() == ("written",)
+    assert queries.get_node() == ("replica_2",)
+
+
+def test_least_outstanding_skips_busy_replicas(conns):
+    primary, *replicas = conns
+    router = ReplicaRouter(primary, replicas, strategy="least_outstanding")
+    queries = load_from_str(SQL, "sqlite3").set_router(router)
+
+    with queries.get_nodes_cursor() as cur:
+        assert cur.fetchall() == [("replica_1",)]
+        assert router.outstanding == [1, 0]
+        assert [queries.get_node() for _ in range(2)] == [("replica_2",)] * 2
+    assert router.outstanding == [0, 0]
+
+    with pytest.raises(ValueError, match="strategy must be one of"):
+        ReplicaRouter(primary, replicas, strategy="random")
+
+
+def test_overrides_and_read_your_writes(conns):
+    primary, *replicas = conns
+    router = ReplicaRouter(primary, replicas)
+    queries = load_from_str(SQL, "sqlite3").set_router(router)
+
+    with router.use(replicas[1]):
+        assert [queries.get_node() for _ in range(2)] == [("replica_2",)] * 2
+    with router.use(primary):
+        assert queries.get_node() == ("primary",)
+    with pytest.raises(ValueError):
+        with router.use(sqlite3.connect(":memory:")):
+            pass
+
+    with router.sticky():
+        assert queries.get_node() == ("replica_1",)
+        queries.set_node(node="written")
+        assert queries.get_node() == ("written",)
+    assert queries.get_node() == ("replica_2",)
+
+    # blocks on the primary only count as a write once one runs in them
+    with router.sticky():
+        with queries.connection():
+            assert queries.get_node() == ("written",)
+        assert queries.get_node() == ("replica_1",)
+        with queries.connection():
+            queries.set_node(node="again")
+        assert queries.get_node() == ("again",)
+    assert queries.get_node() == ("replica_2",)
+
+    # reads within a transaction see its writes before they are committed
+    with queries.transaction():
+        queries.set_node(node="uncommitted")
+        assert queries.get_node() == ("uncommitted",)
+    assert queries.get_node() == ("replica_1",)
+
+
+@pytest.mark.asyncio
+async def test_async_router_takes_pools(paths):
+    pools = [AsyncConnectionPool(lambda p=p: aiosqlite.connect(p)) for p in paths]
+    primary, *replicas = pools
+    router = AsyncReplicaRouter(primary, replicas)
+    queries = load_from_str(SQL, "aiosqlite").set_router(router)
+
+    assert [await queries.get_node() for _ in range(2)] == [
+        ("replica_1",),
+        ("replica_2",),
+    ]
+    assert [row async for row in queries.get_nodes_iter()] == [("replica_1",)]
+    await queries.set_node(node="written")
+    with router.use(primary):
+        assert await queries.get_node() == ("written",)
+
+    with pytest.raises(ValueError):
+        load_from_str(SQL, "sqlite3").set_router(router)
+    for pool in pools:
+        await pool.close()
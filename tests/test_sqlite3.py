@@ -1,4 +1,5 @@
 from pathlib import Path
+import sqlite3
 
 import pytest
 from aioquerysaur import load_from_str
@@ -31,3 +32,107 @@ def test_connect_to_sqlite_db_and_insert_item(sql, sqlite3_conn):
         queries.create_item(conn=sqlite3_conn, flag=True, revealed=False, title="bsd")
         items1 = queries.get_list(conn=sqlite3_conn, flag=True)
         assert len(items1) == 2
+
+
+def test_select_cursor_streams_rows_from_sqlite(sql, sqlite3_conn):
+    queries = load_from_str(sql, "sqlite3")
+
+    with queries.get_list_cursor(sqlite3_conn, flag=True) as cur:
+        rows = [row for row in cur]
+
+    assert rows == [("a", 1)]
+
+
+def test_cursors_are_reused_per_connection_and_query(sql, sqlite3_conn):
+    queries = load_from_str(sql, "sqlite3")
+    statement_cache = queries.driver_adapter.statement_cache
+
+    queries.get_list(sqlite3_conn, flag=True)
+    cur = statement_cache.get(sqlite3_conn, "get_list")
+    sqlite3_conn.row_factory = sqlite3.Row
+    rows = queries.get_list(sqlite3_conn, flag=True)
+
+    assert statement_cache.get(sqlite3_conn, "get_list") is cur
+    assert rows[0]["title"] == "a"
+    assert statement_cache.hits == 3
+
+    sqlite3_conn.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        queries.get_list(sqlite3_conn, flag=True)
+    assert statement_cache.cache_info().currsize == 0
+
+
+def test_cursors_failing_to_execute_are_closed(sqlite3_conn):
+    queries = load_from_str(
+        "-- name: add_item>\ninsert into items (id, title) values (:id, :title);",
+        "sqlite3",
+    )
+    queries.add_item(sqlite3_conn, id=2, title="b")
+    cur = queries.driver_adapter.statement_cache.get(sqlite3_conn, "add_item")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        queries.add_item(sqlite3_conn, id=2, title="b")
+    with pytest.raises(sqlite3.ProgrammingError, match="closed cursor"):
+        cur.fetchall()
+    assert queries.add_item(sqlite3_conn, id=3, title="c") == 1
+
+
+def test_insert_many_streams_rows_and_returns_rowcount(sql, sqlite3_conn):
+    queries = load_from_str(
+        "-- name: create_items>>\ninsert into items (title) values (:title);\n"
+        "-- name: reveal_items>>\nupdate items set revealed = 1 where title = ?;",
+        "sqlite3",
+    )
+
+    rows = ({"title": str(n)} for n in range(5))
+    assert queries.create_items(sqlite3_conn, rows) == 5
+    assert queries.reveal_items(sqlite3_conn, ("0",), ("1",), ("x",)) == 2
+
+    # a single row is a tuple, a list is taken for a list of rows
+    assert queries.create_items(sqlite3_conn, ("5",)) == 1
+    with pytest.raises(TypeError, match=r"create_items\(\) takes rows as dicts or"):
+        queries.create_items(sqlite3_conn, ["6"])
+    with pytest.raises(TypeError, match="got int, pass a single row as a tuple"):
+        queries.create_items(sqlite3_conn, iter([6]))
+
+
+def test_parameters_are_bound_by_position_and_checked(sql, sqlite3_conn):
+    queries = load_from_str(
+        sql + "\n-- name: count_between$\n"
+        "select count(*) from items where id >= :low and id <= :high or id = :low;",
+        "sqlite3",
+    )
+    assert queries._query_data["create_item"].parameters == (
+        "title",
+        "revealed",
+        "flag",
+    )
+
+    queries.create_item(sqlite3_conn, "b", False, True)
+    assert queries.get_list(sqlite3_conn, True) == [("a", 1), ("b", 0)]
+    assert queries.count_between(sqlite3_conn, high=2, low=2) == (1,)
+
+    with pytest.raises(TypeError, match=r"missing parameter\(s\): flag$"):
+        queries.create_item(sqlite3_conn, title="c", revealed=False)
+    with pytest.raises(TypeError, match=r"unexpected parameter\(s\): falg$"):
+        queries.get_list(sqlite3_conn, falg=True)
+    with pytest.raises(TypeError, match="either by position or by name"):
+        queries.get_list(sqlite3_conn, True, flag=True)
+    with pytest.raises(TypeError, match=r"takes 2 parameter\(s\) \(low, high\), got 1"):
+        queries.count_between(sqlite3_conn, 1)
+
+
+def test_scripts_run_all_statements_in_one_call(sqlite3_conn):
+    queries = load_from_str(
+        "-- name: reset_items#\n"
+        "delete from items;\n"
+        "insert into items (title, revealed, flag) values ('a:b', 0, 1);\n"
+        "insert into items (title, revealed, flag) values ('50%', 0, 1);",
+        "sqlite3",
+    )
+
+    assert queries.reset_items(sqlite3_conn) is None
+    assert sqlite3_conn.execute("select title from items").fetchall() == [
+        ("a:b",),
+        ("50%",),
+    ]
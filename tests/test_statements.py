@@ -0,0 +1,80 @@
+import gc
+import pickle
+import sqlite3
+
+from aioquerysaur.adapters.statements import StatementCache
+
+
+class Connection:
+    pass
+
+
+def test_statements_are_evicted_least_recently_used_first():
+    closed = []
+    cache = StatementCache(maxsize=2, close=closed.append)
+    conn = Connection()
+
+    cache.put(conn, "a", "stmt_a")
+    cache.put(conn, "b", "stmt_b")
+    assert cache.get(conn, "a") == "stmt_a"
+    cache.put(conn, "c", "stmt_c")
+
+    assert cache.get(conn, "b") is None
+    assert closed == ["stmt_b"]
+    assert cache.cache_info() == (1, 1, 1, 2, 2)
+
+
+def test_checked_out_statements_are_not_shared():
+    cache = StatementCache()
+    conn = Connection()
+    cache.put(conn, "a", "stmt_a")
+
+    assert cache.checkout(conn, "a") == "stmt_a"
+    assert cache.checkout(conn, "a") is None
+    cache.put(conn, "a", "stmt_a")
+    assert cache.checkout(conn, "a") == "stmt_a"
+
+
+def test_statements_are_kept_per_connection():
+    closed = []
+    cache = StatementCache(close=closed.append)
+    conn, other_conn = Connection(), Connection()
+
+    cache.put(conn, "a", "stmt_a")
+    assert cache.get(other_conn, "a") is None
+
+    cache.evict(conn)
+    assert cache.get(conn, "a") is None
+    assert closed == ["stmt_a"]
+
+
+def test_collected_connections_are_forgotten():
+    cache = StatementCache()
+    cache.put(Connection(), "a", "stmt_a")
+    gc.collect()
+
+    assert cache.cache_info().currsize == 0
+
+
+def test_connections_without_weak_references_are_bounded():
+    cache = StatementCache(max_connections=2)
+    conns = [sqlite3.connect(":memory:") for _ in range(3)]
+    for conn in conns:
+        cache.put(conn, "a", conn)
+
+    assert cache.get(conns[0], "a") is None
+    assert cache.get(conns[2], "a") is conns[2]
+    for conn in conns:
+        conn.close()
+
+
+def test_caches_are_pickled_without_their_statements():
+    cache = StatementCache(maxsize=2)
+    conn = Connection()
+    cache.put(conn, "a", "stmt_a")
+
+    copied = pickle.loads(pickle.dumps(cache))
+    assert copied.maxsize == 2
+    assert copied.cache_info().currsize == 0
+    copied.put(conn, "a", "stmt_a")
+    assert copied.get(conn, "a") == "stmt_a"
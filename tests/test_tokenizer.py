@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+from aioquerysaur import load_from_str
+from aioquerysaur.tokenizer import ParsedSQL, parse_sql
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "select :a::text",
+        "select ':x', :a",
+        "select 'it''s :x', :a",
+        "select E'it\\'s :x', :a",
+        'select "col:x", :a',
+        "select :a -- :x",
+        "select /* :x\n :y */ :a",
+        "select $$ :x $$, :a",
+        "select $body$ :x $$ :y $body$, :a",
+    ],
+)
+def test_only_real_parameters_are_found(sql):
+    assert parse_sql(sql).parameters == ("a",)
+
+
+def test_render_placeholder_styles():
+    parsed = parse_sql("select :a, :b, :a like '5%'")
+
+    assert parsed.parameters == ("a", "b", "a")
+    assert parsed.unique_parameters == ("a", "b")
+    assert parsed.render(":{name}") == parsed
+    assert parsed.render("${index}") == "select $1, $2, $1 like '5%'"
+    assert (
+        parsed.render("%({name})s", escape_percent=True)
+        == "select %(a)s, %(b)s, %(a)s like '5%%'"
+    )
+
+
+def test_parsed_sql_is_a_picklable_str():
+    parsed = parse_sql("select :a")
+
+    assert isinstance(parsed, str)
+    assert parse_sql(parsed) is parsed
+    unpickled = pickle.loads(pickle.dumps(parsed))
+    assert isinstance(unpickled, ParsedSQL)
+    assert unpickled.parameters == ("a",)
+
+
+def test_psycopg2_keeps_casts_next_to_parameters():
+    queries = load_from_str(
+        "-- name: get_item$\nselect :id::int, '100%' as pct from items", "psycopg2"
+    )
+
+    assert queries.get_item.sql == "select %s::int, '100%%' as pct from items"
+    assert queries._query_data["get_item"].parameters == ("id",)
@@ -0,0 +1,179 @@
+import sqlite3
+
+import aiosqlite
+import pytest
+from aioquerysaur import AsyncConnectionPool, ConnectionPool, load_from_str
+from aioquerysaur.exceptions import SQLPoolException
+
+SQL = """
+-- name: get-titles
+select title from items order by id;
+
+-- name: count-items$
+select count(*) from items;
+
+-- name: add-item>
+insert into items (id, title) values (:id, :title);
+
+-- name: rename-item>
+update items set title = :title where id = :id;
+"""
+
+
+def titles(conn):
+    return [title for title, in conn.execute("select title from items order by id")]
+
+
+def test_writes_are_sent_as_batches_and_committed_once(mocker, sqlite3_path):
+    conn = sqlite3.connect(sqlite3_path, isolation_level=None)
+    queries = load_from_str(SQL, "sqlite3")
+    many = mocker.spy(queries.driver_adapter, "insert_update_delete_many")
+    commit = mocker.spy(queries.driver_adapter, "commit")
+
+    with queries.transaction(conn) as transaction:
+        for i in range(2, 6):
+            assert queries.add_item(conn, id=i, title=str(i)) is None
+        queries.rename_item(conn, id=1, title="b")
+        queries.add_item(conn, id=6, title="6")
+        assert transaction.pending == 6
+        # reads send the buffered writes first
+        assert queries.count_items(conn) == (6,)
+        assert transaction.pending == 0
+
+    assert [len(call.args[3]) for call in many.call_args_list] == [4, 1, 1]
+    assert commit.call_count == 1
+    assert not conn.in_transaction
+    assert titles(sqlite3.connect(sqlite3_path)) == ["b", "2", "3", "4", "5", "6"]
+
+
+def test_errors_roll_back_and_savepoints_nest(sqlite3_conn):
+    queries = load_from_str(SQL, "sqlite3")
+
+    with pytest.raises(RuntimeError):
+        with queries.transaction(sqlite3_conn):
+            queries.add_item(sqlite3_conn, id=2, title="lost")
+            raise RuntimeError
+    assert titles(sqlite3_conn) == ["a"]
+
+    with queries.transaction(sqlite3_conn):
+        queries.add_item(sqlite3_conn, id=2, title="b")
+        with pytest.raises(sqlite3.IntegrityError):
+            with queries.transaction(sqlite3_conn) as nested:
+                assert nested.savepoint == "aioquerysaur_1"
+                queries.add_item(sqlite3_conn, id=3, title="c")
+                queries.add_item(sqlite3_conn, id=1, title="taken")
+        queries.add_item(sqlite3_conn, id=4, title="d")
+    assert titles(sqlite3_conn) == ["a", "b", "d"]
+
+
+def test_pooled_transaction(sqlite3_path):
+    queries = load_from_str(SQL, "sqlite3")
+    with pytest.raises(SQLPoolException):
+        queries.transaction()
+
+    pool = ConnectionPool(lambda: sqlite3.connect(sqlite3_path), max_size=1)
+    queries.set_pool(pool)
+    with queries.transaction() as transaction:
+        queries.add_item(id=2, title="b")
+        assert transaction.pending == 1
+        assert queries.get_titles() == [("a",), ("b",)]
+    assert titles(sqlite3.connect(sqlite3_path)) == ["a", "b"]
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_async_transaction(aiosqlite_conn, sqlite3_path):
+    queries = load_from_str(SQL, "aiosqlite")
+
+    async with queries.transaction(aiosqlite_conn):
+        for i in range(2, 4):
+            assert await queries.add_item(aiosqlite_conn, id=i, title=str(i)) is None
+        assert await queries.count_items(aiosqlite_conn) == (3,)
+        with pytest.raises(RuntimeError):
+            async with queries.transaction(aiosqlite_conn):
+                await queries.rename_item(aiosqlite_conn, id=1, title="lost")
+                raise RuntimeError
+    assert titles(sqlite3.connect(sqlite3_path)) == ["a", "2", "3"]
+
+    pool = AsyncConnectionPool(lambda: aiosqlite.connect(sqlite3_path), max_size=1)
+    queries.set_pool(pool)
+    async with queries.transaction():
+        await queries.add_item(id=4, title="4")
+    assert len(await queries.get_titles()) == 4
+    await pool.close()
+
+
+def test_transaction_writes_one_batch_and_commits_once(mocker, tmpdir):
+    conn = sqlite3.connect(str(tmpdir / "batched.db"), isolation_level=None)
+    conn.execute("create table items (id integer primary key, title text)")
+    queries = load_from_str(SQL, "sqlite3")
+    execute = mocker.spy(queries.driver_adapter, "insert_update_delete")
+    many = mocker.spy(queries.driver_adapter, "insert_update_delete_many")
+    commit = mocker.spy(queries.driver_adapter, "commit")
+
+    with queries.transaction(conn):
+        for i in range(300):
+            queries.add_item(conn, id=i, title=str(i))
+
+    # one executemany and one commit instead of one of each per row
+    assert execute.call_count == 0
+    assert many.call_count == 1
+    assert commit.call_count == 1
+    assert queries.count_items(conn) == (300,)
+    conn.close()
+
+
+def test_scripts_refuse_to_commit_an_open_transaction(sqlite3_path):
+    conn = sqlite3.connect(sqlite3_path, isolation_level=None)
+    queries = load_from_str(
+        SQL
+        + "\n-- name: reset#\ndelete from items; insert into items (id, title) values (9, 'x');",
+        "sqlite3",
+    )
+
+    with pytest.raises(RuntimeError, match="would commit the open transaction"):
+        with queries.transaction(conn):
+            queries.add_item(conn, id=2, title="2")
+            queries.reset(conn)
+    assert titles(conn) == ["a"]
+
+    queries.reset(conn)
+    assert titles(conn) == ["x"]
+    conn.close()
+
+
+CACHED_SQL = """
+-- name: get-titles
+-- cache: ttl=60
+select title from items order by id;
+
+-- name: add-item>
+-- invalidates: get_titles
+insert into items (id, title) values (:id, :title);
+"""
+
+
+@pytest.mark.parametrize("pooled", [False, True])
+def test_cached_reads_skip_the_cache_within_transactions(sqlite3_path, pooled):
+    conn = sqlite3.connect(sqlite3_path, isolation_level=None)
+    pool = ConnectionPool(lambda: conn, max_size=1) if pooled else None
+    queries = load_from_str(CACHED_SQL, "sqlite3", pool=pool)
+    args = () if pooled else (conn,)
+    assert queries.get_titles(*args) == [("a",)]
+
+    with pytest.raises(RuntimeError):
+        with queries.transaction(*args):
+            queries.add_item(*args, id=2, title="b")
+            # the buffered write is sent and read, the cache is left alone
+            assert queries.get_titles(*args) == [("a",), ("b",)]
+            assert queries.result_caches["get_titles"].cache_info().currsize == 1
+            raise RuntimeError
+    assert queries.get_titles(*args) == [("a",)]
+
+    with queries.transaction(*args):
+        queries.add_item(*args, id=2, title="b")
+        if not pooled:
+            queries.add_item(conn=conn, id=3, title="c")
+        assert queries.result_caches["get_titles"].cache_info().currsize == 1
+    assert queries.result_caches["get_titles"].cache_info().currsize == 0
+    assert queries.get_titles(*args)[:2] == [("a",), ("b",)]
@@ -0,0 +1,124 @@
+import sqlite3
+from pathlib import Path
+
+import aiosqlite
+import pytest
+from aioquerysaur import (
+    QueryValidator,
+    SQLValidationException,
+    load_from_file,
+    load_from_str,
+)
+from aioquerysaur.loaders.text import TextLoader
+
+SQL = """-- name: get-items
+select id, title from items;
+
+-- name: get-item$
+select title from items where id = :id;
+
+-- name: create-item>
+insert into items (title) values (:title);
+
+-- name: create-items>>
+insert into items (title) values (:title);
+"""
+
+BROKEN_SQL = """-- name: get-missing
+select * from missing;
+
+-- name: get-typo
+selct 1;
+"""
+
+
+def test_valid_queries_load(sqlite3_path):
+    queries = load_from_str(
+        SQL, "sqlite3", validate=lambda: sqlite3.connect(sqlite3_path)
+    )
+    assert queries.get_items.sql
+
+
+def test_all_problems_are_reported_with_their_location(sqlite3_path, tmpdir):
+    sql_dir = Path(tmpdir.strpath) / "sql"
+    (sql_dir / "nested").mkdir(parents=True)
+    (sql_dir / "items.sql").write_text(SQL)
+    (sql_dir / "nested" / "broken.sql").write_text(BROKEN_SQL)
+
+    with pytest.raises(SQLValidationException) as exc_info:
+        load_from_file(
+            sql_dir,
+            "sqlite3",
+            validate=QueryValidator(lambda: sqlite3.connect(sqlite3_path), workers=2),
+        )
+
+    broken = str(sql_dir / "nested" / "broken.sql")
+    problems = exc_info.value.problems
+    assert [(p.query_name, p.path, p.line) for p in problems] == [
+        ("get_missing", broken, 1),
+        ("get_typo", broken, 4),
+    ]
+    assert "no such table: missing" in problems[0].message
+    assert f"{broken}:4: get_typo: OperationalError" in str(exc_info.value)
+
+
+def test_full_scans_of_large_tables_are_reported(sqlite3_path):
+    validator = QueryValidator(lambda: sqlite3.connect(sqlite3_path), max_scan_rows=0)
+
+    with pytest.raises(SQLValidationException) as exc_info:
+        load_from_str(SQL, "sqlite3", validate=validator)
+
+    (problem,) = exc_info.value.problems
+    assert (problem.query_name, problem.line) == ("get_items", 1)
+    assert problem.message == "full scan of items, about 1 rows"
+
+    validator.max_scan_rows = 1
+    load_from_str(SQL, "sqlite3", validate=validator)
+
+
+def test_scan_estimates_come_from_sqlite_stat1(sqlite3_path):
+    conn = sqlite3.connect(sqlite3_path)
+    conn.executemany("insert into items (title) values (?)", [("b",), ("c",)])
+    conn.execute("analyze")
+    conn.execute("insert into items (title) values ('d')")
+    conn.commit()
+    conn.close()
+    validator = QueryValidator(lambda: sqlite3.connect(sqlite3_path), max_scan_rows=0)
+
+    with pytest.raises(SQLValidationException) as exc_info:
+        load_from_str(SQL, "sqlite3", validate=validator)
+
+    (problem,) = exc_info.value.problems
+    assert problem.message == "full scan of items, about 3 rows"
+
+
+def test_files_are_parsed_once_and_ddl_is_skipped(mocker, sqlite3_path, tmpdir):
+    sql_dir = Path(tmpdir.strpath) / "sql"
+    (sql_dir / "nested").mkdir(parents=True)
+    (sql_dir / "items.sql").write_text(SQL)
+    (sql_dir / "nested" / "ddl.sql").write_text(
+        "-- name: add-column>\nalter table missing add column flag integer;"
+    )
+    parse = mocker.spy(TextLoader, "_parse_sql")
+
+    queries = load_from_file(
+        sql_dir, "sqlite3", workers=2, validate=lambda: sqlite3.connect(sqlite3_path)
+    )
+
+    assert parse.call_count == 2
+    assert queries.nested.add_column.sql
+
+
+@pytest.mark.asyncio
+async def test_async_validation_from_a_running_loop(sqlite3_path):
+    with pytest.raises(SQLValidationException) as exc_info:
+        load_from_str(
+            SQL + "\n" + BROKEN_SQL,
+            "aiosqlite",
+            validate=lambda: aiosqlite.connect(sqlite3_path),
+        )
+
+    assert [(p.query_name, p.line) for p in exc_info.value.problems] == [
+        ("get_missing", 13),
+        ("get_typo", 16),
+    ]
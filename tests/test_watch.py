@@ -0,0 +1,145 @@
+import asyncio
+import shutil
+from pathlib import Path
+
+import pytest
+from aioquerysaur import load_from_file, load_from_str
+from aioquerysaur.exceptions import SQLLoadException, SQLParseException
+
+NEW_QUERY = """
+-- name: get_titles
+select title from items;
+"""
+
+
+@pytest.fixture
+def sql_dir(tmpdir):
+    path = Path(tmpdir.strpath) / "sql"
+    shutil.copytree(Path(__file__).parent / "sql/dir", path)
+    return path
+
+
+def test_watch_reloads_only_changed_files(sql_dir):
+    queries = load_from_file(sql_dir, "sqlite3")
+    watcher = queries.watch()
+    get_list_1 = queries.get_list_1
+
+    nested_file = sql_dir / "nested/items2.sql"
+    nested_file.write_text(nested_file.read_text().split(";")[0] + ";" + NEW_QUERY)
+
+    assert watcher.check() == [nested_file]
+    assert queries.get_list_1 is get_list_1
+    assert "nested.get_titles" in queries.available
+    assert "nested.get_list_4" not in queries.available
+    assert not hasattr(queries.nested, "get_list_4")
+    assert queries.nested.get_titles.sql == "select title from items;"
+    assert watcher.check() == []
+
+
+def test_watch_picks_up_new_and_deleted_files(sql_dir):
+    queries = load_from_file(sql_dir, "sqlite3")
+    watcher = queries.watch()
+
+    (sql_dir / "items1.sql").unlink()
+    (sql_dir / "other" / "deeper").mkdir(parents=True)
+    (sql_dir / "other/deeper/titles.sql").write_text(NEW_QUERY)
+    watcher.check()
+
+    assert "get_list_1" not in queries.available
+    assert "other.deeper.get_titles" in queries.available
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_watch_keeps_queries_moved_between_files(sql_dir, lazy):
+    (sql_dir / "b.sql").write_text(NEW_QUERY)
+    queries = load_from_file(sql_dir, "sqlite3", lazy=lazy)
+    watcher = queries.watch()
+
+    (sql_dir / "a.sql").write_text(NEW_QUERY)
+    (sql_dir / "b.sql").write_text("")
+    watcher.check()
+
+    assert "get_titles" in queries.available
+    assert queries.get_titles.sql == "select title from items;"
+    (sql_dir / "a.sql").unlink()
+    watcher.check()
+    assert "get_titles" not in queries.available
+
+
+def test_watch_keeps_previous_methods_when_file_does_not_parse(sql_dir):
+    queries = load_from_file(sql_dir, "sqlite3")
+    watcher = queries.watch()
+    get_list_1 = queries.get_list_1
+
+    (sql_dir / "items1.sql").write_text("-- name: invalid name\nselect 1;")
+    with pytest.raises(SQLParseException):
+        watcher.check()
+
+    assert queries.get_list_1 is get_list_1
+    assert isinstance(watcher.last_error, SQLParseException)
+
+
+def test_watch_updates_index_of_lazy_queries(sql_dir):
+    queries = load_from_file(sql_dir, "sqlite3", lazy=True)
+    watcher = queries.watch()
+
+    (sql_dir / "items1.sql").write_text(NEW_QUERY)
+    watcher.check()
+
+    assert "get_titles" in queries.available
+    assert "get_list_1" not in queries.available
+    assert queries.get_titles.sql == "select title from items;"
+
+
+def test_watch_requires_queries_loaded_from_file(sql_dir):
+    queries = load_from_str(NEW_QUERY, "sqlite3")
+
+    with pytest.raises(SQLLoadException):
+        queries.watch()
+
+
+@pytest.mark.asyncio
+async def test_watch_task_swaps_methods_on_the_event_loop(sql_dir):
+    queries = load_from_file(sql_dir, "aiosqlite")
+    watcher = queries.watch(interval=0.01)
+    watcher.start()
+
+    (sql_dir / "items1.sql").write_text(NEW_QUERY)
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if "get_titles" in queries.available:
+            break
+    watcher.stop()
+
+    assert "get_titles" in queries.available
+    assert "get_titles_iter" in queries.available
+
+
+def test_watch_treats_files_gone_before_stat_as_removed(mocker, sql_dir):
+    queries = load_from_file(sql_dir, "sqlite3")
+    watcher = queries.watch()
+    items_file = sql_dir / "items1.sql"
+
+    # listed, then deleted before it was stat'ed
+    mocker.patch.object(watcher, "_sql_files", return_value=[items_file])
+    items_file.unlink()
+    assert items_file in watcher.check()
+    assert "get_list_1" not in queries.available
+
+
+@pytest.mark.asyncio
+async def test_watch_task_keeps_polling_after_errors(mocker, sql_dir):
+    queries = load_from_file(sql_dir, "aiosqlite")
+    watcher = queries.watch(interval=0.01)
+    poll = mocker.patch.object(watcher, "poll", side_effect=[OSError, []] * 50)
+    watcher.start()
+
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if poll.call_count >= 2:
+            break
+    task = watcher._task
+    watcher.stop()
+
+    assert poll.call_count >= 2
+    assert not task.done() or task.cancelled()